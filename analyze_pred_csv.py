@@ -1,191 +1,616 @@
 import sys
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import os
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sequence_engine import SequenceStats, evaluate_data, evaluate_frames, evaluate_grid
+from live_analyzer import LiveSequenceMonitor
+from file_manifest import DEFAULT_PAIR_KEY, AnalysisManifest, pair_files
+from results_writer import SequenceResultWriter
+from tick_loader import PREDICTION_COLUMNS, TICK_COLUMNS, format_seconds, load_predictions, load_ticks, parse_timestamp
+from data_model import (NO_TOKEN, PREDICTION_FIELDS, TICK_FIELDS, TickData, frame_token_groups,
+                        load_prediction_data, load_tick_data)
+from partition_store import DEFAULT_STORE_DIR, PartitionStore
+
+# Bump when the evaluation changes so cached manifest results are recomputed
+# (4: mixed-token files are evaluated per sectoken)
+ANALYSIS_VERSION = 4
+
+
+class AnalysisReport:
+    """
+    Counters behind the final report.
+
+    Every file pair produces its own report; reports are merged by summing the
+    counters, so the totals do not depend on the order in which files finish.
+    """
+    FIELDS = (
+        'no_swing_opportunities',
+        'with_swing_opportunities',
+        'swing_100_success',
+        'swing_50_70_success',
+        'swing_70_100_success',
+        'swing_below_50_success',
+    )
+
+    def __init__(self):
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+
+    @staticmethod
+    def bucket(oppcount, swing_success_percentage):
+        """
+        Name of the swing success bucket a file falls into.
+        """
+        if oppcount == 0:
+            return 'no_swing_opportunities'
+        if swing_success_percentage == 100:
+            return 'swing_100_success'
+        elif 50 <= swing_success_percentage < 70:
+            return 'swing_50_70_success'
+        elif 70 <= swing_success_percentage < 100:
+            return 'swing_70_100_success'
+        return 'swing_below_50_success'
+
+    def add_file(self, oppcount, swing_success_percentage):
+        """
+        Put one file into its swing success bucket.
+        """
+        bucket = self.bucket(oppcount, swing_success_percentage)
+        setattr(self, bucket, getattr(self, bucket) + 1)
+        if oppcount:
+            self.with_swing_opportunities += 1
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, counters):
+        report = cls()
+        for field in cls.FIELDS:
+            setattr(report, field, counters.get(field, 0))
+        return report
+
+    def merge(self, other):
+        """
+        Add the counters of another report into this one.
+        """
+        for field in self.FIELDS:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+        return self
+
+
+# Prediction columns used by the evaluation and the probability sweep
+ANALYSIS_COLUMNS = PREDICTION_COLUMNS + ['High_Prob', 'Low_Prob']
+ANALYSIS_FIELDS = PREDICTION_FIELDS + ['high_prob', 'low_prob']
+
+
+def load_data(csv_file1, csv_file2, compact=False):
+    # Load the ticks and predictions with arrivaltime as seconds since 1970-01-01
+    # and their sectokens; compact=True returns the float32
+    # TickData/PredictionData model instead
+    if compact:
+        return (load_tick_data(csv_file1, TICK_FIELDS + ['token']),
+                load_prediction_data(csv_file2, ANALYSIS_FIELDS + ['token']))
+    df1 = load_ticks(csv_file1, TICK_COLUMNS + ['sectoken'])
+    df2 = load_predictions(csv_file2, ANALYSIS_COLUMNS + ['sectoken'])
+    return df1, df2
+
+
+def instrument_pairs(df1, df2):
+    """
+    (ticks, predictions) of every sectoken of a file pair.
+
+    Each token's predictions are checked against that token's ticks only
+    (all ticks when the tick file has no sectoken). A pair holding a single
+    instrument is returned whole.
+    """
+    if isinstance(df1, TickData):
+        groups1, groups2 = df1.token_groups(), df2.token_groups()
+
+        def take(data, rows):
+            return data.take(rows)
+    else:
+        groups1, groups2 = frame_token_groups(df1), frame_token_groups(df2)
+
+        def take(df, rows):
+            return df.iloc[rows]
+    if len(groups1) <= 1 and len(groups2) <= 1:
+        return [(df1, df2)]
+    pairs = []
+    for name, rows in sorted(groups2.items()):
+        if set(groups1) == {NO_TOKEN}:
+            ticks = df1
+        else:
+            ticks = take(df1, groups1.get(name, np.arange(0)))
+        pairs.append((ticks, take(df2, rows)))
+    return pairs
+
+
+def sequence_rows(results, file_name):
+    """
+    One structured row per evaluated sequence, as written to the results file.
+    """
+    outcome = np.select(
+        [~results['swing_detected'], results['swing_success'], results['stop_loss_hit']],
+        ['no_swing', 'target_hit', 'stop_loss'],
+        default='target_missed')
+    return pd.DataFrame({
+        'file': file_name,
+        'fileSeqNum': results['fileSeqNum'].to_numpy(),
+        'start_time': format_seconds(results['start_time']).to_numpy(),
+        'end_time': format_seconds(results['end_time']).to_numpy(),
+        'direction': np.where(results['upward'], 'up', 'down'),
+        'max_swing': results['max_swing'].to_numpy(),
+        'within_sd_pct': results['within_sd_pct'].to_numpy(),
+        'target_met': results['target_met'].to_numpy(),
+        'outcome': outcome,
+        'time_to_target': results['time_to_target'].to_numpy(),
+        'time_to_stop': results['time_to_stop'].to_numpy(),
+    })
+
+
+def opportunity_lines(results):
+    """
+    Log lines for the sequences of a result table that had a swing opportunity.
+    """
+    sequence_lines = []
+    opportunities = results[results['swing_detected']]
+    for row in opportunities.itertuples(index=False):
+        sequence_lines.append(
+            f"Swing detected at file sequence: {row.fileSeqNum}\n"
+            f"Maximum possible swing: {int(row.max_swing)}"
+        )
+        # Outcomes are order aware: a stop hit after the target still counts as a win
+        if row.stop_loss_hit:
+            sequence_lines.append(f"  !! NEGATIVE trade due to stop loss hit !!  (after {row.time_to_stop:.0f}s)")
+        elif not row.swing_success:
+            sequence_lines.append(f"  !! NEGATIVE trade - could not meet target!!  ")
+        else:
+            sequence_lines.append(f"  Target hit after {row.time_to_target:.0f}s")
+    return sequence_lines
+
+
+def summary_lines(expected_swing, sequences, within_sd_sum, successful_conditions,
+                  oppcount, swing_successful_conditions):
+    """
+    Summary lines of one file and its swing success percentage.
+    """
+    lines = []
+    lines.append(f"Expected Swing: {expected_swing}")
+    lines.append(f"Total opportunities: {oppcount}")
+    within_sd = within_sd_sum / sequences
+    lines.append(f"Average percentage within SD range: {within_sd:.2f}%")
+    success_percentage = (successful_conditions / sequences) * 100
+    lines.append(f"Prediction success percentage: {success_percentage:.2f}%")
+
+    if oppcount == 0:
+        swing_success_percentage = 0
+        lines.append("No swing opportunity.")
+    else:
+        swing_success_percentage = (swing_successful_conditions / oppcount) * 100
+        lines.append(f"Swing success percentage: {swing_success_percentage:.2f}%")
+    return lines, swing_success_percentage
+
+
+def get_opportunities(df1, df2, expected_swing):
+    """
+    Evaluate one tick/prediction pair, each sectoken of a mixed pair on its own.
+
+    Returns the per-sequence log lines, the summary lines, the file's
+    AnalysisReport and the engine's per-sequence result table.
+    """
+    report = AnalysisReport()
+
+    # Evaluate every fileSeqNum of an instrument in a single vectorized pass
+    evaluate = evaluate_data if isinstance(df1, TickData) else evaluate_frames
+    results = [evaluate(ticks, predictions, expected_swing) for ticks, predictions in instrument_pairs(df1, df2)]
+    results = results[0] if len(results) == 1 else pd.concat(results, ignore_index=True)
+    sequence_lines = opportunity_lines(results)
+
+    oppcount = int(results['swing_detected'].sum())
+    lines, swing_success_percentage = summary_lines(
+        expected_swing, len(results), results['within_sd_pct'].to_numpy().sum(),
+        int(results['target_met'].sum()), oppcount, int(results['swing_success'].sum()))
+    report.add_file(oppcount, swing_success_percentage)
+
+    return sequence_lines, lines, report, results
+
+
+def analyze_file_pair(input_path, output_path, expected_swing, with_rows=False, compact=False):
+    """
+    Load and evaluate one input/output CSV pair.
+
+    This is the unit of work handed to the process pool, so it only takes and
+    returns picklable values: a dict with the log lines, the AnalysisReport
+    and, if `with_rows` is set, the per-sequence result rows.
+    """
+    header = (f"\n*******************  Processing files: {os.path.basename(input_path)} and "
+              f"{os.path.basename(output_path)}  *******************\n")
+    df1, df2 = load_data(input_path, output_path, compact)
+    sequence_lines, lines, report, results = get_opportunities(df1, df2, expected_swing)
+    return {
+        'header': header,
+        'sequence_lines': sequence_lines,
+        'summary_lines': lines,
+        'report': report,
+        'rows': sequence_rows(results, os.path.basename(output_path)) if with_rows else None,
+    }
+
+
+def encode_analysis(result):
+    # JSON form of an analyze_file_pair() result for the manifest
+    encoded = dict(result, report=result['report'].to_dict())
+    encoded['rows'] = None if result['rows'] is None else result['rows'].to_dict('list')
+    return encoded
+
+
+def decode_analysis(cached):
+    result = dict(cached, report=AnalysisReport.from_dict(cached['report']))
+    result['rows'] = None if cached['rows'] is None else pd.DataFrame(cached['rows'])
+    return result
+
+
+def map_file_pairs(function, pairs, extra_args, workers=1):
+    """
+    Call function(input_path, output_path, *extra_args) for every FilePair.
+
+    With more than one worker the pairs are fanned out to a process pool.
+    Results are yielded in the order of `pairs` either way.
+    """
+    input_paths = [pair.input_path for pair in pairs]
+    output_paths = [pair.output_path for pair in pairs]
+    args = [[arg] * len(pairs) for arg in extra_args]
+
+    if workers > 1 and len(pairs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(function, input_paths, output_paths, *args)
+    else:
+        yield from map(function, input_paths, output_paths, *args)
+
+
+def map_cached_pairs(function, pairs, extra_args, params, encode, decode, workers=1, manifest=None):
+    """
+    map_file_pairs() that reuses the results recorded in an AnalysisManifest.
+
+    Only pairs whose files or parameters changed are recomputed; their
+    results are encoded with `encode` and stored back into the manifest.
+    Results are yielded in the order of `pairs`.
+    """
+    cached = [manifest.lookup(pair, params) if manifest else None for pair in pairs]
+    todo = [pair for pair, result in zip(pairs, cached) if result is None]
+    if manifest is not None:
+        print(f"Reusing {len(pairs) - len(todo)} cached file pairs, analysing {len(todo)}.")
+
+    computed = map_file_pairs(function, todo, extra_args, workers)
+    try:
+        for pair, result in zip(pairs, cached):
+            if result is not None:
+                yield decode(result)
+                continue
+            result = next(computed)
+            if manifest is not None:
+                manifest.store(pair, params, encode(result))
+            yield result
+    finally:
+        computed.close()
+        if manifest is not None:
+            manifest.save()
+
+
+def parse_grid(text):
+    """
+    Parse a sweep range given as 'start:stop:step' (stop included) or as a
+    comma separated list of values.
+    """
+    if ':' in text:
+        start, stop, step = (float(part) for part in text.split(':'))
+        count = int(np.floor((stop - start) / step + 1e-9)) + 1
+        return [round(start + i * step, 10) for i in range(count)]
+    return [float(part) for part in text.split(',')]
+
+
+def sweep_file_pair(input_path, output_path, swings, bands, probabilities):
+    """
+    Load one file pair and score it for every point of the parameter grid.
+    """
+    df1, df2 = load_data(input_path, output_path)
+    gated = any(probability is not None for probability in probabilities)
+    stats = SequenceStats(
+        df1['arrivaltime'].to_numpy(), df1['lasttrprc'].to_numpy(),
+        df2['arrivaltime'].to_numpy(), df2['fileSeqNum'].to_numpy(),
+        df2['lastpredtrprc'].to_numpy(), df2['StanDev'].to_numpy(),
+        df2['High_Prob'].to_numpy() if gated else None,
+        df2['Low_Prob'].to_numpy() if gated else None)
+    table = evaluate_grid(stats, swings, bands, probabilities)
+    table.insert(0, 'file', os.path.basename(output_path))
+    return table
+
+
+def summarize_sweep(per_file):
+    """
+    Reduce the per-file sweep tables into one row per grid point.
+
+    Besides the pooled success percentages every row carries the same file
+    bucket counts as the final report of a single run.
+    """
+    per_file = per_file.copy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        file_success = np.where(per_file['opportunities'] > 0,
+                                per_file['swing_successes'] / per_file['opportunities'] * 100, 0)
+    per_file['bucket'] = [AnalysisReport.bucket(opps, pct)
+                          for opps, pct in zip(per_file['opportunities'], file_success)]
+    per_file['with_swing_opportunities'] = per_file['opportunities'] > 0
+    for field in AnalysisReport.FIELDS:
+        if field != 'with_swing_opportunities':
+            per_file[field] = per_file['bucket'] == field
+
+    keys = ['expected_swing', 'band', 'probability']
+    summary = per_file.groupby(keys, dropna=False, sort=False).agg(
+        files=('file', 'count'),
+        sequences=('sequences', 'sum'),
+        opportunities=('opportunities', 'sum'),
+        swing_successes=('swing_successes', 'sum'),
+        target_met=('target_met', 'sum'),
+        # A NaN file sum stays NaN, as in the single-file summary
+        within_sd_sum=('within_sd_sum', lambda values: values.to_numpy().sum()),
+        **{field: (field, 'sum') for field in AnalysisReport.FIELDS},
+    ).reset_index()
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        summary['within_sd_pct'] = summary['within_sd_sum'] / summary['sequences']
+        summary['prediction_success_pct'] = summary['target_met'] / summary['sequences'] * 100
+        summary['swing_success_pct'] = np.where(
+            summary['opportunities'] > 0,
+            summary['swing_successes'] / summary['opportunities'] * 100, 0)
+    return summary.drop(columns=['within_sd_sum', 'target_met'])
+
+
+def run_sweep(input_folder, output_folder, swings, bands, probabilities, workers=1,
+              manifest=None, pair_pattern=DEFAULT_PAIR_KEY):
+    """
+    Evaluate the whole parameter grid, loading every file pair only once.
+    """
+    pairs = pair_files(input_folder, output_folder, pair_pattern)
+    params = {'mode': 'sweep', 'version': ANALYSIS_VERSION,
+              'swings': swings, 'bands': bands, 'probabilities': probabilities}
+    tables = list(map_cached_pairs(
+        sweep_file_pair, pairs, (swings, bands, probabilities), params,
+        encode=lambda table: table.to_dict('records'),
+        decode=pd.DataFrame.from_records,
+        workers=workers, manifest=manifest))
+    if not tables:
+        return pd.DataFrame()
+    return summarize_sweep(pd.concat(tables, ignore_index=True))
+
+
+def print_report(report):
+    # Generate final report
+    print("\n*************** Report ***************")
+    print(f"Files with No Swing Opportunities: {report.no_swing_opportunities}")
+    print(f"Files with Swing Opportunities: {report.with_swing_opportunities}")
+    print(f"Files with 100% Swing Success Percentage: {report.swing_100_success}")
+    print(f"Files with 50%-70% Swing Success Percentage: {report.swing_50_70_success}")
+    print(f"Files with 70%-100% Swing Success Percentage: {report.swing_70_100_success}")
+    print(f"Files with Below 50% Swing Success Percentage: {report.swing_below_50_success}")
+
+
+def run_live(input_folder, output_folder, expected_swing, poll_interval=5.0,
+             pair_pattern=DEFAULT_PAIR_KEY, results_path=None, quiet=False):
+    """
+    Follow growing tick/prediction files and report each sequence as it closes.
+
+    Every poll only parses the bytes appended since the previous one. Stop
+    with Ctrl+C; the sequences still open are then evaluated and the usual
+    per-file summaries and report are printed.
+    """
+    pairs = pair_files(input_folder, output_folder, pair_pattern)
+    monitors = [(pair, LiveSequenceMonitor(pair.input_path, pair.output_path, expected_swing))
+                for pair in pairs]
+    writer = SequenceResultWriter(results_path, buffer_rows=1) if results_path else None
+    print(f"Following {len(monitors)} file pairs, polling every {poll_interval}s. Press Ctrl+C to stop.")
+
+    def report_results(pair, results):
+        if results is None or results.empty:
+            return
+        if not quiet:
+            lines = opportunity_lines(results)
+            if lines:
+                print("\n".join([f"[{os.path.basename(pair.output_path)}]"] + lines), flush=True)
+        if writer is not None:
+            writer.write(sequence_rows(results, os.path.basename(pair.output_path)))
+
+    try:
+        while True:
+            for pair, monitor in monitors:
+                report_results(pair, monitor.poll())
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
+
+    report = AnalysisReport()
+    try:
+        for pair, monitor in monitors:
+            report_results(pair, monitor.finish())
+            if monitor.sequences == 0:
+                continue
+            lines, swing_success_percentage = summary_lines(
+                expected_swing, monitor.sequences, monitor.within_sd_sum, monitor.target_met,
+                monitor.opportunities, monitor.swing_successes)
+            header = (f"\n*******************  Processing files: {os.path.basename(pair.input_path)} and "
+                      f"{os.path.basename(pair.output_path)}  *******************\n")
+            print("\n".join([header] + lines))
+            report.add_file(monitor.opportunities, swing_success_percentage)
+    finally:
+        if writer is not None:
+            writer.close()
+            print(f"\nWrote {writer.rows_written} sequence results to: {results_path}")
+    return report
+
+
+def run_range(input_folder, output_folder, expected_swing, start_time, end_time, store=None, sectoken=None,
+              pair_pattern=DEFAULT_PAIR_KEY, results_path=None, quiet=False):
+    """
+    Evaluate the sequences between start_time and end_time, one sectoken at a time.
+
+    The folders' pairs are partitioned into the store first (a no-op for the
+    pairs already stored), then only the partitions that overlap the range
+    are opened. Prices come from the float32 store, as with --compact.
+    """
+    store = store or PartitionStore()
+    for pair in pair_files(input_folder, output_folder, pair_pattern):
+        store.import_pair(pair.input_path, pair.output_path)
+    tokens = store.range_tokens(start_time, end_time)
+    if sectoken is not None:
+        tokens = [name for name in tokens if name == sectoken]
+    span = " to ".join(format_seconds([start_time, end_time]))
+    print(f"Evaluating {len(tokens)} sectokens from {span}")
+
+    report = AnalysisReport()
+    writer = SequenceResultWriter(results_path) if results_path else None
+    try:
+        for name in tokens:
+            ticks, predictions = store.load_range(start_time, end_time, name, TICK_FIELDS, ANALYSIS_FIELDS)
+            if not len(predictions):
+                continue
+            sequence_lines, lines, token_report, results = get_opportunities(ticks, predictions, expected_swing)
+            header = f"\n*******************  Processing sectoken {name}: {span}  *******************\n"
+            print("\n".join([header] + ([] if quiet else sequence_lines) + lines))
+            report.merge(token_report)
+            if writer is not None:
+                writer.write(sequence_rows(results, name))
+    finally:
+        if writer is not None:
+            writer.close()
+            print(f"\nWrote {writer.rows_written} sequence results to: {results_path}")
+    return report
+
 
 class StockAnalyzer:
-    def __init__(self, input_folder, output_folder,expected_swing):
+    def __init__(self, input_folder, output_folder, expected_swing, workers=1,
+                 manifest=None, pair_pattern=DEFAULT_PAIR_KEY, results_path=None, quiet=False, compact=False):
         self.input_folder = input_folder
         self.output_folder = output_folder
         self.expected_swing = expected_swing
+        self.workers = workers
+        self.manifest = manifest
+        self.pair_pattern = pair_pattern
+        self.results_path = results_path
+        self.quiet = quiet
+        self.compact = compact
 
-        self.average_percentage = 0.0
-        self.successful_conditions = 0
-        self.swing_successful_conditions = 0
-
-        # Add counters for the report
-        self.no_swing_opportunities = 0
-        self.with_swing_opportunities = 0
-        self.swing_100_success = 0
-        self.swing_50_70_success = 0
-        self.swing_70_100_success = 0
-        self.swing_below_50_success = 0
+        # Counters for the report
+        self.report = AnalysisReport()
 
         # Process each file pair
         self.process_files()
         self.generate_report()
-    
+
     def generate_report(self):
-        # Generate final report
-        print("\n*************** Report ***************")
-        print(f"Files with No Swing Opportunities: {self.no_swing_opportunities}")
-        print(f"Files with Swing Opportunities: {self.with_swing_opportunities}")
-        print(f"Files with 100% Swing Success Percentage: {self.swing_100_success}")
-        print(f"Files with 50%-70% Swing Success Percentage: {self.swing_50_70_success}")
-        print(f"Files with 70%-100% Swing Success Percentage: {self.swing_70_100_success}")
-        print(f"Files with Below 50% Swing Success Percentage: {self.swing_below_50_success}")    
+        print_report(self.report)
 
     def process_files(self):
-        # List all files in the input folder
-        input_files = sorted(os.listdir(self.input_folder))
-        output_files = sorted(os.listdir(self.output_folder))
-
-        if len(input_files) != len(output_files):
-            print("Warning: Number of files in input and output folders do not match.")
-        
-        for input_file, output_file in zip(input_files, output_files):
-            input_path = os.path.join(self.input_folder, input_file)
-            output_path = os.path.join(self.output_folder, output_file)
-
-            print(f"\n*******************  Processing files: {input_file} and {output_file}  *******************\n")
-            
-            # Load and process the corresponding files
-            self.csv_file1 = input_path
-            self.csv_file2 = output_path
-            
-            self.successful_conditions = 0
-            self.swing_successful_conditions = 0
-            self.average_percentage = 0.0
-            self.load_data()
-            self.get_opportunities()
-
-    def load_data(self):
-        # Load the first CSV data into a DataFrame
-        self.df1 = pd.read_csv(self.csv_file1)
-        self.df1['arrivaltime'] = pd.to_datetime(self.df1['arrivaltime'], format='%H:%M:%S')
-
-        # Load the second CSV data into another DataFrame
-        self.df2 = pd.read_csv(self.csv_file2)
-        self.df2['arrivaltime'] = pd.to_datetime(self.df2['arrivaltime'], format='%H:%M:%S')
-
-    def get_opportunities(self):
-        # Your existing code for processing `df1` and `df2`
-        unique_file_seq_nums = self.df2['fileSeqNum'].dropna().unique().tolist()
-        oppcount = 0
-        for file_seq_num in unique_file_seq_nums:
-            sequence_entries = self.df2[self.df2['fileSeqNum'] == file_seq_num]
-            if not sequence_entries.empty:
-                start_time = sequence_entries['arrivaltime'].min()
-                end_time = sequence_entries['arrivaltime'].max()
-                filtered_df1 = self.df1[
-                    (self.df1['arrivaltime'] >= start_time) & 
-                    (self.df1['arrivaltime'] <= end_time)
-                ]
-                filtered_df2 = sequence_entries
-                start_value = filtered_df2['lastpredtrprc'].iloc[0]
-                filtered_df3 = filtered_df2.copy()
-                filtered_df3['swing'] = filtered_df2['lastpredtrprc'] - start_value
-                merged_df = pd.merge(
-                    filtered_df1[['arrivaltime', 'lasttrprc']], 
-                    filtered_df2[['arrivaltime', 'lastpredtrprc', 'StanDev']], 
-                    on='arrivaltime'
-                )
-                merged_df['upper_bound'] = merged_df['lastpredtrprc'] + 1.5 * merged_df['StanDev']
-                merged_df['lower_bound'] = merged_df['lastpredtrprc'] - 1.5 * merged_df['StanDev']
-                merged_df['within_range'] = (merged_df['lasttrprc'] >= merged_df['lower_bound']) & \
-                                            (merged_df['lasttrprc'] <= merged_df['upper_bound'])
-                percentage_within_range = merged_df['within_range'].mean() * 100
-                self.average_percentage += percentage_within_range
-                #print(f" percentage_within_range {percentage_within_range}")
-
-                if filtered_df2['lastpredtrprc'].iloc[-1] > filtered_df2['lastpredtrprc'].iloc[0]:
-                    max_predicted = filtered_df2['lastpredtrprc'].max()
-                    max_actual = filtered_df1['lasttrprc'].max()
-                    self.successful_conditions += max_actual >= max_predicted
-                else:
-                    min_predicted = filtered_df2['lastpredtrprc'].min()
-                    min_actual = filtered_df1['lasttrprc'].min()
-                    self.successful_conditions += min_actual <= min_predicted
-
-                max_possible_swing = filtered_df3['swing'].abs().max()
-                
-                swing_points = filtered_df3[
-                    (filtered_df3['swing'] >= self.expected_swing) | (filtered_df3['swing'] <= -self.expected_swing)
-                ]
-
-                if not swing_points.empty:
-                    oppcount += 1
-                    print(
-                        f"Swing detected at file sequence: {file_seq_num}\n"
-                        f"Maximum possible swing: {int(max_possible_swing)}"
-                    )
-
-                    if filtered_df2['lastpredtrprc'].iloc[-1] > filtered_df2['lastpredtrprc'].iloc[0]:
-                        max_predicted_swing = filtered_df2['lastpredtrprc'].max()
-                        max_actual_swing = filtered_df1['lasttrprc'].max()
-                        stop_loss = filtered_df2['lastpredtrprc'].iloc[0] - self.expected_swing
-
-                        # Check if actual swing hit stop loss before satisfying the success condition
-                        hit_stop_loss = any(filtered_df1['lasttrprc'] <= stop_loss)
-                        
-                        if hit_stop_loss:
-                            print(f"  !! NEGATIVE trade due to stop loss hit !!  ")
-                        elif not (max_actual_swing >= max_predicted_swing):
-                            print(f"  !! NEGATIVE trade - could not meet target!!  ")
-                        else:
-                            self.swing_successful_conditions += max_actual_swing >= max_predicted_swing
-                           
-                    else:
-                        min_predicted_swing = filtered_df2['lastpredtrprc'].min()
-                        min_actual_swing = filtered_df1['lasttrprc'].min()
-                        stop_loss = filtered_df2['lastpredtrprc'].iloc[0] + self.expected_swing
-
-                        # Check if actual swing hit stop loss before satisfying the success condition
-                        hit_stop_loss = any(filtered_df1['lasttrprc'] >= stop_loss)
-
-                        if hit_stop_loss:
-                            print(f"  !! NEGATIVE trade due to stop loss hit !!  ")
-                        elif not (min_actual_swing <= min_predicted_swing):
-                            print(f"  !! NEGATIVE trade - could not meet target!!  ")
-                        else:
-                            self.swing_successful_conditions += min_actual_swing <= min_predicted_swing
-
-                    
-
-
-        print(f"Expected Swing: {self.expected_swing}")
-        print(f"Total opportunities: {oppcount}")
-        within_sd = self.average_percentage / len(unique_file_seq_nums)
-        print(f"Average percentage within SD range: {within_sd:.2f}%")
-        success_percentage = (self.successful_conditions / len(unique_file_seq_nums)) * 100
-        print(f"Prediction success percentage: {success_percentage:.2f}%")
+        pairs = pair_files(self.input_folder, self.output_folder, self.pair_pattern)
+        with_rows = self.results_path is not None
+        params = {'mode': 'analyze', 'version': ANALYSIS_VERSION, 'expected_swing': self.expected_swing,
+                  'rows': with_rows, 'compact': self.compact}
 
-        if oppcount == 0:
-            swing_success_percentage = 0
-            self.no_swing_opportunities += 1
-            print("No swing opportunity.")
+        # Results come back in pair order, so the printed log matches the
+        # serial run whatever the number of workers or cached pairs
+        results = map_cached_pairs(
+            analyze_file_pair, pairs, (self.expected_swing, with_rows, self.compact), params,
+            encode=encode_analysis, decode=decode_analysis,
+            workers=self.workers, manifest=self.manifest)
+
+        if with_rows:
+            with SequenceResultWriter(self.results_path) as writer:
+                self.collect_results(results, writer)
+            print(f"\nWrote {writer.rows_written} sequence results to: {self.results_path}")
         else:
-            swing_success_percentage = (self.swing_successful_conditions / oppcount) * 100
-            print(f"Swing success percentage: {swing_success_percentage:.2f}%")
-            self.with_swing_opportunities += 1
-            if swing_success_percentage == 100:
-                self.swing_100_success += 1
-            elif 50 <= swing_success_percentage < 70:
-                self.swing_50_70_success += 1
-            elif 70 <= swing_success_percentage < 100:
-                self.swing_70_100_success += 1
-            else:
-                self.swing_below_50_success += 1
+            self.collect_results(results)
+
+    def collect_results(self, results, writer=None):
+        for result in results:
+            lines = [result['header']]
+            if not self.quiet:
+                lines += result['sequence_lines']
+            print("\n".join(lines + result['summary_lines']))
+            self.report.merge(result['report'])
+            if writer is not None:
+                writer.write(result['rows'])
 
 
 if __name__ == '__main__':
-    if len(sys.argv) < 4:
-        print("Usage: python script.py <csv_file1_path> <csv_file2_path> <expected swing>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Evaluate prediction files against tick data.')
+    parser.add_argument('input_folder', type=str, help='Folder with the tick CSV files')
+    parser.add_argument('output_folder', type=str, help='Folder with the prediction CSV files')
+    parser.add_argument('expected_swing', type=float, help='Swing (in price points) that counts as an opportunity')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes used to evaluate file pairs')
+    parser.add_argument('--sweep-swing', type=str,
+                        help='Expected swings to sweep, as start:stop:step or a comma separated list')
+    parser.add_argument('--sweep-band', type=str,
+                        help='SD band multipliers to sweep, as start:stop:step or a comma separated list')
+    parser.add_argument('--sweep-prob', type=str,
+                        help='High_Prob/Low_Prob thresholds to sweep, as start:stop:step or a comma separated list')
+    parser.add_argument('--sweep-output', type=str, help='CSV file to write the sweep table to')
+    parser.add_argument('--manifest', type=str,
+                        help='JSON manifest of analysed file pairs; only changed pairs are re-analysed')
+    parser.add_argument('--pair-key', type=str, default=DEFAULT_PAIR_KEY,
+                        help='Regex taking the key that pairs tick and prediction file names')
+
+    parser.add_argument('--results', type=str,
+                        help='CSV or Parquet file receiving one row per evaluated sequence')
+    parser.add_argument('--quiet', action='store_true',
+                        help='Only print the per-file summaries, not every detected swing')
+    parser.add_argument('--compact', action='store_true',
+                        help='Hold prices as float32 (about half the memory); SD percentages may '
+                             'differ in the last decimals')
+
+    parser.add_argument('--range', nargs=2, metavar=('START', 'END'),
+                        help="Only evaluate sequences between two timestamps (e.g. '2024-04-30 10:00'), "
+                             "reading the date/sectoken partition store")
+    parser.add_argument('--store', type=str, default=DEFAULT_STORE_DIR, help='Root folder of the partition store')
+    parser.add_argument('--token', type=str, help='Only evaluate this sectoken in --range mode')
+
+    parser.add_argument('--live', action='store_true',
+                        help='Follow files that are still being written and evaluate sequences as they close')
+    parser.add_argument('--poll-interval', type=float, default=5.0,
+                        help='Seconds between reads of the followed files in --live mode')
+
+    args = parser.parse_args()
+    if args.live:
+        report = run_live(args.input_folder, args.output_folder, args.expected_swing, args.poll_interval,
+                          args.pair_key, args.results, args.quiet)
+        print_report(report)
+        sys.exit(0)
+
+    if args.range:
+        start_time, end_time = (parse_timestamp(text) for text in args.range)
+        report = run_range(args.input_folder, args.output_folder, args.expected_swing, start_time, end_time,
+                           PartitionStore(args.store), args.token, args.pair_key, args.results, args.quiet)
+        print_report(report)
+        sys.exit(0)
+
+    manifest = AnalysisManifest(args.manifest) if args.manifest else None
+
+    if args.sweep_swing or args.sweep_band or args.sweep_prob:
+        swings = parse_grid(args.sweep_swing) if args.sweep_swing else [args.expected_swing]
+        bands = parse_grid(args.sweep_band) if args.sweep_band else [1.5]
+        probabilities = parse_grid(args.sweep_prob) if args.sweep_prob else [None]
 
-    input_folder_path = sys.argv[1]
-    output_folder_path = sys.argv[2]
-    expected_swing = float(sys.argv[3])
+        summary = run_sweep(args.input_folder, args.output_folder, swings, bands, probabilities,
+                            args.workers, manifest, args.pair_key)
+        print(summary.to_string(index=False))
+        if args.sweep_output:
+            summary.to_csv(args.sweep_output, index=False)
+            print(f"Sweep table saved to: {args.sweep_output}")
+        sys.exit(0)
 
     # Instantiate and run the processor
-    processor = StockAnalyzer(input_folder_path, output_folder_path, expected_swing)
+    processor = StockAnalyzer(args.input_folder, args.output_folder, args.expected_swing, args.workers,
+                              manifest, args.pair_key, args.results, args.quiet, args.compact)
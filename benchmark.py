@@ -0,0 +1,245 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from synthetic_data import generate_dataset
+from tick_loader import PREDICTION_COLUMNS, TICK_COLUMNS, load_csv
+from column_cache import ColumnCache
+
+
+# Named data set sizes as (trading days, tokens)
+SIZES = {
+    'day': (1, 1),
+    'week': (5, 5),
+    'month': (21, 20),
+    'quarter': (63, 100),
+    'year': (250, 500),
+}
+
+BENCHMARKS = ('load', 'load_cached', 'convert', 'split', 'merge', 'analyze', 'plot')
+
+
+def parse_size(text):
+    """
+    A named size from SIZES or 'DAYSxTOKENS', e.g. '5x10'.
+    """
+    if text in SIZES:
+        return text, SIZES[text]
+    days, tokens = text.lower().split('x')
+    return text, (int(days), int(tokens))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def csv_files(folder):
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith('.csv'))
+
+
+def bench_load(data, work_dir):
+    for path in csv_files(data['ticks']):
+        load_csv(path, TICK_COLUMNS, cache=False)
+    for path in csv_files(data['predictions']):
+        load_csv(path, PREDICTION_COLUMNS, cache=False)
+
+
+def bench_load_cached(data, work_dir):
+    cache = ColumnCache(os.path.join(work_dir, 'column_cache'))
+    for path in csv_files(data['ticks']):
+        load_csv(path, TICK_COLUMNS, cache=cache)
+    for path in csv_files(data['predictions']):
+        load_csv(path, PREDICTION_COLUMNS, cache=cache)
+
+
+def bench_convert(data, work_dir):
+    from convert_csv import convert_csv
+    convert_csv(data['raw'], os.path.join(work_dir, 'converted'))
+
+
+def bench_split(data, work_dir):
+    from convert_csv import split_csv
+    split_csv(csv_files(data['ticks'])[0], os.path.join(work_dir, 'split'), 3600, 1800)
+
+
+def bench_merge(data, work_dir):
+    from mergeFiles import merge_csv_files
+    split_dir = os.path.join(work_dir, 'split')
+    if not os.path.isdir(split_dir):
+        bench_split(data, work_dir)
+    merge_csv_files(split_dir, os.path.join(work_dir, 'merged.csv'))
+
+
+def bench_analyze(data, work_dir, expected_swing=100, workers=1):
+    from analyze_pred_csv import StockAnalyzer
+    StockAnalyzer(data['ticks'], data['predictions'], expected_swing, workers, quiet=True)
+
+
+def bench_plot(data, work_dir, sequences=20):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtWidgets import QApplication
+    import drawGraph
+    from partition_store import PartitionStore
+
+    app = QApplication.instance() or QApplication([])
+    # Anything the viewer stores stays in the work dir, never in the user's store
+    store = PartitionStore(os.path.join(work_dir, 'partitions'))
+    widget = drawGraph.PlotWidget(csv_files(data['ticks'])[0], csv_files(data['predictions'])[0], store=store)
+    # Loading and plotting run in the background; wait for each result
+    widget.wait_idle()
+    # Step through sequences with Next, as a user holding the key would
+    for _ in range(sequences):
+        widget.increment_sequence_number()
+        widget.wait_idle()
+    widget.close()
+    app.processEvents()
+
+
+def plotting_available():
+    try:
+        import PyQt6.QtWidgets  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def run_benchmark(name, function, data, work_dir, repeat):
+    """
+    Time `function` `repeat` times with its console output discarded.
+    """
+    timings = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            function(data, work_dir)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_size(label, days, tokens, benchmarks, repeat, root, seed=0, analyze_workers=1):
+    """
+    Generate one data set and run the selected benchmarks on it.
+    """
+    data_dir = os.path.join(root, label)
+    start = time.perf_counter()
+    data = generate_dataset(data_dir, days, tokens, seed, raw='convert' in benchmarks)
+    generate_seconds = time.perf_counter() - start
+
+    functions = {
+        'load': bench_load,
+        'load_cached': bench_load_cached,
+        'convert': bench_convert,
+        'split': bench_split,
+        'merge': bench_merge,
+        'analyze': lambda d, w: bench_analyze(d, w, workers=analyze_workers),
+        'plot': bench_plot,
+    }
+
+    size = {'size': label, 'days': days, 'tokens': tokens, 'files': data['files'],
+            'tick_rows': data['tick_rows'], 'prediction_rows': data['prediction_rows'], 'bytes': data['bytes']}
+    results = [dict(size, benchmark='generate', status='ok', timings=[generate_seconds])]
+
+    for name in benchmarks:
+        work_dir = os.path.join(data_dir, 'work_' + name)
+        os.makedirs(work_dir, exist_ok=True)
+        result = dict(size, benchmark=name)
+        if name == 'plot' and not plotting_available():
+            result.update(status='skipped', reason='PyQt6 is not installed', timings=[])
+        else:
+            if name == 'load_cached':
+                # Fill the cache first so the timings measure warm loads
+                bench_load_cached(data, work_dir)
+            result.update(status='ok', timings=run_benchmark(name, functions[name], data, work_dir, repeat))
+        shutil.rmtree(work_dir, ignore_errors=True)
+        results.append(result)
+
+    for result in results:
+        if result['timings']:
+            result['min'] = min(result['timings'])
+            result['median'] = float(np.median(result['timings']))
+    return results
+
+
+def compare(results, baseline_path):
+    """
+    Table of median timings against a previous results file.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(r['size'], r['benchmark']): r.get('median') for r in baseline['results']}
+    rows = []
+    for result in results:
+        old = before.get((result['size'], result['benchmark']))
+        new = result.get('median')
+        rows.append({'size': result['size'], 'benchmark': result['benchmark'], 'baseline_s': old, 'current_s': new,
+                     'ratio': new / old if old and new else None})
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time loading, conversion, analysis and plotting on synthetic data.')
+    parser.add_argument('--sizes', type=str, default='day,week',
+                        help=f"Comma separated sizes: {', '.join(SIZES)} or DAYSxTOKENS")
+    parser.add_argument('--benchmarks', type=str, default=','.join(BENCHMARKS),
+                        help=f"Comma separated benchmarks: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per benchmark')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes for the analyze benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic data')
+    parser.add_argument('--work-dir', type=str, help='Folder for the generated data (default: a temporary folder)')
+    parser.add_argument('--output', type=str, default='benchmark_results.json', help='JSON file receiving the results')
+    parser.add_argument('--compare', type=str, help='Previous results file to compare against')
+
+    args = parser.parse_args()
+    # analyze and plot time the CSV parse; warm loads are measured by load_cached
+    os.environ['PYCODES_CACHE'] = '0'
+    benchmarks = [name for name in args.benchmarks.split(',') if name]
+    unknown = set(benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    root = args.work_dir or tempfile.mkdtemp(prefix='pycodes_bench_')
+    results = []
+    try:
+        for text in args.sizes.split(','):
+            label, (days, tokens) = parse_size(text)
+            print(f"Size {label}: {days} days x {tokens} tokens")
+            for result in run_size(label, days, tokens, benchmarks, args.repeat, root, args.seed, args.workers):
+                timing = f"{result['median']:.3f}s" if 'median' in result else result['status']
+                print(f"  {result['benchmark']:<12} {timing}")
+                results.append(result)
+            shutil.rmtree(os.path.join(root, label), ignore_errors=True)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {args.output}")
+
+    if args.compare:
+        print(compare(results, args.compare).to_string(index=False))
@@ -0,0 +1,38 @@
+import threading
+
+
+class TaskCancelled(Exception):
+    """
+    Raised inside a task whose request was cancelled or superseded.
+    """
+
+
+class CancelToken:
+    """
+    Handed to every task so that long loops can stop early and report progress.
+
+    Qt-free, so the loaders can run in headless scripts and worker processes.
+    """
+
+    def __init__(self, progress_callback=None):
+        self.event = threading.Event()
+        self.progress_callback = progress_callback
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def check(self):
+        """
+        Raise TaskCancelled if the task should stop.
+        """
+        if self.event.is_set():
+            raise TaskCancelled()
+
+    def progress(self, percent):
+        self.check()
+        if self.progress_callback is not None:
+            self.progress_callback(int(percent))
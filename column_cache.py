@@ -0,0 +1,206 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'PYCODES_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'pycodes', 'columns'))
+DEFAULT_CACHE_BYTES = int(os.environ.get('PYCODES_CACHE_BYTES', 4 * 1024 ** 3))
+
+# Bumped whenever the parsed representation changes (2: dated arrivaltime,
+# 3: day-first dates parsed as such)
+CACHE_FORMAT = 3
+
+
+class ColumnCache:
+    """
+    On-disk columnar cache of parsed CSV files.
+
+    Every source file gets a directory keyed by its absolute path, size,
+    mtime and the cache format, holding one .npy file per parsed column (categoricals as codes plus
+    categories) and a meta.json. Cached columns are memory-mapped on load, so
+    reopening a file costs a few page faults instead of a CSV parse, and
+    columns that were never requested are simply not cached yet. A running
+    total of the entry sizes is kept in index.json; only when it exceeds
+    `max_bytes` is the directory scanned and the least recently used entries
+    removed.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def entry_dir(self, path):
+        stat = os.stat(path)
+        key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{CACHE_FORMAT}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest())
+
+    def _read_meta(self, entry):
+        try:
+            with open(os.path.join(entry, 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, entry, meta):
+        tmp_path = os.path.join(entry, f'meta.json.{os.getpid()}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(entry, 'meta.json'))
+
+    def header(self, path):
+        """
+        Column names of the source file, from the cache when possible.
+        """
+        meta = self._read_meta(self.entry_dir(path))
+        if meta is not None and 'header' in meta:
+            return meta['header']
+        return list(pd.read_csv(path, nrows=0).columns)
+
+    def cached_columns(self, path):
+        meta = self._read_meta(self.entry_dir(path))
+        return set(meta['columns']) if meta else set()
+
+    def load(self, path, columns):
+        """
+        Memory-mapped DataFrame of `columns`, or None unless all are cached.
+        """
+        entry = self.entry_dir(path)
+        meta = self._read_meta(entry)
+        if meta is None or any(column not in meta['columns'] for column in columns):
+            return None
+
+        data = {}
+        try:
+            for column in columns:
+                info = meta['columns'][column]
+                values = np.load(os.path.join(entry, info['file']), mmap_mode='r')
+                if info['kind'] == 'category':
+                    categories = np.load(os.path.join(entry, info['categories']), allow_pickle=False)
+                    values = pd.Categorical.from_codes(np.asarray(values), categories)
+                data[column] = values
+        except (OSError, ValueError):
+            # Entry evicted or half written by another process; parse again
+            return None
+
+        # Mark the entry as recently used for eviction
+        os.utime(os.path.join(entry, 'meta.json'))
+        return pd.DataFrame(data, copy=False)
+
+    def store(self, path, df, header=None):
+        """
+        Add the columns of a freshly parsed DataFrame to the cache.
+        """
+        entry = self.entry_dir(path)
+        os.makedirs(entry, exist_ok=True)
+        meta = self._read_meta(entry) or {'source': os.path.abspath(path), 'rows': len(df), 'columns': {}}
+        old_bytes = meta.get('bytes', 0)
+        if header is not None:
+            meta['header'] = list(header)
+
+        for column in df.columns:
+            values = df[column]
+            safe_name = hashlib.sha1(column.encode()).hexdigest()[:16]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                categories = np.asarray(values.cat.categories)
+                if categories.dtype == object:
+                    categories = categories.astype(str)
+                info = {'kind': 'category', 'file': f'{safe_name}.codes.npy',
+                        'categories': f'{safe_name}.categories.npy'}
+                self._save_array(entry, info['categories'], categories)
+                self._save_array(entry, info['file'], values.cat.codes.to_numpy())
+            else:
+                array = values.to_numpy()
+                if array.dtype == object:
+                    # Only numeric and categorical columns are memory-mappable
+                    continue
+                info = {'kind': 'array', 'file': f'{safe_name}.npy'}
+                self._save_array(entry, info['file'], array)
+            meta['columns'][column] = info
+
+        meta['bytes'] = self._entry_bytes(entry)
+        self._write_meta(entry, meta)
+
+        # Only the running total is updated per store; the directory is
+        # scanned once it crosses max_bytes (or when there is no index yet)
+        total = self._read_total()
+        if total is None or total + meta['bytes'] - old_bytes > self.max_bytes:
+            self.evict(keep=entry)
+        else:
+            self._write_total(total + meta['bytes'] - old_bytes)
+
+    def _save_array(self, entry, file_name, array):
+        fd, tmp_path = tempfile.mkstemp(dir=entry, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+        os.replace(tmp_path, os.path.join(entry, file_name))
+
+    def _entry_bytes(self, entry):
+        return sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+
+    def _read_total(self):
+        try:
+            with open(os.path.join(self.cache_dir, 'index.json')) as f:
+                return int(json.load(f)['bytes'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_total(self, total):
+        tmp_path = os.path.join(self.cache_dir, f'index.json.{os.getpid()}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'bytes': total}, f)
+        os.replace(tmp_path, os.path.join(self.cache_dir, 'index.json'))
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+
+        The entry `keep` (the one just stored) is never removed, so a file
+        larger than max_bytes is still cached until the next store. The
+        running total in index.json is rewritten from the scan.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(entry):
+                continue
+            meta = self._read_meta(entry)
+            try:
+                # Entries written before sizes were recorded are measured
+                size = meta['bytes'] if meta and 'bytes' in meta else self._entry_bytes(entry)
+                last_used = os.path.getmtime(os.path.join(entry, 'meta.json'))
+            except OSError:
+                continue
+            entries.append((last_used, size, entry))
+            total += size
+
+        for last_used, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+        self._write_total(total)
+
+
+_default_cache = None
+
+
+def default_cache():
+    """
+    Process-wide cache, or None when disabled with PYCODES_CACHE=0.
+    """
+    global _default_cache
+    if os.environ.get('PYCODES_CACHE', '1') == '0':
+        return None
+    if _default_cache is None:
+        _default_cache = ColumnCache()
+    return _default_cache
@@ -0,0 +1,242 @@
+import numpy as np
+import pandas as pd
+
+from tick_loader import load_csv
+
+# Storage dtypes of the compact model
+TIME_DTYPE = np.int64
+PRICE_DTYPE = np.float32
+SEQ_DTYPE = np.int32
+TOKEN_DTYPE = np.int16
+PROB_DTYPE = np.float32
+
+# Storage dtype of every kind of field
+DTYPES = {'time': TIME_DTYPE, 'price': PRICE_DTYPE, 'prob': PROB_DTYPE, 'seq': SEQ_DTYPE, 'token': TOKEN_DTYPE}
+
+# fileSeqNum of rows that belong to no sequence (NaN in the file)
+NO_SEQUENCE = -1
+
+# Token code of rows with a blank sectoken, and the name their rows are grouped under
+NO_TOKEN_CODE = -1
+NO_TOKEN = '-'
+
+
+def token_groups(codes, tokens):
+    """
+    Row positions of every sectoken, each in file order, keyed by name.
+
+    `codes` index into `tokens`; rows with a blank sectoken (NO_TOKEN_CODE)
+    are grouped under NO_TOKEN rather than under any real token.
+    """
+    codes = np.asarray(codes)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    names = [str(name) for name in tokens]
+    return {NO_TOKEN if codes[rows[0]] == NO_TOKEN_CODE else names[codes[rows[0]]]: rows
+            for rows in np.split(order, bounds) if len(rows)}
+
+
+class ColumnSet:
+    """
+    Equal-length numpy columns held in __slots__, one attribute per field.
+
+    Subclasses list their fields as (attribute, CSV column, kind); fields
+    that were not loaded are None. Times are int64 seconds since 1970-01-01
+    (time-only files: since midnight), prices and probabilities float32,
+    sequence ids int32 (NO_SEQUENCE for rows outside any sequence) and
+    tokens int16 codes into `tokens`.
+    from_frame() and to_frame() convert from and to the DataFrames used by
+    the rest of the scripts; to_frame() does not copy the numeric columns.
+    """
+
+    __slots__ = ('tokens',)
+    FIELDS = ()
+
+    def __init__(self, tokens=None, **columns):
+        unknown = set(columns) - {name for name, _, _ in self.FIELDS}
+        if unknown:
+            raise TypeError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        self.tokens = None if tokens is None else np.asarray(tokens, dtype=object)
+        for name, _, kind in self.FIELDS:
+            values = columns.get(name)
+            setattr(self, name, None if values is None else np.asarray(values, dtype=DTYPES[kind]))
+
+    def __len__(self):
+        for name in self.fields():
+            return len(getattr(self, name))
+        return 0
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self)} rows: {', '.join(self.fields())})"
+
+    def fields(self):
+        """
+        Names of the loaded fields.
+        """
+        return [name for name, _, _ in self.FIELDS if getattr(self, name) is not None]
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.fields())
+
+    @classmethod
+    def csv_columns(cls, fields):
+        names = {name: column for name, column, _ in cls.FIELDS}
+        return [names[field] for field in fields]
+
+    def take(self, rows):
+        """
+        A new set with the given rows (a slice, positions or a boolean mask).
+        """
+        return type(self)(self.tokens, **{name: getattr(self, name)[rows] for name in self.fields()})
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Convert a DataFrame with the CSV column names (arrivaltime in seconds).
+        """
+        columns = {}
+        tokens = None
+        for name, column, kind in cls.FIELDS:
+            if column not in df.columns:
+                continue
+            values = df[column]
+            if kind == 'token':
+                categorical = pd.Categorical(values.astype(str) if not isinstance(
+                    values.dtype, pd.CategoricalDtype) else values)
+                tokens = categorical.categories.to_numpy(dtype=object)
+                columns[name] = categorical.codes
+            elif kind == 'seq':
+                numbers = values.to_numpy(dtype=float)
+                columns[name] = np.where(np.isnan(numbers), NO_SEQUENCE, numbers)
+            else:
+                columns[name] = values.to_numpy()
+        return cls(tokens, **columns)
+
+    def to_frame(self):
+        """
+        DataFrame with the CSV column names, as load_csv() returns it.
+        """
+        data = {}
+        for name, column, kind in self.FIELDS:
+            values = getattr(self, name)
+            if values is None:
+                continue
+            if kind == 'token':
+                data[column] = pd.Categorical.from_codes(values, self.tokens)
+            elif kind == 'seq':
+                data[column] = self.sequence_numbers(values).astype(np.float32)
+            else:
+                data[column] = values
+        return pd.DataFrame(data, copy=False)
+
+    @staticmethod
+    def sequence_numbers(seq):
+        """
+        Sequence ids as floats with NaN for NO_SEQUENCE, as sequence_bounds() expects.
+        """
+        return np.where(seq == NO_SEQUENCE, np.nan, seq.astype(float))
+
+    def token_groups(self):
+        """
+        token_groups() of the set's sectokens; one NO_TOKEN group when they were not loaded.
+        """
+        if self.token is None:
+            return {NO_TOKEN: np.arange(len(self))}
+        return token_groups(self.token, self.tokens)
+
+    @classmethod
+    def concatenate(cls, parts):
+        """
+        Stack several sets (e.g. the days of a month) into one.
+
+        Token codes are remapped onto the union of the parts' tokens;
+        blank sectokens stay NO_TOKEN_CODE.
+        """
+        parts = list(parts)
+        if not parts:
+            return cls()
+        fields = parts[0].fields()
+        kinds = {name: kind for name, _, kind in cls.FIELDS}
+        columns = {name: [] for name in fields}
+        tokens = None
+        if any(part.tokens is not None for part in parts):
+            tokens = np.unique(np.concatenate([part.tokens for part in parts if part.tokens is not None]))
+        for part in parts:
+            for name in fields:
+                values = getattr(part, name)
+                if kinds[name] == 'token' and tokens is not None:
+                    remap = np.searchsorted(tokens, part.tokens)
+                    values = np.where(values == NO_TOKEN_CODE, NO_TOKEN_CODE,
+                                      remap[np.maximum(values, 0)]).astype(TOKEN_DTYPE)
+                columns[name].append(values)
+        return cls(tokens, **{name: np.concatenate(values) for name, values in columns.items()})
+
+
+class TickData(ColumnSet):
+    """
+    Ticks of a converted tick file.
+    """
+
+    __slots__ = ('time', 'price', 'token')
+    FIELDS = (
+        ('time', 'arrivaltime', 'time'),
+        ('price', 'lasttrprc', 'price'),
+        ('token', 'sectoken', 'token'),
+    )
+
+
+class PredictionData(ColumnSet):
+    """
+    Rows of a prediction file.
+    """
+
+    __slots__ = ('time', 'token', 'price', 'sd', 'low', 'high', 'cluster_high', 'high_prob',
+                 'cluster_low', 'low_prob', 'max_centroid', 'min_centroid', 'cluster_idx',
+                 'cluster_prob', 'seq')
+    FIELDS = (
+        ('time', 'arrivaltime', 'time'),
+        ('token', 'sectoken', 'token'),
+        ('price', 'lastpredtrprc', 'price'),
+        ('sd', 'StanDev', 'price'),
+        ('low', 'low_prc', 'price'),
+        ('high', 'high_prc', 'price'),
+        ('cluster_high', 'ClusterCentroidHigh', 'price'),
+        ('high_prob', 'High_Prob', 'prob'),
+        ('cluster_low', 'ClusterCentroidLow', 'price'),
+        ('low_prob', 'Low_Prob', 'prob'),
+        ('max_centroid', 'Max_Centroid', 'price'),
+        ('min_centroid', 'Min_Centroid', 'price'),
+        ('cluster_idx', 'clusterIdx', 'seq'),
+        ('cluster_prob', 'clusterProb', 'prob'),
+        ('seq', 'fileSeqNum', 'seq'),
+    )
+
+
+def frame_token_groups(df):
+    """
+    token_groups() of a DataFrame's sectoken column; one NO_TOKEN group without one.
+    """
+    if 'sectoken' not in df.columns:
+        return {NO_TOKEN: np.arange(len(df))}
+    tokens = pd.Categorical(df['sectoken'])
+    return token_groups(tokens.codes, tokens.categories)
+
+
+# Fields each consumer reads, as in tick_loader.TICK_COLUMNS / PREDICTION_COLUMNS
+TICK_FIELDS = ['time', 'price']
+PREDICTION_FIELDS = ['time', 'price', 'sd', 'seq']
+
+
+def load_tick_data(path, fields=TICK_FIELDS, engine=None):
+    """
+    Load the given fields of a tick file into a TickData.
+    """
+    return TickData.from_frame(load_csv(path, TickData.csv_columns(fields), engine))
+
+
+def load_prediction_data(path, fields=PREDICTION_FIELDS, engine=None):
+    """
+    Load the given fields of a prediction file into a PredictionData.
+    """
+    return PredictionData.from_frame(load_csv(path, PredictionData.csv_columns(fields), engine))
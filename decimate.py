@@ -0,0 +1,154 @@
+import numpy as np
+
+
+def minmax_decimate(x, y, buckets, x_min=None, x_max=None, always=False):
+    """
+    Reduce a series to the minimum and maximum of each of `buckets` buckets.
+
+    When x is sorted the buckets are equal slices of [x_min, x_max] (the
+    visible range, one bucket per pixel column) and points outside it are
+    dropped, keeping one neighbour on each side so the line still runs to
+    the edge. Unsorted series (overlapping prediction sequences in file
+    order) are bucketed by position instead. Every peak and trough that
+    would be visible survives, in the original order, and a series that
+    already fits in 2 * buckets points is returned unchanged (unless
+    `always`, for pieces of a longer series).
+
+    Returns the positions of the kept points.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    buckets = max(int(buckets), 1)
+
+    if n and np.all(x[1:] >= x[:-1]):
+        lo = 0 if x_min is None else max(np.searchsorted(x, x_min, side='left') - 1, 0)
+        hi = n if x_max is None else min(np.searchsorted(x, x_max, side='right') + 1, n)
+        if hi - lo <= 2 * buckets and not always:
+            return np.arange(lo, hi)
+        x0 = x[lo] if x_min is None else x_min
+        x1 = x[hi - 1] if x_max is None else x_max
+        span = (x1 - x0) or 1.0
+        bucket = np.clip(np.floor((x[lo:hi] - x0) / span * buckets), -1, buckets).astype(np.int64)
+    else:
+        lo, hi = 0, n
+        if n <= 2 * buckets and not always:
+            return np.arange(n)
+        bucket = np.arange(n) * buckets // n
+
+    # Buckets are contiguous runs of rows, so their extremes are segment
+    # reductions; fmin/fmax skip NaN prices
+    values = y[lo:hi]
+    starts = np.flatnonzero(np.diff(bucket, prepend=bucket[0] - 1))
+    counts = np.diff(np.append(starts, len(values)))
+    segment = np.repeat(np.arange(len(starts)), counts)
+    keep = [np.array([0, hi - lo - 1])]
+    for reduce in (np.fmin, np.fmax):
+        hits = np.flatnonzero(values == reduce.reduceat(values, starts)[segment])
+        # First row of each bucket that reaches the extreme
+        keep.append(hits[np.unique(segment[hits], return_index=True)[1]])
+    return np.unique(np.concatenate(keep)) + lo
+
+
+class LineDecimator:
+    """
+    Show min/max decimated copies of Line2D data on an axes.
+
+    set_data() keeps the full series of a line and draws only about two
+    points per pixel column of its visible x range. The lines are
+    re-decimated whenever the x limits change (zoom, pan, autoscale) or the
+    canvas is resized, so a full session and a 30-second window cost about
+    the same to draw.
+    """
+
+    def __init__(self, ax, points_per_pixel=1.0):
+        self.ax = ax
+        self.points_per_pixel = points_per_pixel
+        self.data = {}
+        # View each line was last decimated for, to skip repeated callbacks,
+        # and the positions it kept
+        self.views = {}
+        self.keeps = {}
+        ax.callbacks.connect('xlim_changed', self.on_limits_changed)
+        self.resize_id = ax.figure.canvas.mpl_connect('resize_event', self.on_limits_changed)
+
+    def set_data(self, line, x, y, refresh=True):
+        """
+        Give `line` new full-resolution data and show its decimated copy.
+
+        With refresh=False the line keeps the full data until refresh() is
+        called, so that relim() and autoscaling see the whole series first.
+        """
+        self.data[line] = (np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        self.views.pop(line, None)
+        self.keeps.pop(line, None)
+        if refresh:
+            self.refresh(line)
+        else:
+            line.set_data(*self.data[line])
+
+    def restore(self):
+        """
+        Put the full data back on every line, e.g. before relim().
+        """
+        for line, data in self.data.items():
+            line.set_data(*data)
+        self.views.clear()
+        self.keeps.clear()
+
+    def buckets(self):
+        return max(int(self.ax.bbox.width * self.points_per_pixel), 1)
+
+    def view(self):
+        x_min, x_max = sorted(self.ax.get_xlim())
+        return (x_min, x_max, self.buckets())
+
+    def extend(self, line, x, y):
+        """
+        Grow the data of `line` to (x, y), which start with its current data.
+
+        For time-sorted data in an unchanged view, the buckets before the
+        one holding the previous last point are complete: only that bucket
+        and the new points are decimated, so appending costs the new points
+        rather than the whole series. Anything else is a set_data().
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        old_x, _ = self.data.get(line, (None, None))
+        keep = self.keeps.get(line)
+        view = self.view()
+        n = 0 if old_x is None else len(old_x)
+        if (keep is None or self.views.get(line) != view or n == 0 or len(x) < n
+                or np.any(np.diff(x[n - 1:]) < 0)):
+            self.set_data(line, x, y)
+            return
+        self.data[line] = (x, y)
+        if len(x) == n:
+            return
+        x_min, x_max, buckets = view
+        width = (x_max - x_min) / buckets
+        # Start one bucket early so rounding never splits the last one
+        bucket = np.floor((x[n - 1] - x_min) / width) if width else 0
+        start = int(np.searchsorted(x, x_min + (bucket - 1) * width, side='left'))
+        tail = minmax_decimate(x[start:], y[start:], buckets, x_min, x_max, always=True) + start
+        keep = np.concatenate([keep[keep < start], tail])
+        self.keeps[line] = keep
+        line.set_data(x[keep], y[keep])
+
+    def refresh(self, *lines):
+        """
+        Re-decimate `lines` (all managed lines by default) for the current view.
+        """
+        view = self.view()
+        x_min, x_max, buckets = view
+        for line in lines or list(self.data):
+            if self.views.get(line) == view:
+                continue
+            self.views[line] = view
+            x, y = self.data[line]
+            keep = minmax_decimate(x, y, buckets, x_min, x_max)
+            self.keeps[line] = keep
+            line.set_data(x[keep], y[keep])
+
+    def on_limits_changed(self, *args):
+        self.refresh()
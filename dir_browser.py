@@ -0,0 +1,273 @@
+import os
+import re
+import bisect
+
+from PyQt6.QtCore import QObject, QThreadPool
+
+from payload_cache import PayloadCache
+from qt_workers import TaskRunner
+
+
+# Loaded files kept around the current one, and how many are read ahead of
+# (and behind) it in the direction of travel
+DEFAULT_CACHED_FILES = 8
+PREFETCH_AHEAD = 2
+PREFETCH_BEHIND = 1
+
+
+def natural_sort_key(s, _nsre=re.compile('([0-9]+)')):
+    return [int(text) if text.isdigit() else text.lower() for text in re.split(_nsre, s)]
+
+
+def file_key(path):
+    """
+    Cache key of a file (or a tuple of files) as it is now, so a rewritten file is loaded again.
+    """
+    if isinstance(path, tuple):
+        return tuple(file_key(part) for part in path)
+    if path is None:
+        return None
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+class DirectoryIndex:
+    """
+    Sorted listing of the CSV files of one directory.
+
+    The directory is listed once; refresh() only lists it again when the
+    directory's mtime moved (a file was added, removed or renamed) and then
+    merges the difference into the sorted names instead of sorting all of
+    them, so browsing a folder of tens of thousands of split windows costs
+    one stat per step.
+    """
+
+    def __init__(self, directory, sort_key=natural_sort_key, suffix='.csv'):
+        self.directory = directory
+        self.sort_key = sort_key
+        self.suffix = suffix
+        self.names = []
+        self.keys = []
+        self.positions = {}
+        self.mtime_ns = None
+        self.refresh()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, i):
+        return self.names[i]
+
+    def path(self, i):
+        return os.path.join(self.directory, self.names[i])
+
+    def position(self, name):
+        """
+        Position of a file name in the sorted listing, or None.
+        """
+        return self.positions.get(name)
+
+    def find(self, key):
+        """
+        Name of the file whose sort key equals `key`, or None.
+        """
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.names[i]
+        return None
+
+    def refresh(self):
+        """
+        Pick up added and removed files; returns True when the listing changed.
+        """
+        mtime_ns = os.stat(self.directory).st_mtime_ns
+        if mtime_ns == self.mtime_ns:
+            return False
+        self.mtime_ns = mtime_ns
+
+        with os.scandir(self.directory) as entries:
+            names = {entry.name for entry in entries if entry.name.endswith(self.suffix)}
+        added = names.difference(self.positions)
+        removed = set(self.positions).difference(names)
+        if not added and not removed:
+            return False
+
+        if removed:
+            kept = [i for i, name in enumerate(self.names) if name not in removed]
+            self.names = [self.names[i] for i in kept]
+            self.keys = [self.keys[i] for i in kept]
+        if len(added) > len(self.names) // 8:
+            # A new or largely rewritten directory: one sort beats many inserts
+            merged = sorted(zip(self.keys + [self.sort_key(name) for name in added], self.names + list(added)))
+            self.keys = [key for key, _ in merged]
+            self.names = [name for _, name in merged]
+        else:
+            for name in added:
+                key = self.sort_key(name)
+                i = bisect.bisect_right(self.keys, key)
+                self.keys.insert(i, key)
+                self.names.insert(i, name)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        return True
+
+
+def prefetch_files(paths, loader, cache, token):
+    """
+    Load the files that are not cached yet; runs on a worker thread.
+    """
+    for path in paths:
+        token.check()
+        try:
+            key = file_key(path)
+        except OSError:
+            continue
+        if key not in cache:
+            cache.put(key, loader(path))
+
+
+class FileBrowser(QObject):
+    """
+    Step through the files of a directory with the neighbours loaded in the background.
+
+    `loader(path)` turns a file into whatever the viewer plots; its results
+    are kept in a bounded LRU cache keyed by path, size and mtime. After
+    every step the next PREFETCH_AHEAD files in the direction of travel and
+    PREFETCH_BEHIND files behind are loaded on a single worker thread, so
+    Next/Back normally find their file in the cache. A miss is loaded on
+    the calling thread, as before.
+    """
+
+    def __init__(self, loader, parent=None, sort_key=natural_sort_key, max_entries=DEFAULT_CACHED_FILES):
+        super().__init__(parent)
+        self.loader = loader
+        self.sort_key = sort_key
+        self.index = None
+        self.name = None
+        self.direction = 1
+        self.cache = PayloadCache(max_entries)
+
+        # One thread: prefetching must not compete with the viewer for the disk
+        pool = QThreadPool(self)
+        pool.setMaxThreadCount(1)
+        self.prefetcher = TaskRunner(self, pool=pool)
+
+    @property
+    def path(self):
+        if self.name is None:
+            return None
+        return os.path.join(self.index.directory, self.name)
+
+    @property
+    def position(self):
+        if self.name is None:
+            return None
+        return self.index.position(self.name)
+
+    def open(self, path):
+        """
+        Make `path` the current file and return its loaded data.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        if self.index is None or self.index.directory != directory:
+            self.prefetcher.cancel_all()
+            self.cache.clear()
+            self.index = DirectoryIndex(directory, self.sort_key)
+        else:
+            self.refresh()
+        self.name = os.path.basename(path)
+        if self.index.position(self.name) is None:
+            raise FileNotFoundError(path)
+        return self.load()
+
+    def open_directory(self, directory, position=0):
+        """
+        Make the file at `position` of `directory` current; returns None for an empty directory.
+        """
+        index = DirectoryIndex(os.path.abspath(directory), self.sort_key)
+        if not len(index):
+            self.index = index
+            self.name = None
+            return None
+        return self.open(index.path(min(max(position, 0), len(index) - 1)))
+
+    def step(self, offset):
+        """
+        Move `offset` files forward (or back) and return the new file's data.
+
+        Returns None, staying put, at either end of the directory.
+        """
+        if self.name is None:
+            return None
+        self.refresh()
+        position = self.index.position(self.name)
+        if position is None:
+            # The current file was removed; continue from where it stood
+            position = bisect.bisect_left(self.index.keys, self.sort_key(self.name)) - (offset > 0)
+        position += offset
+        if position < 0 or position >= len(self.index):
+            return None
+        self.name = self.index[position]
+        self.direction = 1 if offset > 0 else -1
+        return self.load()
+
+    def target(self, position):
+        """
+        What the loader is given for the file at `position`: its path.
+        """
+        return self.index.path(position)
+
+    def refresh(self):
+        self.index.refresh()
+
+    def load(self):
+        target = self.target(self.index.position(self.name))
+        key = file_key(target)
+        data = self.cache.get(key)
+        if data is None:
+            data = self.loader(target)
+            self.cache.put(key, data)
+        self.prefetch()
+        return data
+
+    def prefetch(self):
+        position = self.index.position(self.name)
+        offsets = [k * self.direction for k in range(1, PREFETCH_AHEAD + 1)]
+        offsets += [-k * self.direction for k in range(1, PREFETCH_BEHIND + 1)]
+        paths = [self.target(position + offset) for offset in offsets
+                 if 0 <= position + offset < len(self.index)]
+        if paths:
+            self.prefetcher.submit('prefetch', prefetch_files, paths, self.loader, self.cache)
+
+    def close(self):
+        self.prefetcher.cancel_all()
+
+
+class PairBrowser(FileBrowser):
+    """
+    FileBrowser over one folder that hands the loader the file with the same
+    sort key (e.g. window number) in a partner folder as well, as a
+    (path, partner_path) tuple.
+
+    The partner path is None when the partner folder has no such file, so a
+    window missing from either folder does not shift the pairing. Both
+    files of a step are loaded, cached and prefetched as one item.
+    """
+
+    def __init__(self, loader, partner_directory, parent=None, sort_key=natural_sort_key,
+                 max_entries=DEFAULT_CACHED_FILES):
+        super().__init__(loader, parent, sort_key, max_entries)
+        self.partner = DirectoryIndex(os.path.abspath(partner_directory), sort_key)
+
+    @property
+    def partner_path(self):
+        position = self.position
+        return None if position is None else self.target(position)[1]
+
+    def target(self, position):
+        name = self.partner.find(self.index.keys[position])
+        partner = None if name is None else os.path.join(self.partner.directory, name)
+        return (self.index.path(position), partner)
+
+    def refresh(self):
+        self.index.refresh()
+        self.partner.refresh()
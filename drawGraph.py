@@ -1,8 +1,8 @@
 import sys
-import pandas as pd
+import time
 import matplotlib.pyplot as plt
-from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTimeEdit, QLabel, QLineEdit
-from PyQt6.QtCore import QTime, QTimer
+from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTimeEdit, QLabel, QLineEdit, QProgressBar, QTableWidget, QTableWidgetItem, QAbstractItemView, QComboBox, QSlider
+from PyQt6.QtCore import Qt, QThreadPool, QTime, QTimer
 from PyQt6.QtGui import QFont
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt import NavigationToolbar2QT
@@ -12,14 +12,40 @@ from datetime import datetime, timedelta
 import numpy as np
 import os
 
+from tick_loader import format_seconds, parse_timestamp, time_of_day
+from sequence_plot import SequencePlot
+from cancel_token import CancelToken
+from qt_workers import TaskRunner
+from payload_cache import PayloadCache, prefetch_order
+from viewport import ViewportFetcher
+from partition_store import PartitionStore
+from viewer_data import load_viewer_data, prefetch_payloads, scan_opportunities, select_token, sequence_payload
+
+# Sequences prepared ahead of (and behind) the current one while navigating
+PREFETCH_AHEAD = 4
+PREFETCH_BEHIND = 1
+
+# Replay speeds (replayed seconds per wall-clock second) and frame interval
+REPLAY_SPEEDS = {'1x': 1, '10x': 10, '100x': 100}
+REPLAY_FRAME_MS = 40
+
 
 class PlotWidget(QWidget):
-    def __init__(self, csv_file1, csv_file2):
+    def __init__(self, csv_file1, csv_file2, store=None, time_range=None):
         super().__init__()
 
         self.csv_file1 = csv_file1
         self.csv_file2 = csv_file2
 
+        # A file pair is read directly, one sectoken at a time; only a
+        # time_range (start, end) in seconds reads the store partitioned by
+        # date and sectoken, opening its partitions in that range
+        self.store = store or PartitionStore()
+        self.time_range = time_range
+        self.sectoken = None
+        # A loaded file pair indexed by sectoken, so switching tokens is a slice
+        self.pair = None
+
         # Flag to track visibility of first CSV data plot
         self.show_csv1_plot = True
 
@@ -34,6 +60,34 @@ class PlotWidget(QWidget):
         # Create the navigation toolbar
         self.toolbar = NavigationToolbar2QT(self.canvas, self)
 
+        # Axes and line artists are created once and updated in place
+        self.sequence_plot = SequencePlot(self.figure)
+
+        # Zoom and pan refill the tick line from the whole file, not just the sequence
+        self.viewport = ViewportFetcher(self.sequence_plot.ax, self.sequence_plot.decimator)
+
+        # Loading, slicing and scanning run on a thread pool
+        self.runner = TaskRunner(self)
+
+        # Progress of the running background request
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setFixedSize(150, 20)
+        self.progress_bar.setVisible(False)
+        self.status_label = QLabel('', self)
+        self.status_label.setMaximumHeight(20)
+        self.runner.progress.connect(self.on_progress)
+        self.runner.busy_changed.connect(self.on_busy_changed)
+
+        # Prepared sequences, and a single background thread that warms the
+        # neighbours in the direction of travel without competing with the
+        # requests above for the shared pool
+        self.payload_cache = PayloadCache()
+        self.direction = 1
+        prefetch_pool = QThreadPool(self)
+        prefetch_pool.setMaxThreadCount(1)
+        self.prefetcher = TaskRunner(self, pool=prefetch_pool)
+
         # Create the start and end time widgets
         self.start_time_edit = QTimeEdit(self)
         self.start_time_edit.setDisplayFormat('HH:mm:ss')
@@ -142,398 +196,414 @@ class PlotWidget(QWidget):
         controls_layout.addWidget(self.toggle_legend_button)
         controls_layout.addWidget(self.toggle_SD_button)
 
+        # Replay: play/pause, speed and a seek slider over the session
+        self.replay_timer = QTimer(self)
+        self.replay_timer.setInterval(REPLAY_FRAME_MS)
+        self.replay_timer.timeout.connect(self.on_replay_frame)
+        self.replay_time = None
+        self.replay_span = (0.0, 0.0)
+        self.replay_sequence = None
+        self.replay_payload = None
+        self.replay_count = -1
+        self.replay_annotated = False
+        self.replay_clock = 0.0
+
+        self.play_button = QPushButton('Play', self)
+        self.play_button.setFont(QFont('Arial', 14))
+        self.play_button.setFixedSize(100, 40)
+        self.play_button.clicked.connect(self.toggle_replay)
+
+        self.speed_combo = QComboBox(self)
+        self.speed_combo.addItems(list(REPLAY_SPEEDS))
+        self.speed_combo.setCurrentText('10x')
+        self.speed_combo.setFont(QFont('Arial', 14))
+        self.speed_combo.setFixedSize(100, 40)
+
+        self.seek_slider = QSlider(Qt.Orientation.Horizontal, self)
+        self.seek_slider.sliderMoved.connect(self.on_seek)
+
+        self.replay_label = QLabel('--:--:--', self)
+        self.replay_label.setFont(QFont('Arial', 14))
+
+        replay_layout = QHBoxLayout()
+        replay_layout.addWidget(self.play_button)
+        replay_layout.addWidget(self.speed_combo)
+        replay_layout.addWidget(self.seek_slider)
+        replay_layout.addWidget(self.replay_label)
+
+        # Results of the Opp scan; click a row to plot that sequence
+        self.opportunity_table = QTableWidget(0, 5, self)
+        self.opportunity_table.setHorizontalHeaderLabels(
+            ['Sequence', 'Direction', 'Max swing', 'Probability', 'Crossing'])
+        self.opportunity_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.opportunity_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.opportunity_table.setSortingEnabled(True)
+        self.opportunity_table.setMaximumHeight(200)
+        self.opportunity_table.setVisible(False)
+        self.opportunity_table.cellClicked.connect(self.on_opportunity_clicked)
+
         # Display the CSV file name
-        file_label = QLabel(f"CSV File 2: {self.csv_file2}")
+        if self.time_range is None:
+            file_label = QLabel(f"CSV File 2: {self.csv_file2}")
+        else:
+            file_label = QLabel(f"Range: {' to '.join(format_seconds(self.time_range))}")
         file_label.setMaximumHeight(20)
 
+        # Instrument selector, filled once the files are partitioned
+        self.token_combo = QComboBox(self)
+        self.token_combo.setMinimumWidth(120)
+        self.token_combo.currentTextChanged.connect(self.on_token_changed)
+
+        status_layout = QHBoxLayout()
+        status_layout.addWidget(file_label)
+        status_layout.addWidget(QLabel('Token:', self))
+        status_layout.addWidget(self.token_combo)
+        status_layout.addStretch()
+        status_layout.addWidget(self.status_label)
+        status_layout.addWidget(self.progress_bar)
+
         # Create the main layout and add widgets
         layout = QVBoxLayout()
         layout.addWidget(self.toolbar)
-        layout.addWidget(file_label)
+        layout.addLayout(status_layout)
         probability = float(self.probability_edit.text() or 0.7)
         swing_value = int(self.swing_edit.text() or 100)
         file_seq_num = int(self.sequence_edit.text() or 1)
         layout.addWidget(self.canvas)
+        layout.addWidget(self.opportunity_table)
         layout.addLayout(controls_layout)
+        layout.addLayout(replay_layout)
 
         # Set the main layout
         self.setLayout(layout)
 
-        # Load the data and initialize the plot
+        # Load the data in the background; the first plot follows the load
         self.load_data()
-        self.plot_graph()
 
         # Connect the scroll event to the on_scroll method
         self.canvas.mpl_connect('scroll_event', self.on_scroll)
 
+    def clear_data(self):
+        # Drop the shown instrument and everything prepared for it
+        self.df1 = None
+        self.df2 = None
+        self.df1_times = None
+        self.sequence_index = None
+        self.runner.cancel('plot')
+        self.prefetcher.cancel_all()
+        self.payload_cache.clear()
+        if self.replay_time is not None:
+            self.stop_replay()
+
     def load_data(self):
-        # Load the first CSV data into a DataFrame
-        self.df1 = pd.read_csv(self.csv_file1)
-        self.df1['arrivaltime'] = pd.to_datetime(self.df1['arrivaltime'], format='%H:%M:%S')
+        # Parse and index the files on a worker thread; the window stays
+        # responsive and plot_graph() runs once the data has arrived
+        self.clear_data()
+        self.pair = None
+        self.status_label.setText('Loading...')
+        self.runner.submit('load', load_viewer_data, self.store, self.csv_file1, self.csv_file2, self.sectoken,
+                           self.time_range,
+                           on_result=self.on_data_loaded, on_error=self.on_task_failed)
+
+    def on_token_changed(self, sectoken):
+        if sectoken and sectoken != self.sectoken:
+            self.sectoken = sectoken
+            # Sequence numbers and scan results belong to the previous instrument
+            self.sequence_edit.clear()
+            self.runner.cancel('scan')
+            self.opportunity_table.setRowCount(0)
+            self.opportunity_table.setVisible(False)
+            if self.pair is None:
+                self.load_data()
+            else:
+                # The files are loaded already; only this token's rows are sliced
+                self.clear_data()
+                self.on_data_loaded(select_token(self.pair, sectoken))
+
+    def on_data_loaded(self, data):
+        self.pair = data.get('pair', self.pair)
+        self.sectoken = data['sectoken']
+        self.token_combo.blockSignals(True)
+        self.token_combo.clear()
+        self.token_combo.addItems(data['tokens'])
+        self.token_combo.setCurrentText(self.sectoken)
+        self.token_combo.blockSignals(False)
+
+        self.df1 = data['df1']
+        self.df2 = data['df2']
+        self.df1_times = data['df1_times']
+        self.sequence_index = data['sequence_index']
+        self.viewport.add(self.sequence_plot.lines['ticks'], self.df1_times, 'lasttrprc')
+
+        # Sequences in order of their start, to find the one running at a replay time
+        self.replay_order = np.argsort(self.sequence_index.start_time, kind='stable')
+        self.replay_starts = self.sequence_index.start_time[self.replay_order]
+        if len(self.sequence_index):
+            # The slider counts seconds from the first start; timestamps overflow its int
+            self.replay_span = (float(self.replay_starts[0]), float(self.sequence_index.end_time.max()))
+            self.seek_slider.setRange(0, int(self.replay_span[1] - self.replay_span[0]))
+        self.status_label.setText('')
+        self.plot_graph()
 
-        # Load the second CSV data into another DataFrame
-        self.df2 = pd.read_csv(self.csv_file2)
-        self.df2['arrivaltime'] = pd.to_datetime(self.df2['arrivaltime'], format='%H:%M:%S')
-    
+    def on_task_failed(self, message):
+        self.status_label.setText('Failed, see the console')
+        print(message)
 
-    def plot_graph(self,file_seq_num=None):
-        # Get start and end times from the time edit widgets
-        start_time = self.start_time_edit.time().toString('HH:mm:ss')
-        end_time = self.end_time_edit.time().toString('HH:mm:ss')
+    def on_progress(self, channel, percent):
+        self.progress_bar.setValue(percent)
 
-        # Filter the data based on the specified time range
-        filtered_df1 = self.df1[
-            (self.df1['arrivaltime'].dt.time >= pd.to_datetime(start_time).time()) &
-            (self.df1['arrivaltime'].dt.time <= pd.to_datetime(end_time).time())
-        ]
+    def on_busy_changed(self, busy):
+        self.progress_bar.setVisible(busy)
+        if not busy:
+            self.progress_bar.setValue(0)
 
-        # filtered_df2 = self.df2[
-        #     (self.df2['arrivaltime'].dt.time >= pd.to_datetime(start_time).time()) &
-        #     (self.df2['arrivaltime'].dt.time <= pd.to_datetime(end_time).time())
-        # ]
+    def wait_idle(self):
+        """
+        Block until every background request has finished and been shown.
+        """
+        while self.runner.busy():
+            self.runner.wait()
+            QApplication.processEvents()
 
-        unique_file_seq_nums = self.df2['fileSeqNum'].dropna().unique().tolist()
+    def plot_graph(self,file_seq_num=None):
+        if self.sequence_index is None:
+            # Still loading; on_data_loaded() plots when the data arrives
+            return
+        if not len(self.sequence_index):
+            self.status_label.setText(f"No sequences for sectoken {self.sectoken}")
+            return
+        if self.replay_time is not None:
+            self.stop_replay()
 
-        #file_seq_num = 10
         # If file_seq_num is not provided, get it from the edit box
-        file_seq_num = int(self.sequence_edit.text() or unique_file_seq_nums[0])
-        print(f"start_time {start_time}")
+        file_seq_num = int(self.sequence_edit.text() or self.sequence_index.seq_ids[0])
+        print(f"start_time {self.start_time_edit.time().toString('HH:mm:ss')}")
         print(f"file_seq_num {file_seq_num}")
-        # Ensure the arrivaltime is a datetime object
-        # Find the entries for the specified file sequence number
-        sequence_entries = self.df2[self.df2['fileSeqNum'] == file_seq_num]
-
-        
-
-        # Check if any entries exist for the given sequence number
-        if not sequence_entries.empty:
-            # Get the start_time (1st entry) and end_time (last entry) for the specified fileSeqNum
-            start_time = sequence_entries['arrivaltime'].min()  # First entry
-            end_time = sequence_entries['arrivaltime'].max()    # Last entry
-
-            # Update the start and end time edit widgets
-            self.start_time_edit.setTime(start_time.time())
-            self.end_time_edit.setTime(end_time.time())
-
-            filtered_df1 = self.df1[
-                (self.df1['arrivaltime'] >= start_time) & 
-                (self.df1['arrivaltime'] <= end_time)
-            ]
-
-            filtered_df2 = sequence_entries  # Use only data from the provided sequence number
-            
-            # Clear the existing plot
-            self.figure.clear()
-
-            # Create a new plot
-            ax = self.figure.add_subplot(111)
-
-            # Filter the DataFrame based on start_time and end_time
-            # filtered_df2 = self.df2[
-            #     (self.df2['arrivaltime'] >= start_time) & 
-            #     (self.df2['arrivaltime'] <= end_time)
-            # ]
-
-        # Calculate Bollinger Bands for filtered_df1['lasttrprc']
-        # window = 20
-        # multiplier = 2
-
-        # filtered_df1['SMA'] = filtered_df1['lasttrprc'].rolling(window=window).mean()
-        # filtered_df1['STD'] = filtered_df1['lasttrprc'].rolling(window=window).std()
-        # filtered_df1['Upper Band'] = filtered_df1['SMA'] + (multiplier * filtered_df1['STD'])
-        # filtered_df1['Lower Band'] = filtered_df1['SMA'] - (multiplier * filtered_df1['STD'])
-
-        #  # Calculate RSI for filtered_df1['lasttrprc']
-        # delta = filtered_df1['lasttrprc'].diff()
-        # gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        # loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-        # RS = gain / loss
-        # filtered_df1['RSI'] = 100 - (100 / (1 + RS))
-
-        # Clear the existing plot
-        self.figure.clear()
-
-        # Create a new plot
-        ax = self.figure.add_subplot(111)
-
-        # Plot the first CSV data if the flag is set to True
-        if self.show_csv1_plot:
-            ax.plot(filtered_df1['arrivaltime'], filtered_df1['lasttrprc'],
-                    label='Last Trade Price (CSV 1)', marker='o', color='blue')
-
-            # Calculate the mean of the 'lasttrprc' column in the filtered DataFrame
-            # mean_lasttrprc = filtered_df1['lasttrprc'].mean()
-            # std_lasttrprc = filtered_df1['lasttrprc'].std()
-            # meanSDH = mean_lasttrprc + 2*std_lasttrprc
-            # meanSDL = mean_lasttrprc - 2*std_lasttrprc
-            # # Plot the mean line for 'lasttrprc'
-            # ax.axhline(meanSDH, color='red', linestyle='--', label=f'Mean Last Trade Price: {meanSDH:.2f}')
-            # ax.axhline(meanSDL, color='yellow', linestyle='--', label=f'Mean Last Trade Price: {meanSDL:.2f}')
-
-             # Plot Bollinger Bands
-            # ax.plot(filtered_df1['arrivaltime'], filtered_df1['Upper Band'],
-            #         label='Upper Bollinger Band', color='red', linestyle='--')
-            # ax.plot(filtered_df1['arrivaltime'], filtered_df1['Lower Band'],
-            #         label='Lower Bollinger Band', color='green', linestylimport ose='--')
-
-        # Find the starting time of the second CSV data
-        if not filtered_df2.empty:
-            second_start_time = filtered_df2['arrivaltime'].iloc[0]
-
-            # Find the corresponding `lasttrprc` in the first CSV data at the second start time
-            first_lasttrprc_at_start_time = filtered_df1.loc[filtered_df1['arrivaltime']
-                                                             == second_start_time, 'lasttrprc']
-
-            if not first_lasttrprc_at_start_time.empty:
-                # Compute the offset
-                offset = first_lasttrprc_at_start_time.iloc[0] - \
-                    filtered_df2['lastpredtrprc'].iloc[0]
-                offset1 = first_lasttrprc_at_start_time.iloc[0] - \
-                    filtered_df2['ClusterCentroidHigh'].iloc[0]
-                offset2 = first_lasttrprc_at_start_time.iloc[0] - \
-                    filtered_df2['ClusterCentroidLow'].iloc[0]
-
-        # Slicing the DataFrame to get every other row
-        filtered_df2_alternate = filtered_df2.iloc[::60]
-
-        # Plot the second CSV datwindow = 20
-        # multiplier = 2
-
-        # filtered_df1['SMA'] = filtered_df1['lasttrprc'].rolling(window=window).mean()
-        # filtered_df1['STD'] = filtered_df1['lasttrprc'].rolling(window=window).std()
-        # filtered_df1['Upper Band'] = filtered_df1['SMA'] + (multiplier * filtered_df1['STD'])
-        # filtered_df1['Lower Band'] = filtered_df1['SMA'] - (multiplier * filtered_df1['STD'])
-
-        #  # Calculate RSI for filtered_df1['lasttrprc']
-        # delta = filtered_df1['lasttrprc'].diff()
-        # gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        # loss = (-delta.where(delta
-        ax.plot(filtered_df2['arrivaltime'], filtered_df2['lastpredtrprc'],
-                label='Last Predicted Trade Price (CSV 2)', marker='.', color='orange',alpha=0.4, lw=4)
-        # ax.plot(filtered_df2['arrivaltime'], filtered_df2['ClusterCentroidHigh'],
-        #         label='Price with highest probability (CSV 2)', marker='.', color='cyan',alpha=0.5, lw=8)
-        if self.show_SD:
-            ax.plot(filtered_df2['arrivaltime'], filtered_df2['lastpredtrprc'] + filtered_df2['StanDev'],
-                    label='M+StanDev', marker='.', color='green',alpha=0.6, lw=4)
-            ax.plot(filtered_df2['arrivaltime'], filtered_df2['lastpredtrprc'] - filtered_df2['StanDev'],
-                    label='M-StanDev', marker='.', color='red',alpha=0.6, lw=4)
-        #ax.plot(filtered_df2['arrivaltime'], filtered_df2['ClusterCentroidLow'],
-                #label='Price with Lowest probability (CSV 2)', marker='.', color='magenta',alpha=0.6, lw=8)
-        # ax.plot(filtered_df2['arrivaltime'], filtered_df2['Max_Centroid'],
-        #          label='Highest Price (CSV 2)', marker='^', color='green',alpha=0.7, lw=1)
-        # ax.plot(filtered_df2['arrivaltime'], filtered_df2['Min_Centroid'],
-        #          label='Lowest Price (CSV 2)', marker='v', color='red',alpha=0.7, lw=1)
-        
-        #ax.plot(filtered_df2['arrivaltime'], filtered_df2['ClusterCentroidHigh'] + 6*filtered_df2['StanDev'],
-                #label='target price)', marker='.', color='brown')
-        
-        # Calculate the minimum value of 'ClusterCentroidHigh'
-        min_cluster_centroid_high = filtered_df2['ClusterCentroidHigh'].min()
-        max_stan_dev = filtered_df2['StanDev'].max()
-        stop_loss_values = [min_cluster_centroid_high - 6 * max_stan_dev] * len(filtered_df2['arrivaltime'])
-        # Plot with the stop loss values
-        #ax.plot(filtered_df2['arrivaltime'], stop_loss_values,
-                #label='stop loss', marker='.', color='black')
-        
-        # Merge filtered_df1 and filtered_df2 on the 'arrivaltime' column
-        merged_df = pd.merge(filtered_df1, filtered_df2, on='arrivaltime', suffixes=('_df1', '_df2'))
-
-        # Get the start value of 'lastpredtrprc'
-        start_value = filtered_df2['lastpredtrprc'].iloc[0]
-        print(f"Start value of lastpredtrprc: {start_value}")
-
-        # Calculate the swing from the start value
-        filtered_df2['swing'] = filtered_df2['lastpredtrprc'] - start_value
-
-        # Print the swing values
-        print("\nSwing values:")
-        print(filtered_df2[['arrivaltime', 'lastpredtrprc', 'swing']])
 
         probability = float(self.probability_edit.text() or 0.7)
         swing_value = int(self.swing_edit.text() or 100)
 
-        # Find all swing points with ±100 points
-        swing_points = filtered_df2[
-            (filtered_df2['swing'] >= swing_value) | (filtered_df2['swing'] <= -swing_value)
-        ]
-
-        # Filter for the first swing point with clusterProb > 0.7
-        #swing_with_high_prob = swing_points[swing_points['clusterProb'] > probability].head(1)
-        swing_with_high_prob = pd.DataFrame()
-        prob_type = 'High_Prob'
-        if (filtered_df2['swing'] >= swing_value).any():
-            swing_with_high_prob = swing_points[swing_points['High_Prob'] > probability].head(1)
-            prob_type = 'High_Prob'
-        if (filtered_df2['swing'] <= -swing_value).any():
-            swing_with_high_prob = swing_points[swing_points['Low_Prob'] > probability].head(1)
-            prob_type = 'Low_Prob'
-        #swing_with_high_prob = swing_points[swing_points['clusterProb'] > 0].head(1)
-
-        # Check if a valid swing point with high probability exists
-        if not swing_with_high_prob.empty:
-            row = swing_with_high_prob.iloc[0]  # Extract the first row as a Series
-            
-            # Print success message to the command prompt
-            print(
-                f"Swing detected at {row['arrivaltime']} with "
-                f"clusterProb {row['clusterProb']:.2f}."
-            )
-
-            # Annotate the point on the plot
-            ax.text(
-                row['arrivaltime'], row['lastpredtrprc'], 
-                f"Swing: {row['lastpredtrprc']}\nProb: {row[prob_type]:.2f}", 
-                color='red', fontsize=10, ha='center', va='bottom'
-            )
-        
-            # Define output CSV file path
-            # Get the directory of self.csv_file2
-            # output_dir_swingfile = os.path.dirname(self.csv_file2)
-            # output_csv_path = os.path.join(output_dir_swingfile, "filtered_swing_data.csv")
-
-            # # Convert the 'arrivaltime' column to only show time (HH:MM:SS)
-            # temp_df = filtered_df2.copy()
-            # temp_df['arrivaltime'] = temp_df['arrivaltime'].dt.time  # Extract only the time part
-            
-            # # Check if the file exists to determine if header should be written
-            # write_header = not os.path.exists(output_csv_path)
-           
-            # # Save filtered_df2 to CSV, appending if the file exists
-            # temp_df.to_csv(
-            #     output_csv_path, 
-            #     mode='a', 
-            #     index=False, 
-            #     header=write_header,  # Only write the header if the file is new
-            #     columns=[
-            #         'arrivaltime', 'sectoken', 'lastpredtrprc', 'StanDev', 'low_prc', 'high_prc',
-            #         'ClusterCentroidHigh', 'High_Prob', 'ClusterCentroidLow', 'Low_Prob', 
-            #         'Max_Centroid', 'Min_Centroid', 'clusterIdx', 'clusterProb', 'fileSeqNum'
-            #     ]
-            # )
-        else:
-            # Print a message if no swing point with high probability is found
-            print("No swing point with ±100 points and clusterProb > 0.7 detected.")
+        key = (file_seq_num, swing_value, probability)
+        payload = self.payload_cache.get(key)
+        if payload is not None:
+            # Prepared earlier or by the prefetcher; drop any slower request
+            self.runner.cancel('plot')
+            self.show_payload(payload)
+            self.prefetch_neighbours(file_seq_num, swing_value, probability)
+            return
 
-        
+        def on_result(payload):
+            if payload is not None:
+                self.payload_cache.put(key, payload)
+            self.show_payload(payload)
+            self.prefetch_neighbours(file_seq_num, swing_value, probability)
 
+        # Slicing and the swing search run on a worker thread; a newer request
+        # (e.g. Next clicked again) supersedes one that is still running
+        self.runner.submit('plot', sequence_payload, self.df1, self.df2, self.sequence_index,
+                           file_seq_num, swing_value, probability,
+                           on_result=on_result, on_error=self.on_task_failed)
 
+    def prefetch_neighbours(self, file_seq_num, swing_value, probability):
+        """
+        Warm the cache around file_seq_num in the direction of the last Next/Prev.
+        """
+        seq_ids = [int(seq_id) for seq_id in prefetch_order(
+            self.sequence_index, file_seq_num, self.direction, PREFETCH_AHEAD, PREFETCH_BEHIND)]
+        seq_ids = [seq_id for seq_id in seq_ids if (seq_id, swing_value, probability) not in self.payload_cache]
+        if not seq_ids:
+            return
+        self.prefetcher.submit('prefetch', prefetch_payloads, self.df1, self.df2, self.sequence_index,
+                               seq_ids, swing_value, probability, self.payload_cache,
+                               on_error=self.on_task_failed)
 
-        # Add title and labels
-        ax.set_title('Arrivaltime vs. Last Trade Price')
-        ax.set_xlabel('Arrivaltime')
-        ax.set_ylabel('Price')
+    def show_payload(self, payload):
+        """
+        Show a sequence prepared by sequence_payload() on the GUI thread.
+        """
+        if payload is None:
+            print(f"No predictions for file sequence {self.sequence_edit.text()}")
+            return
 
-        # Display the legend based on the flag
-        if self.show_legend:
-            ax.legend()
+        # Update the start and end time edit widgets
+        self.start_time_edit.setTime(QTime(0, 0).addSecs(int(time_of_day(payload['start_time']))))
+        self.end_time_edit.setTime(QTime(0, 0).addSecs(int(time_of_day(payload['end_time']))))
+
+        # Update the persistent artists in place; the CSV 1 and SD toggles
+        # only change their visibility
+        self.sequence_plot.update(payload['tick_time'], payload['tick_price'],
+                                  payload['pred_time'], payload['pred_price'], payload['pred_sd'])
+        # The tick line now holds the sequence window only
+        self.viewport.invalidate()
+
+        for line in payload['lines']:
+            print(line)
+
+        # Annotate the swing point on the plot
+        if payload['annotation'] is not None:
+            self.sequence_plot.annotate(*payload['annotation'])
+
+    def toggle_replay(self):
+        if self.replay_timer.isActive():
+            self.pause_replay()
+        else:
+            self.start_replay()
 
-        # Plot RSI in a separate subplot
-        # ax2 = self.figure.add_subplot(212)  # RSI plot
-        # ax2.plot(filtered_df1['arrivaltime'], filtered_df1['RSI'], label='RSI', color='purple')
-        # ax2.axhline(70, color='red', linestyle='--')  # Overbought threshold
-        # ax2.axhline(30, color='green', linestyle='--')  # Oversold threshold
+    def start_replay(self):
+        """
+        Play from the replay position, or from the start of the sequence on screen.
+        """
+        if self.sequence_index is None or not len(self.sequence_index):
+            return
+        if self.replay_time is None:
+            position = self.sequence_index.position(int(self.sequence_edit.text() or self.sequence_index.seq_ids[0]))
+            self.seek_replay(float(self.sequence_index.start_time[position or 0]))
+        self.replay_clock = time.perf_counter()
+        self.replay_timer.start()
+        self.play_button.setText('Pause')
+
+    def pause_replay(self):
+        self.replay_timer.stop()
+        self.play_button.setText('Play')
+
+    def stop_replay(self):
+        """
+        Leave replay mode, e.g. when a sequence is plotted by hand.
+        """
+        self.pause_replay()
+        self.replay_time = None
+        self.replay_sequence = None
+        self.viewport.enabled = True
+
+    def on_replay_frame(self):
+        now = time.perf_counter()
+        elapsed = now - self.replay_clock
+        self.replay_clock = now
+        self.seek_replay(self.replay_time + elapsed * REPLAY_SPEEDS[self.speed_combo.currentText()])
+        if self.replay_time >= self.replay_span[1]:
+            self.pause_replay()
+
+    def on_seek(self, value):
+        if self.sequence_index is not None and len(self.sequence_index):
+            self.seek_replay(self.replay_span[0] + value)
+
+    def seek_replay(self, seconds):
+        """
+        Show the session as it stood at time `seconds`: the latest
+        sequence started by then, in full, and its ticks up to that time.
 
-        # ax2.set_title('RSI')
-        # ax2.set_xlabel('Arrivaltime')
-        # ax2.set_ylabel('RSI')
-        # if self.show_legend:
-        #     ax2.legend()
+        Within a sequence only the tick line changes and is blitted; a new
+        sequence is one full redraw.
+        """
+        # Replay owns the tick line; zooming must not reveal later ticks
+        self.viewport.enabled = False
+        seconds = min(max(seconds, self.replay_span[0]), self.replay_span[1])
+        self.replay_time = seconds
+
+        i = max(np.searchsorted(self.replay_starts, seconds, side='right') - 1, 0)
+        position = int(self.replay_order[i])
+        if position != self.replay_sequence:
+            self.replay_payload = self.replay_payload_for(position)
+            self.replay_sequence = position
+            self.replay_count = -1
+            self.replay_annotated = False
+
+        payload = self.replay_payload
+        count = int(np.searchsorted(payload['tick_time'], seconds, side='right'))
+        if self.replay_count < 0:
+            self.sequence_plot.update(payload['tick_time'][:count], payload['tick_price'][:count],
+                                      payload['pred_time'], payload['pred_price'], payload['pred_sd'])
+        elif count != self.replay_count:
+            self.sequence_plot.set_prefix('ticks', payload['tick_time'], payload['tick_price'], count)
+        self.replay_count = count
+
+        # The swing annotation appears once the replay reaches it
+        annotation = payload['annotation']
+        annotated = annotation is not None and seconds >= annotation[0]
+        if annotated != self.replay_annotated:
+            if annotated:
+                self.sequence_plot.annotate(*annotation)
+            else:
+                self.sequence_plot.annotate(0, 0, None)
+            self.replay_annotated = annotated
+
+        self.seek_slider.blockSignals(True)
+        self.seek_slider.setValue(int(seconds - self.replay_span[0]))
+        self.seek_slider.blockSignals(False)
+        self.replay_label.setText(format_seconds([seconds])[0])
+
+    def replay_payload_for(self, position):
+        """
+        Payload of the i-th sequence for replay, from the cache when prefetched.
+        """
+        file_seq_num = int(self.sequence_index.seq_ids[position])
+        probability = float(self.probability_edit.text() or 0.7)
+        swing_value = int(self.swing_edit.text() or 100)
+        key = (file_seq_num, swing_value, probability)
+        payload = self.payload_cache.get(key)
+        if payload is None:
+            payload = sequence_payload(self.df1, self.df2, self.sequence_index, file_seq_num,
+                                       swing_value, probability, token=CancelToken())
+            self.payload_cache.put(key, payload)
+
+        # Replay moves forward; warm the sequences that start next
+        self.direction = 1
+        self.prefetch_neighbours(file_seq_num, swing_value, probability)
+        self.sequence_edit.setText(str(file_seq_num))
+        self.start_time_edit.setTime(QTime(0, 0).addSecs(int(time_of_day(payload['start_time']))))
+        self.end_time_edit.setTime(QTime(0, 0).addSecs(int(time_of_day(payload['end_time']))))
+        return payload
 
-        # Update the canvas
-        self.canvas.draw()
     def get_opportunities(self):
-        # Get start and end times from the time edit widgets
-        start_time = self.start_time_edit.time().toString('HH:mm:ss')
-        end_time = self.end_time_edit.time().toString('HH:mm:ss')
-
-        # filtered_df2 = self.df2[
-        #     (self.df2['arrivaltime'].dt.time >= pd.to_datetime(start_time).time()) &
-        #     (self.df2['arrivaltime'].dt.time <= pd.to_datetime(end_time).time())
-        # ]
-
-        unique_file_seq_nums = self.df2['fileSeqNum'].dropna().unique().tolist()
-        oppcount = 0
-        # Loop through each unique file sequence number
-        for file_seq_num in unique_file_seq_nums:
-            #file_seq_num = 10
-            # If file_seq_num is not provided, get it from the edit box
-            #file_seq_num = int(self.sequence_edit.text() or unique_file_seq_nums[0])
-            # print(f"start_time {start_time}")
-            # print(f"file_seq_num {file_seq_num}")
-            # Ensure the arrivaltime is a datetime object
-            # Find the entries for the specified file sequence number
-            sequence_entries = self.df2[self.df2['fileSeqNum'] == file_seq_num]
-
-            
-
-            # Check if any entries exist for the given sequence number
-            if not sequence_entries.empty:
-                # Get the start_time (1st entry) and end_time (last entry) for the specified fileSeqNum
-                start_time = sequence_entries['arrivaltime'].min()  # First entry
-                end_time = sequence_entries['arrivaltime'].max()    # Last entry
-
-                # Update the start and end time edit widgets
-                self.start_time_edit.setTime(start_time.time())
-                self.end_time_edit.setTime(end_time.time())            
-
-                filtered_df2 = sequence_entries  # Use only data from the provided sequence number
-                
-               
-            # Get the start value of 'lastpredtrprc'
-            start_value = filtered_df2['lastpredtrprc'].iloc[0]
-            #print(f"Start value of lastpredtrprc: {start_value}")
-
-            # Calculate the swing from the start value
-            filtered_df3 = filtered_df2.copy()
-            filtered_df3['swing'] = filtered_df2['lastpredtrprc'] - start_value
-           
-            # Calculate the maximum non-zero swing
-            max_possible_swing = filtered_df3['swing'].abs().max()
-
-            # Print the swing values
-            #print("\nSwing values:")
-            #print(filtered_df2[['arrivaltime', 'lastpredtrprc', 'swing']])
-
-            probability = float(self.probability_edit.text() or 0)
-            swing_value = int(self.swing_edit.text() or 100)
-
-            # Find all swing points with ±100 points
-            swing_points = filtered_df3[
-                (filtered_df3['swing'] >= swing_value) | (filtered_df3['swing'] <= -swing_value)
-            ]
-
-            # Filter for the first swing point with clusterProb > 0.7
-            #swing_with_high_prob = swing_points[swing_points['clusterProb'] > probability].head(1)
-            swing_with_high_prob = pd.DataFrame()
-            prob_type = 'High_Prob'
-            if (filtered_df3['swing'] >= swing_value).any():
-                swing_with_high_prob = swing_points[swing_points['High_Prob'] > probability].head(1)
-                prob_type = 'High_Prob'
-            if (filtered_df3['swing'] <= -swing_value).any():
-                swing_with_high_prob = swing_points[swing_points['Low_Prob'] > probability].head(1)
-                prob_type = 'Low_Prob'
-            #swing_with_high_prob = swing_points[swing_points['clusterProb'] > 0].head(1)
-
-            # Check if a valid swing point with high probability exists
-            if not swing_with_high_prob.empty:
-                row = swing_with_high_prob.iloc[0]  # Extract the first row as a Series
-                oppcount = oppcount + 1
-                # Print success message to the command prompt
-                print(
-                    f"Swing detected at file sequence : {file_seq_num}"
-                    f" Maximum possible swing: {int(max_possible_swing)}"
-                )
-            #else:
-                # Print a message if no swing point with high probability is found
-                #print("No swing point detected.")
-        print(f"Total opportunities : {oppcount}")
+        if self.sequence_index is None:
+            return
+        probability = float(self.probability_edit.text() or 0)
+        swing_value = int(self.swing_edit.text() or 100)
+        self.status_label.setText('Scanning...')
+        self.runner.submit('scan', scan_opportunities, self.df2, self.sequence_index, swing_value, probability,
+                           on_result=self.show_opportunities, on_error=self.on_task_failed)
+
+    def show_opportunities(self, opportunities):
+        self.status_label.setText('')
+        for file_seq_num, max_possible_swing in zip(opportunities['fileSeqNum'], opportunities['max_swing']):
+            print(
+                f"Swing detected at file sequence : {file_seq_num}"
+                f" Maximum possible swing: {int(max_possible_swing)}"
+            )
+        print(f"Total opportunities : {len(opportunities)}")
+
+        # Numbers are stored as numbers so that the columns sort numerically
+        table = self.opportunity_table
+        table.setSortingEnabled(False)
+        table.setRowCount(len(opportunities))
+        crossing = format_seconds(opportunities['arrivaltime'].to_numpy())
+        for row, record in enumerate(opportunities.itertuples(index=False)):
+            values = [int(record.fileSeqNum), record.direction, round(float(record.max_swing), 2),
+                      round(float(record.probability), 3), crossing[row]]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                item.setData(Qt.ItemDataRole.DisplayRole, value)
+                table.setItem(row, column, item)
+        table.setSortingEnabled(True)
+        table.setVisible(True)
+
+    def on_opportunity_clicked(self, row, column):
+        """
+        Plot the sequence of the clicked opportunity.
+        """
+        file_seq_num = self.opportunity_table.item(row, 0).data(Qt.ItemDataRole.DisplayRole)
+        self.sequence_edit.setText(str(file_seq_num))
+        self.plot_graph(file_seq_num)
 
     def increment_sequence_number(self):
         # Retrieve the current sequence number from the edit box
+        if self.sequence_index is None:
+            return
         current_seq_num = int(self.sequence_edit.text() or 1)
         
-        # Increment the sequence number
-        updated_seq_num = current_seq_num + 1
+        # Step to the next sequence in the file (ids may have gaps)
+        self.direction = 1
+        updated_seq_num = int(self.sequence_index.step(current_seq_num, 1))
         
         # Update the edit box with the new sequence number
         self.sequence_edit.setText(str(updated_seq_num))
@@ -543,10 +613,13 @@ class PlotWidget(QWidget):
 
     def decrement_sequence_number(self):
         # Retrieve the current sequence number from the edit box
+        if self.sequence_index is None:
+            return
         current_seq_num = int(self.sequence_edit.text() or 0)
         
-        # Increment the sequence number
-        updated_seq_num = current_seq_num - 1
+        # Step to the previous sequence in the file (ids may have gaps)
+        self.direction = -1
+        updated_seq_num = int(self.sequence_index.step(current_seq_num, -1))
         
         # Update the edit box with the new sequence number
         self.sequence_edit.setText(str(updated_seq_num))
@@ -608,7 +681,7 @@ class PlotWidget(QWidget):
         self.show_csv1_plot = not self.show_csv1_plot
         self.toggle_csv1_button.setText(
             'Show CSV 1 Plot' if not self.show_csv1_plot else 'Hide CSV 1 Plot')
-        self.plot_graph()
+        self.sequence_plot.set_visible(self.show_csv1_plot, 'ticks')
 
     def toggle_legend(self):
         """
@@ -617,7 +690,7 @@ class PlotWidget(QWidget):
         self.show_legend = not self.show_legend
         self.toggle_legend_button.setText(
             'Show Legend' if not self.show_legend else 'Hide Legend')
-        self.plot_graph()
+        self.sequence_plot.set_legend_visible(self.show_legend)
 
     def toggle_SD(self):
         """
@@ -626,7 +699,7 @@ class PlotWidget(QWidget):
         self.show_SD = not self.show_SD
         self.toggle_SD_button.setText(
             'Show SD' if not self.show_SD else 'Hide SD')
-        self.plot_graph()
+        self.sequence_plot.set_visible(self.show_SD, 'sd_high', 'sd_low')
 
     def on_scroll(self, event):
         """
@@ -642,29 +715,35 @@ class PlotWidget(QWidget):
             # Determine the zoom factor
             zoom_factor = 1.1 if event.button == 'up' else 1/1.1
 
-            # Apply zoom to the x-axis and y-axis
-            ax.set_xlim([event.xdata - (event.xdata - ax.get_xlim()[0]) * zoom_factor,
-                         event.xdata + (ax.get_xlim()[1] - event.xdata) * zoom_factor])
-            ax.set_ylim([event.ydata - (event.ydata - ax.get_ylim()[0]) * zoom_factor,
-                         event.ydata + (ax.get_ylim()[1] - event.ydata) * zoom_factor])
+            # Apply zoom to the x-axis and y-axis; the repaint is coalesced
+            # with draw_idle() so fast wheel ticks do not queue full redraws
+            self.sequence_plot.zoom(event.xdata, event.ydata, zoom_factor)
 
-            # Redraw the canvas
-            self.canvas.draw()
+    def closeEvent(self, event):
+        # Stop background work that would only fill a closed window
+        self.runner.cancel_all()
+        self.prefetcher.cancel_all()
+        self.viewport.stop()
+        self.replay_timer.stop()
+        super().closeEvent(event)
 
 
 if __name__ == '__main__':
     # Initialize the QApplication
     app = QApplication(sys.argv)
 
-    # Get the CSV file paths from the command line argument
-    if len(sys.argv) < 3:
+    # Get the CSV file paths, or a time range of the partition store, from the command line
+    if len(sys.argv) < 3 or (sys.argv[1] == '--range' and len(sys.argv) < 4):
         print("Usage: python script.py <csv_file1_path> <csv_file2_path>")
+        print("       python script.py --range '<start, e.g. 2024-04-30 10:00>' '<end>'")
         sys.exit(1)
-    csv_file1_path = sys.argv[1]
-    csv_file2_path = sys.argv[2]
 
     # Create the PlotWidget
-    plot_widget = PlotWidget(csv_file1_path, csv_file2_path)
+    if sys.argv[1] == '--range':
+        time_range = (parse_timestamp(sys.argv[2]), parse_timestamp(sys.argv[3]))
+        plot_widget = PlotWidget(None, None, time_range=time_range)
+    else:
+        plot_widget = PlotWidget(sys.argv[1], sys.argv[2])
 
     # Show the widget
     plot_widget.show()
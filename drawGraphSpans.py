@@ -1,6 +1,5 @@
 import sys
 import os
-import pandas as pd
 from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTimeEdit, QFileDialog
 from PyQt6.QtCore import QTime
 import matplotlib.pyplot as plt
@@ -8,6 +7,8 @@ from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt import NavigationToolbar2QT
 from matplotlib.figure import Figure
 
+from tick_loader import TimeIndex, load_ticks, seconds_to_datetime
+
 class PlotWidget(QWidget):
     def __init__(self):
         super().__init__()
@@ -86,14 +87,14 @@ class PlotWidget(QWidget):
 
     def load_data(self):
         if self.csv_file1:
-            # Load the first CSV data into a DataFrame
-            self.df1 = pd.read_csv(self.csv_file1)
-            self.df1['arrivaltime'] = pd.to_datetime(self.df1['arrivaltime'], format='%H:%M:%S')
+            # Load the first CSV data into a DataFrame (arrivaltime in seconds since 1970-01-01)
+            self.df1 = load_ticks(self.csv_file1)
+            self.df1_times = TimeIndex(self.df1)
 
         if self.csv_file2:
             # Load the second CSV data into another DataFrame
-            self.df2 = pd.read_csv(self.csv_file2)
-            self.df2['arrivaltime'] = pd.to_datetime(self.df2['arrivaltime'], format='%H:%M:%S')
+            self.df2 = load_ticks(self.csv_file2)
+            self.df2_times = TimeIndex(self.df2)
 
     def plot_graph(self):
         # Clear the existing plot
@@ -101,18 +102,15 @@ class PlotWidget(QWidget):
 
         if self.csv_file1:
             # Get start and end times from the time edit widgets
-            start_time = self.start_time_edit.time().toString('HH:mm:ss')
-            end_time = self.end_time_edit.time().toString('HH:mm:ss')
+            start_time = self.start_time_edit.time().msecsSinceStartOfDay() // 1000
+            end_time = self.end_time_edit.time().msecsSinceStartOfDay() // 1000
 
             # Filter the data based on the specified time range
-            filtered_df1 = self.df1[
-                (self.df1['arrivaltime'].dt.time >= pd.to_datetime(start_time).time()) &
-                (self.df1['arrivaltime'].dt.time <= pd.to_datetime(end_time).time())
-            ]
+            filtered_df1 = self.df1_times.day_window(start_time, end_time)
 
             # Create a new plot for the first CSV file
             ax = self.figure.add_subplot(111)
-            ax.plot(filtered_df1['arrivaltime'], filtered_df1['lasttrprc'], label='Last Trade Price (CSV 1)', marker='o')
+            ax.plot(seconds_to_datetime(filtered_df1['arrivaltime']), filtered_df1['lasttrprc'], label='Last Trade Price (CSV 1)', marker='o')
 
             # Add title and labels
             ax.set_title('Arrivaltime vs. Last Trade Price')
@@ -124,20 +122,17 @@ class PlotWidget(QWidget):
 
         if self.csv_file2:
             # Get start and end times from the time edit widgets
-            start_time = self.start_time_edit.time().toString('HH:mm:ss')
-            end_time = self.end_time_edit.time().toString('HH:mm:ss')
+            start_time = self.start_time_edit.time().msecsSinceStartOfDay() // 1000
+            end_time = self.end_time_edit.time().msecsSinceStartOfDay() // 1000
 
             # Filter the data based on the specified time range
-            filtered_df2 = self.df2[
-                (self.df2['arrivaltime'].dt.time >= pd.to_datetime(start_time).time()) &
-                (self.df2['arrivaltime'].dt.time <= pd.to_datetime(end_time).time())
-            ]
+            filtered_df2 = self.df2_times.day_window(start_time, end_time)
 
             # Create a new plot for the second CSV file
             ax = self.figure.add_subplot(111)
 
             # Plot the second CSV data
-            ax.plot(filtered_df2['arrivaltime'], filtered_df2['lasttrprc'], label='Last Trade Price (CSV 2)', marker='o')
+            ax.plot(seconds_to_datetime(filtered_df2['arrivaltime']), filtered_df2['lasttrprc'], label='Last Trade Price (CSV 2)', marker='o')
 
             # Add title and labels
             ax.set_title('Arrivaltime vs. Last Trade Price')
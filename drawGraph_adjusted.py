@@ -1,5 +1,4 @@
 import sys
-import pandas as pd
 import matplotlib.pyplot as plt
 from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTimeEdit, QLabel, QLineEdit
 from PyQt6.QtCore import QTime, QTimer
@@ -8,6 +7,10 @@ from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt import NavigationToolbar2QT
 from matplotlib.figure import Figure
 
+from tick_loader import TimeIndex, load_predictions, load_ticks
+from decimate import LineDecimator
+from sequence_plot import date_numbers
+
 
 class PlotWidget(QWidget):
     def __init__(self, csv_file1, csv_file2):
@@ -91,33 +94,25 @@ class PlotWidget(QWidget):
         self.canvas.mpl_connect('scroll_event', self.on_scroll)
 
     def load_data(self):
-        # Load the first CSV data into a DataFrame
-        self.df1 = pd.read_csv(self.csv_file1)
-        self.df1['arrivaltime'] = pd.to_datetime(
-            self.df1['arrivaltime'], format='%H:%M:%S')
+        # Load the first CSV data into a DataFrame (arrivaltime in seconds since 1970-01-01)
+        self.df1 = load_ticks(self.csv_file1)
 
         # Load the second CSV data into another DataFrame
-        self.df2 = pd.read_csv(self.csv_file2)
-        self.df2['arrivaltime'] = pd.to_datetime(
-            self.df2['arrivaltime'], format='%H:%M:%S')
+        self.df2 = load_predictions(self.csv_file2, ['arrivaltime', 'lastpredtrprc'])
+
+        # Time windows are binary searches on the arrivaltime column
+        self.df1_times = TimeIndex(self.df1)
+        self.df2_times = TimeIndex(self.df2)
 
     def plot_graph(self):
         # Get start and end times from the time edit widgets
-        start_time = self.start_time_edit.time().toString('HH:mm:ss')
-        end_time = self.end_time_edit.time().toString('HH:mm:ss')
+        start_time = self.start_time_edit.time().msecsSinceStartOfDay() // 1000
+        end_time = self.end_time_edit.time().msecsSinceStartOfDay() // 1000
 
         # Filter the data based on the specified time range
-        filtered_df1 = self.df1[
-            (self.df1['arrivaltime'].dt.time >= pd.to_datetime(start_time).time()) &
-            (self.df1['arrivaltime'].dt.time <=
-             pd.to_datetime(end_time).time())
-        ]
-
-        filtered_df2 = self.df2[
-            (self.df2['arrivaltime'].dt.time >= pd.to_datetime(start_time).time()) &
-            (self.df2['arrivaltime'].dt.time <=
-             pd.to_datetime(end_time).time())
-        ]
+        filtered_df1 = self.df1_times.day_window(start_time, end_time)
+
+        filtered_df2 = self.df2_times.day_window(start_time, end_time)
 
         # Clear the existing plot
         self.figure.clear()
@@ -125,9 +120,16 @@ class PlotWidget(QWidget):
         # Create a new plot
         ax = self.figure.add_subplot(111)
 
+        ax.xaxis_date()
+
+        # Both series are drawn min/max decimated to the canvas width and
+        # re-decimated on zoom and resize
+        self.decimator = LineDecimator(ax)
+
         # Plot the first CSV data
-        ax.plot(filtered_df1['arrivaltime'], filtered_df1['lasttrprc'],
-                label='Last Trade Price (CSV 1)', marker='o')
+        tick_line = ax.plot([], [], label='Last Trade Price (CSV 1)', marker='o')[0]
+        self.decimator.set_data(tick_line, date_numbers(filtered_df1['arrivaltime']), filtered_df1['lasttrprc'],
+                                refresh=False)
 
         # Find the starting time of the second CSV data
         if not filtered_df2.empty:
@@ -142,13 +144,13 @@ class PlotWidget(QWidget):
                 offset = first_lasttrprc_at_start_time.iloc[0] - \
                     filtered_df2['lastpredtrprc'].iloc[0]
                 
-        # Slicing the DataFrame to get every other row
-        filtered_df2_alternate = filtered_df2.iloc[::60]
-
-
         # Plot the second CSV data
-        ax.plot(filtered_df2_alternate['arrivaltime'], filtered_df2_alternate['lastpredtrprc'],
-                label='Last Predicted Trade Price (CSV 2)', marker='.')
+        prediction_line = ax.plot([], [], label='Last Predicted Trade Price (CSV 2)', marker='.')[0]
+        self.decimator.set_data(prediction_line, date_numbers(filtered_df2['arrivaltime']),
+                                filtered_df2['lastpredtrprc'], refresh=False)
+        ax.relim()
+        ax.autoscale_view()
+        self.decimator.refresh()
 
         # Add title and labels
         ax.set_title('Arrivaltime vs. Last Trade Price')
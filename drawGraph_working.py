@@ -1,7 +1,5 @@
 import sys
 import os
-import re
-import pandas as pd
 import matplotlib.pyplot as plt
 from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTimeEdit, QLabel, QLineEdit, QFileDialog
 from PyQt6.QtCore import QTime
@@ -10,9 +8,23 @@ from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5 import NavigationToolbar2QT as NavigationToolbar
 from matplotlib.figure import Figure
 
+from tick_loader import TimeIndex
+from data_model import load_prediction_data, load_tick_data
+from decimate import LineDecimator
+from sequence_plot import date_numbers
+from viewport import ViewportFetcher
+from dir_browser import FileBrowser
 
-def natural_sort_key(s, _nsre=re.compile('([0-9]+)')):
-    return [int(text) if text.isdigit() else text.lower() for text in re.split(_nsre, s)]
+
+def load_tick_file(path):
+    # Ticks and their time index, as cached by the file browser
+    df = load_tick_data(path).to_frame()
+    return df, TimeIndex(df)
+
+
+def load_prediction_file(path):
+    df = load_prediction_data(path, ['time', 'price']).to_frame()
+    return df, TimeIndex(df)
 
 
 class PlotWidget(QWidget):
@@ -21,12 +33,11 @@ class PlotWidget(QWidget):
 
         self.csv_file1 = None
         self.csv_file2 = None
-        self.csv_file1_directory = None
-        self.csv_file2_directory = None
-        self.csv_file1_list = []
-        self.csv_file2_list = []
-        self.csv_file1_index = 0
-        self.csv_file2_index = 0
+        # Directory listings and neighbouring files are kept by the browsers
+        self.browser1 = FileBrowser(load_tick_file, self)
+        self.browser2 = FileBrowser(load_prediction_file, self)
+        self.decimator = None
+        self.viewport = None
 
         # Create a figure and a canvas to display the plot
         self.figure = Figure()
@@ -141,14 +152,8 @@ class PlotWidget(QWidget):
         file_path, _ = file_dialog.getOpenFileName(self, 'Open CSV File 1', '', 'CSV files (*.csv)')
         if file_path:
             self.csv_file1 = file_path
-            self.csv_file1_directory = os.path.dirname(file_path)
-            self.csv_file1_list = sorted(
-                [f for f in os.listdir(self.csv_file1_directory) if f.endswith('.csv')],
-                key=natural_sort_key
-            )
-            self.csv_file1_index = self.csv_file1_list.index(os.path.basename(file_path))
+            self.df1, self.df1_times = self.browser1.open(file_path)
             self.file1_label.setText(f"CSV File 1: {os.path.basename(file_path)}")
-            self.load_data()
             self.plot_graph()
 
     def load_csv2(self):
@@ -156,62 +161,72 @@ class PlotWidget(QWidget):
         file_path, _ = file_dialog.getOpenFileName(self, 'Open CSV File 2', '', 'CSV files (*.csv)')
         if file_path:
             self.csv_file2 = file_path
-            self.csv_file2_directory = os.path.dirname(file_path)
-            self.csv_file2_list = sorted(
-                [f for f in os.listdir(self.csv_file2_directory) if f.endswith('.csv')],
-                key=natural_sort_key
-            )
-            self.csv_file2_index = self.csv_file2_list.index(os.path.basename(file_path))
+            self.df2, self.df2_times = self.browser2.open(file_path)
             self.file2_label.setText(f"CSV File 2: {os.path.basename(file_path)}")
-            self.load_data()
             self.plot_graph()
 
     def next_csv1(self):
-        if self.csv_file1_directory and self.csv_file1_index + 1 < len(self.csv_file1_list):
-            self.csv_file1_index += 1
-            self.csv_file1 = os.path.join(self.csv_file1_directory, self.csv_file1_list[self.csv_file1_index])
-            self.file1_label.setText(f"CSV File 1: {self.csv_file1_list[self.csv_file1_index]}")
-            self.load_data()
+        # The next file is usually prefetched already
+        data = self.browser1.step(1)
+        if data is not None:
+            self.df1, self.df1_times = data
+            self.csv_file1 = self.browser1.path
+            self.file1_label.setText(f"CSV File 1: {self.browser1.name}")
             self.plot_graph()
 
     def next_csv2(self):
-        if self.csv_file2_directory and self.csv_file2_index + 1 < len(self.csv_file2_list):
-            self.csv_file2_index += 1
-            self.csv_file2 = os.path.join(self.csv_file2_directory, self.csv_file2_list[self.csv_file2_index])
-            self.file2_label.setText(f"CSV File 2: {self.csv_file2_list[self.csv_file2_index]}")
-            self.load_data()
+        data = self.browser2.step(1)
+        if data is not None:
+            self.df2, self.df2_times = data
+            self.csv_file2 = self.browser2.path
+            self.file2_label.setText(f"CSV File 2: {self.browser2.name}")
             self.plot_graph()
 
     def load_data(self):
+        # arrivaltime is loaded as seconds since 1970-01-01; the time edits pick
+        # times of day on the first date of the files
         if self.csv_file1:
-            self.df1 = pd.read_csv(self.csv_file1)
-            self.df1['arrivaltime'] = pd.to_datetime(self.df1['arrivaltime'], format='%H:%M:%S')
+            self.df1, self.df1_times = self.browser1.open(self.csv_file1)
 
         if self.csv_file2:
-            self.df2 = pd.read_csv(self.csv_file2)
-            self.df2['arrivaltime'] = pd.to_datetime(self.df2['arrivaltime'], format='%H:%M:%S')
+            self.df2, self.df2_times = self.browser2.open(self.csv_file2)
 
     def plot_graph(self):
-        start_time = self.start_time_edit.time().toString('HH:mm:ss')
-        end_time = self.end_time_edit.time().toString('HH:mm:ss')
+        start_time = self.start_time_edit.time().msecsSinceStartOfDay() // 1000
+        end_time = self.end_time_edit.time().msecsSinceStartOfDay() // 1000
 
+        if self.viewport is not None:
+            self.viewport.stop()
         self.figure.clear()
         ax = self.figure.add_subplot(111)
+        ax.xaxis_date()
+
+        # Lines start with the selected window; zoom and pan refill them from
+        # the whole file, decimated to the canvas width
+        self.decimator = LineDecimator(ax)
+        self.viewport = ViewportFetcher(ax, self.decimator)
 
         if self.csv_file1:
-            filtered_df1 = self.df1[
-                (self.df1['arrivaltime'].dt.time >= pd.to_datetime(start_time).time()) &
-                (self.df1['arrivaltime'].dt.time <= pd.to_datetime(end_time).time())
-            ]
-            ax.plot(filtered_df1['arrivaltime'], filtered_df1['lasttrprc'], label='Last Trade Price (CSV 1)', marker='o')
+            # day_window() picks the times of day on the file's first date; the
+            # line holds those absolute seconds
+            day_start = self.df1_times.day_start
+            filtered_df1 = self.df1_times.day_window(start_time, end_time)
+            line = ax.plot([], [], label='Last Trade Price (CSV 1)', marker='o')[0]
+            self.decimator.set_data(line, date_numbers(filtered_df1['arrivaltime']), filtered_df1['lasttrprc'],
+                                    refresh=False)
+            self.viewport.add(line, self.df1_times, 'lasttrprc', loaded=(day_start + start_time, day_start + end_time))
 
         if self.csv_file2:
-            filtered_df2 = self.df2[
-                (self.df2['arrivaltime'].dt.time >= pd.to_datetime(start_time).time()) &
-                (self.df2['arrivaltime'].dt.time <= pd.to_datetime(end_time).time())
-            ]
-            ax.plot(filtered_df2['arrivaltime'], filtered_df2['lastpredtrprc'], label='Last Predicted Trade Price (CSV 2)', marker='.')
-
+            day_start = self.df2_times.day_start
+            filtered_df2 = self.df2_times.day_window(start_time, end_time)
+            line = ax.plot([], [], label='Last Predicted Trade Price (CSV 2)', marker='.')[0]
+            self.decimator.set_data(line, date_numbers(filtered_df2['arrivaltime']), filtered_df2['lastpredtrprc'],
+                                    refresh=False)
+            self.viewport.add(line, self.df2_times, 'lastpredtrprc', loaded=(day_start + start_time, day_start + end_time))
+
+        ax.relim()
+        ax.autoscale_view()
+        self.decimator.refresh()
         ax.set_title('Arrivaltime vs. Last Trade Price')
         ax.set_xlabel('Arrivaltime')
         ax.set_ylabel('Price')
@@ -263,6 +278,11 @@ class PlotWidget(QWidget):
                          ydata + (ylim[1] - ydata) / zoom_factor])
             self.canvas.draw()
 
+    def closeEvent(self, event):
+        self.browser1.close()
+        self.browser2.close()
+        super().closeEvent(event)
+
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
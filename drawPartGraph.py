@@ -1,12 +1,35 @@
 import sys
 import os
-import pandas as pd
+import functools
 from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTimeEdit, QLabel
 from PyQt6.QtCore import QTime
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt import NavigationToolbar2QT
 from matplotlib.figure import Figure
 
+from tick_loader import TimeIndex, load_csv, seconds_to_datetime
+from sequence_plot import date_numbers
+from dir_browser import FileBrowser, PairBrowser
+
+
+def window_number(file_name):
+    # Split windows are numbered by the last '_' field of their name
+    return int(file_name.split('_')[-1].split('.')[0])
+
+
+def load_window(price_column, path):
+    # Only the time and the plotted price column are parsed, arrivaltime
+    # as seconds since 1970-01-01
+    df = load_csv(path, ['arrivaltime', price_column])
+    return df, TimeIndex(df)
+
+
+def load_window_pair(price_columns, paths):
+    # Both windows of a synchronized step, loaded (and cached) together
+    return [None if path is None else load_window(price_column, path)
+            for price_column, path in zip(price_columns, paths)]
+
+
 class PlotWidget(QWidget):
     def __init__(self, folder_path, plot_title, price_column):
         super().__init__()
@@ -15,12 +38,9 @@ class PlotWidget(QWidget):
         self.plot_title = plot_title
         self.price_column = price_column
 
-        # Get list of CSV files in the folder and sort them
-        self.csv_files = sorted([f for f in os.listdir(folder_path) if f.endswith('.csv')],
-                                key=lambda x: int(x.split('_')[-1].split('.')[0]))
-
-        # Initialize current file index
-        self.current_file_index = 0
+        # The folder is listed once and the neighbouring windows are loaded
+        # in the background while one is shown
+        self.browser = FileBrowser(functools.partial(load_window, price_column), self, sort_key=window_number)
 
         # Create a figure and a canvas to display the plot
         self.figure = Figure()
@@ -74,34 +94,30 @@ class PlotWidget(QWidget):
         self.load_data()
         self.plot_graph()
 
-    def load_data(self):
-        # Load the CSV file at the current index
-        csv_file_path = os.path.join(self.folder_path, self.csv_files[self.current_file_index])
-        self.df = pd.read_csv(csv_file_path)
-        # Convert 'arrivaltime' column to datetime format
-        self.df['arrivaltime'] = pd.to_datetime(self.df['arrivaltime'], format='%H:%M:%S')
-        
+    def load_data(self, data=None):
+        # Open the first file of the folder unless the browser already stepped
+        if data is None:
+            data = self.browser.open_directory(self.folder_path)
+        self.df, self.df_times = data
+
         # Update the file name label
-        self.file_name_label.setText(f"File: {self.csv_files[self.current_file_index]}")
+        self.file_name_label.setText(f"File: {self.browser.name}")
 
     def plot_graph(self):
     
         # Get start and end times from the time edit widgets
-        start_time = self.start_time_edit.time().toString('HH:mm:ss')
-        end_time = self.end_time_edit.time().toString('HH:mm:ss')
+        start_time = self.start_time_edit.time().msecsSinceStartOfDay() // 1000
+        end_time = self.end_time_edit.time().msecsSinceStartOfDay() // 1000
 
         # Filter the data based on the specified time range
-        filtered_df = self.df[
-            (self.df['arrivaltime'].dt.time >= pd.to_datetime(start_time).time()) &
-            (self.df['arrivaltime'].dt.time <= pd.to_datetime(end_time).time())
-        ]
+        filtered_df = self.df_times.day_window(start_time, end_time)
 
         # Clear the existing plot
         self.figure.clear()
 
         # Create a new plot
         ax = self.figure.add_subplot(111)
-        ax.plot(filtered_df['arrivaltime'], filtered_df[self.price_column], label='Last Trade Price', marker='o')
+        ax.plot(seconds_to_datetime(filtered_df['arrivaltime']), filtered_df[self.price_column], label='Last Trade Price', marker='o')
 
         # Add title and labels
         ax.set_title(f'Arrivaltime vs. Last Trade Price ({self.plot_title})')
@@ -116,30 +132,153 @@ class PlotWidget(QWidget):
 
     def next_file(self):
         # Move to the next file if possible and update data and plot
-        if self.current_file_index < len(self.csv_files) - 1:
-            self.current_file_index += 1
-            self.load_data()
+        data = self.browser.step(1)
+        if data is not None:
+            self.load_data(data)
             self.plot_graph()
 
     def back_file(self):
         # Move to the previous file if possible and update data and plot
-        if self.current_file_index > 0:
-            self.current_file_index -= 1
-            self.load_data()
+        data = self.browser.step(-1)
+        if data is not None:
+            self.load_data(data)
             self.plot_graph()
 
-class ParallelPlotWidget(QWidget):
-    def __init__(self, folder1_path, folder2_path):
+    def closeEvent(self, event):
+        self.browser.close()
+        super().closeEvent(event)
+
+class SyncedPlotWidget(QWidget):
+    """
+    Windows of two folders stepped together in one figure.
+
+    The n-th file of each folder is shown in stacked subplots sharing the
+    time axis, under one set of time editors and Back/Next buttons. One
+    PairBrowser loads, caches and prefetches both files of a step, and a
+    step updates the persistent lines and redraws the canvas once.
+    """
+
+    def __init__(self, folder1_path, folder2_path, price_columns=('lastpredtrprc', 'lasttrprc'),
+                 titles=('Folder 1', 'Folder 2')):
         super().__init__()
 
-        # Create PlotWidget instances for each folder with the appropriate price columns
-        self.plot_widget1 = PlotWidget(folder1_path, 'Folder 1', 'lastpredtrprc')
-        self.plot_widget2 = PlotWidget(folder2_path, 'Folder 2', 'lasttrprc')
+        self.folder1_path = folder1_path
+        self.price_columns = price_columns
+        self.browser = PairBrowser(functools.partial(load_window_pair, price_columns), folder2_path, self,
+                                   sort_key=window_number)
+        self.data = [None, None]
+
+        # One figure, one subplot per folder, zoom and pan shared along x
+        self.figure = Figure()
+        self.canvas = FigureCanvas(self.figure)
+        self.toolbar = NavigationToolbar2QT(self.canvas, self)
+        self.axes = self.figure.subplots(2, 1, sharex=True)
+        self.lines = []
+        for ax, title in zip(self.axes, titles):
+            ax.xaxis_date()
+            ax.set_title(f'Arrivaltime vs. Last Trade Price ({title})')
+            ax.set_ylabel('Last Trade Price')
+            self.lines.append(ax.plot([], [], label='Last Trade Price', marker='o')[0])
+            ax.legend()
+        self.axes[-1].set_xlabel('Arrivaltime')
+
+        # Create the start and end time widgets
+        self.start_time_edit = QTimeEdit(self)
+        self.start_time_edit.setDisplayFormat('HH:mm:ss')
+        self.start_time_edit.setTime(QTime(9, 0, 0))
+
+        self.end_time_edit = QTimeEdit(self)
+        self.end_time_edit.setDisplayFormat('HH:mm:ss')
+        self.end_time_edit.setTime(QTime(16, 0, 0))
+
+        # Create the plot and navigation buttons
+        self.plot_button = QPushButton('Plot', self)
+        self.plot_button.clicked.connect(self.plot_graph)
+
+        self.back_button = QPushButton('Back', self)
+        self.back_button.clicked.connect(self.back_file)
+
+        self.next_button = QPushButton('Next', self)
+        self.next_button.clicked.connect(self.next_file)
+
+        self.file_name_label = QLabel(self)
+
+        controls_layout = QHBoxLayout()
+        controls_layout.addWidget(self.start_time_edit)
+        controls_layout.addWidget(self.end_time_edit)
+        controls_layout.addWidget(self.plot_button)
+        controls_layout.addWidget(self.back_button)
+        controls_layout.addWidget(self.next_button)
+        controls_layout.addWidget(self.file_name_label)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.toolbar)
+        layout.addWidget(self.canvas)
+        layout.addLayout(controls_layout)
+        self.setLayout(layout)
+
+        self.load_data()
+        self.plot_graph()
+
+    def load_data(self, data=None):
+        # Open the first pair of the folders unless the browser already stepped
+        if data is None:
+            data = self.browser.open_directory(self.folder1_path)
+        self.data = data or [None, None]
+        partner = self.browser.partner_path
+        self.file_name_label.setText(
+            f"Files: {self.browser.name} | {os.path.basename(partner) if partner else '-'}")
+
+    def plot_graph(self):
+        start_time = self.start_time_edit.time().msecsSinceStartOfDay() // 1000
+        end_time = self.end_time_edit.time().msecsSinceStartOfDay() // 1000
+
+        for ax, line, price_column, data in zip(self.axes, self.lines, self.price_columns, self.data):
+            if data is None:
+                line.set_data([], [])
+                continue
+            df, df_times = data
+            filtered_df = df_times.day_window(start_time, end_time)
+            line.set_data(date_numbers(filtered_df['arrivaltime']), filtered_df[price_column].to_numpy())
+            ax.relim()
+            ax.autoscale_view()
+
+        # One redraw for both panes
+        self.canvas.draw_idle()
+
+    def next_file(self):
+        data = self.browser.step(1)
+        if data is not None:
+            self.load_data(data)
+            self.plot_graph()
+
+    def back_file(self):
+        data = self.browser.step(-1)
+        if data is not None:
+            self.load_data(data)
+            self.plot_graph()
+
+    def closeEvent(self, event):
+        self.browser.close()
+        super().closeEvent(event)
+
+
+class ParallelPlotWidget(QWidget):
+    def __init__(self, folder1_path, folder2_path, synchronized=False):
+        super().__init__()
 
-        # Create a horizontal layout to hold both PlotWidget instances
+        # Create a horizontal layout to hold the panes
         layout = QHBoxLayout()
-        layout.addWidget(self.plot_widget1)
-        layout.addWidget(self.plot_widget2)
+        if synchronized:
+            # One figure, one set of controls and one loader for both folders
+            self.synced_widget = SyncedPlotWidget(folder1_path, folder2_path)
+            layout.addWidget(self.synced_widget)
+        else:
+            # Create PlotWidget instances for each folder with the appropriate price columns
+            self.plot_widget1 = PlotWidget(folder1_path, 'Folder 1', 'lastpredtrprc')
+            self.plot_widget2 = PlotWidget(folder2_path, 'Folder 2', 'lasttrprc')
+            layout.addWidget(self.plot_widget1)
+            layout.addWidget(self.plot_widget2)
 
         # Set the main layout
         self.setLayout(layout)
@@ -148,15 +287,18 @@ if __name__ == '__main__':
     # Initialize the QApplication
     app = QApplication(sys.argv)
 
-    # Get the folder paths from the command line arguments
-    if len(sys.argv) < 3:
-        print("Usage: python script.py <folder1_path> <folder2_path>")
+    # Get the folder paths from the command line arguments; --sync steps both
+    # folders together in one figure
+    synchronized = '--sync' in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != '--sync']
+    if len(args) < 2:
+        print("Usage: python script.py [--sync] <folder1_path> <folder2_path>")
         sys.exit(1)
-    folder2_path = sys.argv[1]
-    folder1_path = sys.argv[2]
+    folder2_path = args[0]
+    folder1_path = args[1]
 
     # Create the ParallelPlotWidget
-    parallel_plot_widget = ParallelPlotWidget(folder1_path, folder2_path)
+    parallel_plot_widget = ParallelPlotWidget(folder1_path, folder2_path, synchronized)
 
     # Show the widget
     parallel_plot_widget.show()
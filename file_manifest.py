@@ -0,0 +1,158 @@
+import os
+import re
+import json
+import hashlib
+from collections import namedtuple
+
+
+# Key of a file: everything from the first digit of its name, e.g. the date or
+# token in 'ticks_20240430.csv' and 'pred_20240430.csv'
+DEFAULT_PAIR_KEY = r'(\d.*)$'
+
+FilePair = namedtuple('FilePair', ['key', 'input_path', 'output_path'])
+
+
+def pair_key(file_name, pattern=DEFAULT_PAIR_KEY):
+    """
+    Key used to pair a tick file with its prediction file.
+
+    The pattern is searched in the file name without extension; its first
+    group (or the whole match) is the key. Names without a match use the
+    bare file name.
+    """
+    stem = os.path.splitext(file_name)[0]
+    match = re.search(pattern, stem)
+    if match is None:
+        return stem
+    return match.group(1) if match.groups() else match.group(0)
+
+
+def pair_files(input_folder, output_folder, pattern=DEFAULT_PAIR_KEY):
+    """
+    Pair the CSV files of the tick and prediction folders by key.
+
+    Returns a list of FilePair sorted by key. Files without a partner are
+    reported and skipped.
+    """
+    def index(folder):
+        files = {}
+        for file_name in sorted(os.listdir(folder)):
+            if not file_name.endswith('.csv'):
+                continue
+            key = pair_key(file_name, pattern)
+            if key in files:
+                print(f"Warning: {file_name} and {files[key]} share the key '{key}', using {files[key]}.")
+                continue
+            files[key] = file_name
+        return files
+
+    inputs = index(input_folder)
+    outputs = index(output_folder)
+
+    for key in sorted(inputs.keys() - outputs.keys()):
+        print(f"Warning: No prediction file for {inputs[key]} (key '{key}').")
+    for key in sorted(outputs.keys() - inputs.keys()):
+        print(f"Warning: No input file for {outputs[key]} (key '{key}').")
+
+    return [FilePair(key, os.path.join(input_folder, inputs[key]), os.path.join(output_folder, outputs[key]))
+            for key in sorted(inputs.keys() & outputs.keys())]
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    SHA-1 of the file contents.
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(path, previous=None):
+    """
+    Size, mtime and content hash of a file.
+
+    The hash is only recomputed when the size or mtime differ from the
+    `previous` fingerprint, so unchanged files cost a single stat call.
+    """
+    stat = os.stat(path)
+    if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+        return dict(previous)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': file_hash(path)}
+
+
+def params_key(params):
+    """
+    Stable string key of a parameter dictionary.
+    """
+    return json.dumps(params, sort_keys=True)
+
+
+class AnalysisManifest:
+    """
+    Persistent record of analysed file pairs and their cached results.
+
+    Each pair key maps to the fingerprints of its two files and to the
+    results computed for every parameter set. A result is reused as long as
+    both files still have the same contents (a touched but unchanged file is
+    detected through its hash); editing either file drops all cached results
+    of the pair.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.entries = data.get('pairs', {})
+
+    def _current(self, pair):
+        # Fingerprints of the pair, refreshed against the stored ones
+        entry = self.entries.get(pair.key, {})
+        return {
+            'input': fingerprint(pair.input_path, entry.get('input')),
+            'output': fingerprint(pair.output_path, entry.get('output')),
+        }
+
+    def lookup(self, pair, params):
+        """
+        Cached result of `pair` for `params`, or None if it must be recomputed.
+        """
+        entry = self.entries.get(pair.key)
+        if entry is None:
+            return None
+        current = self._current(pair)
+        if any(current[side]['sha1'] != entry[side]['sha1'] for side in ('input', 'output')):
+            return None
+
+        # Same contents: keep the fresh stat so the next run skips hashing
+        entry['input'], entry['output'] = current['input'], current['output']
+        return entry['results'].get(params_key(params))
+
+    def store(self, pair, params, result):
+        """
+        Record the result of `pair` for `params`.
+        """
+        current = self._current(pair)
+        entry = self.entries.get(pair.key)
+        if entry is None or any(current[side]['sha1'] != entry[side]['sha1'] for side in ('input', 'output')):
+            entry = {'results': {}}
+        entry.update(current)
+        entry['input_file'] = os.path.basename(pair.input_path)
+        entry['output_file'] = os.path.basename(pair.output_path)
+        entry['results'][params_key(params)] = result
+        self.entries[pair.key] = entry
+
+    def save(self):
+        """
+        Write the manifest atomically next to its final location.
+        """
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': self.VERSION, 'pairs': self.entries}, f)
+        os.replace(tmp_path, self.path)
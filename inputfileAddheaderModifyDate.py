@@ -2,6 +2,29 @@ import os
 import pandas as pd
 import sys
 
+# Timestamp layouts of the feed: convert_csv.py output and the raw
+# day-first Date/Time columns
+TIMESTAMP_FORMATS = ['%Y-%m-%d %H:%M:%S', '%d/%m/%Y %H:%M:%S']
+
+
+def normalize_timestamps(values):
+    """
+    Rewrite dated arrivaltime values as 'YYYY-MM-DD HH:MM:SS'.
+
+    Each value is parsed with the explicit layouts above; time-only values,
+    and anything matching no layout, are returned unchanged so the
+    partition date can still be applied to them later.
+    """
+    text = values.astype(str).str.strip()
+    normalized = text.copy()
+    pending = text
+    for layout in TIMESTAMP_FORMATS:
+        parsed = pd.to_datetime(pending, format=layout, errors='coerce').dropna()
+        normalized[parsed.index] = parsed.dt.strftime('%Y-%m-%d %H:%M:%S')
+        pending = pending.drop(parsed.index)
+    return normalized
+
+
 def process_csv_files(folder_path):
     # Get a list of CSV files in the folder
     csv_files = [f for f in os.listdir(folder_path) if f.endswith('.csv')]
@@ -14,8 +37,9 @@ def process_csv_files(folder_path):
         # Add header to the DataFrame
         df.columns = ['arrivaltime', 'sectoken', 'lasttrprc']
 
-        # Modify the timestamp format
-        df['arrivaltime'] = df['arrivaltime'].str.split().str[-1]
+        # Normalize the timestamp format, keeping the date so that days can be
+        # told apart and loaded together
+        df['arrivaltime'] = normalize_timestamps(df['arrivaltime'])
 
         # Save the modified DataFrame back to the CSV file
         df.to_csv(os.path.join(folder_path, csv_file), index=False)
@@ -0,0 +1,174 @@
+import io
+import os
+import numpy as np
+import pandas as pd
+
+from sequence_engine import evaluate_sequences
+from tick_loader import COMPACT_DTYPES, parse_timestamps
+
+
+class CsvTail:
+    """
+    Incremental reader for a CSV file that is still being appended to.
+
+    Every read_new() call parses only the complete lines written since the
+    previous call; a trailing partial line is left for the next call. If the
+    file shrinks (rotated or rewritten) it is read again from the start.
+    """
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+        self.header = None
+        self.offset = 0
+
+    def read_new(self):
+        """
+        DataFrame of the rows appended since the last call (may be empty).
+        """
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return self.empty()
+        if size < self.offset:
+            self.header = None
+            self.offset = 0
+        if size == self.offset:
+            return self.empty()
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+
+        end = chunk.rfind(b'\n') + 1
+        if end == 0:
+            return self.empty()
+        self.offset += end
+        chunk = chunk[:end]
+
+        if self.header is None:
+            line_end = chunk.index(b'\n') + 1
+            self.header = chunk[:line_end]
+            chunk = chunk[line_end:]
+            if not chunk:
+                return self.empty()
+
+        names = pd.read_csv(io.BytesIO(self.header), nrows=0).columns
+        dtypes = {column: dtype for column, dtype in COMPACT_DTYPES.items()
+                  if column in self.columns and column in names}
+        dtypes['arrivaltime'] = str
+        df = pd.read_csv(io.BytesIO(self.header + chunk), usecols=self.columns, dtype=dtypes)
+        df['arrivaltime'] = parse_timestamps(df['arrivaltime'].to_numpy())
+        return df
+
+    def empty(self):
+        return pd.DataFrame({column: [] for column in self.columns})
+
+
+class LiveSequenceMonitor:
+    """
+    Evaluate the sequences of a growing tick/prediction pair as they close.
+
+    A sequence is closed once a row of a later fileSeqNum has been appended
+    to the prediction file, and it is evaluated as soon as the ticks have
+    moved past its last prediction. Only the predictions of open sequences
+    and the ticks from the oldest open sequence onwards are kept, so memory
+    and the cost of each update stay bounded however long the day runs.
+    """
+
+    def __init__(self, tick_path, pred_path, expected_swing, band=1.5):
+        self.expected_swing = expected_swing
+        self.band = band
+        self.ticks = CsvTail(tick_path, ['arrivaltime', 'lasttrprc'])
+        self.predictions = CsvTail(pred_path, ['arrivaltime', 'lastpredtrprc', 'StanDev', 'fileSeqNum'])
+
+        self.tick_time = np.empty(0, dtype=np.int64)
+        self.tick_price = np.empty(0, dtype=float)
+        self.pending = self.predictions.empty()
+        self.closed_through = None
+        # Ticks before this time can no longer fall in any sequence
+        self.watermark = None
+
+        # Running totals over every evaluated sequence
+        self.sequences = 0
+        self.within_sd_sum = 0.0
+        self.target_met = 0
+        self.opportunities = 0
+        self.swing_successes = 0
+
+    def poll(self):
+        """
+        Read newly appended rows and evaluate the sequences that completed.
+
+        Returns the engine's result table for those sequences.
+        """
+        ticks = self.ticks.read_new()
+        if len(ticks):
+            self.tick_time = np.concatenate([self.tick_time, ticks['arrivaltime'].to_numpy(dtype=np.int64)])
+            self.tick_price = np.concatenate([self.tick_price, ticks['lasttrprc'].to_numpy(dtype=float)])
+
+        predictions = self.predictions.read_new()
+        predictions = predictions[predictions['fileSeqNum'].notna()]
+        if len(predictions):
+            self.pending = pd.concat([self.pending, predictions], ignore_index=True)
+            # Every sequence before the newest one is complete
+            self.closed_through = predictions['fileSeqNum'].iloc[-1]
+
+        return self.evaluate(final=False)
+
+    def finish(self):
+        """
+        Evaluate the sequences still open, e.g. at the end of the session.
+        """
+        self.poll()
+        return self.evaluate(final=True)
+
+    def evaluate(self, final):
+        if self.pending.empty:
+            return None
+
+        seq_nums = self.pending['fileSeqNum'].to_numpy()
+        times = self.pending['arrivaltime'].to_numpy()
+        if final:
+            ready = np.ones(len(seq_nums), dtype=bool)
+        else:
+            closed = seq_nums < self.closed_through
+            last_tick = self.tick_time.max() if len(self.tick_time) else -1
+            end_times = self.pending.groupby('fileSeqNum')['arrivaltime'].transform('max').to_numpy()
+            ready = closed & (end_times < last_tick)
+        if not ready.any():
+            self.trim()
+            return None
+
+        batch = self.pending[ready]
+        self.pending = self.pending[~ready].reset_index(drop=True)
+        results = evaluate_sequences(
+            self.tick_time, self.tick_price, times[ready], seq_nums[ready],
+            batch['lastpredtrprc'].to_numpy(), batch['StanDev'].to_numpy(),
+            self.expected_swing, self.band)
+
+        self.sequences += len(results)
+        # NaN propagates, as in the batch run's numpy sum
+        self.within_sd_sum += results['within_sd_pct'].to_numpy().sum()
+        self.target_met += int(results['target_met'].sum())
+        self.opportunities += int(results['swing_detected'].sum())
+        self.swing_successes += int(results['swing_success'].sum())
+
+        end_time = int(results['end_time'].max())
+        self.watermark = end_time if self.watermark is None else max(self.watermark, end_time)
+        self.trim()
+        return results
+
+    def trim(self):
+        """
+        Drop the ticks that no open or future sequence can use.
+        """
+        keep_from = self.watermark
+        if not self.pending.empty:
+            keep_from = int(self.pending['arrivaltime'].min())
+        if keep_from is None or not len(self.tick_time):
+            return
+        keep = self.tick_time >= keep_from
+        if not keep.all():
+            self.tick_time = self.tick_time[keep]
+            self.tick_price = self.tick_price[keep]
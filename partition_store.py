@@ -0,0 +1,306 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+import argparse
+import numpy as np
+
+from data_model import NO_SEQUENCE, NO_TOKEN, PredictionData, TickData, token_groups
+from file_manifest import pair_files, pair_key
+from tick_loader import SECONDS_PER_DAY, format_seconds, load_csv
+
+
+DEFAULT_STORE_DIR = os.environ.get(
+    'PYCODES_STORE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'pycodes', 'partitions'))
+
+# Model class of each kind of file
+KINDS = {'ticks': TickData, 'predictions': PredictionData}
+
+# Date of a file: the first 8-digit run of its name, e.g. '20240430'
+DATE_PATTERN = r'(\d{8})'
+
+# Bumped whenever the stored representation changes (2: dated arrivaltime,
+# 3: partitions tracked per source file, 4: day-first dates parsed as such)
+STORE_FORMAT = 4
+
+
+def file_date(path):
+    """
+    Date key of a data file, from its name.
+
+    Names without a date are keyed by their pair key and a hash of their
+    path, so same-named files of different folders do not share partitions.
+    """
+    name = os.path.basename(path)
+    match = re.search(DATE_PATTERN, name)
+    if match:
+        return match.group(1)
+    digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]
+    return f"{_safe_name(pair_key(name))}-{digest}"
+
+
+def date_seconds(date):
+    """
+    Seconds since 1970-01-01 of the midnight starting a 'YYYYMMDD' date, or None.
+    """
+    if not re.fullmatch(r'\d{8}', str(date)):
+        return None
+    try:
+        day = np.datetime64(f"{date[:4]}-{date[4:6]}-{date[6:]}", 'D')
+    except ValueError:
+        return None
+    return int(day.astype(np.int64)) * SECONDS_PER_DAY
+
+
+def _source_stat(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'format': STORE_FORMAT}
+
+
+def _safe_name(token):
+    if re.fullmatch(r'[\w.-]+', token):
+        return token
+    return hashlib.sha1(token.encode()).hexdigest()[:16]
+
+
+class PartitionStore:
+    """
+    Tick and prediction files split into one partition per date and sectoken.
+
+    Layout: <root>/<date>/index.json and <root>/<date>/<kind>/<token>/<field>.npy.
+    The index records, per kind, the source files of the date, the first
+    and last arrivaltime and, per token, the source file it came from, the
+    row count, first and last arrivaltime and stored fields. A date may be
+    fed by several files, e.g. one per token: each file only replaces the
+    tokens it contains. Partitions are memory-mapped on load, so opening one
+    token of a 500-token day pages in that token's columns only. Tick
+    partitions are sorted by time; prediction partitions keep the file
+    order, so sequences stay contiguous.
+
+    Times are stored as seconds since 1970-01-01. Time-only files are put
+    on the date of their partition, so days can be loaded together and
+    select() can skip every partition outside a time range.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+
+    def date_dir(self, date):
+        return os.path.join(self.root, str(date))
+
+    def read_index(self, date):
+        try:
+            with open(os.path.join(self.date_dir(date), 'index.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_index(self, date, index):
+        directory = self.date_dir(date)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, os.path.join(directory, 'index.json'))
+
+    def dates(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isfile(os.path.join(self.root, name, 'index.json')))
+
+    def tokens(self, date, kind='ticks'):
+        index = self.read_index(date) or {}
+        return sorted(index.get(kind, {}).get('tokens', {}))
+
+    def partition(self, date, kind, token):
+        """
+        Index entry of one partition (rows, start_time, end_time, fields), or None.
+        """
+        index = self.read_index(date) or {}
+        return index.get(kind, {}).get('tokens', {}).get(token)
+
+    def is_current(self, date, kind, path):
+        """
+        True when the stored partitions of `kind` were built from `path` as it is now.
+        """
+        index = self.read_index(date) or {}
+        source = _source_stat(path)
+        return index.get(kind, {}).get('sources', {}).get(source['path']) == source
+
+    def add_file(self, path, kind, date=None):
+        """
+        Split a tick or prediction file by sectoken into the partitions of its date.
+
+        Replaces the tokens the file contains and the tokens an earlier
+        version of the same file stored; other files' tokens of the date are
+        kept. Returns the date.
+        """
+        date = file_date(path) if date is None else str(date)
+        model = KINDS[kind]
+        # The partitions replace the column cache for these files
+        columns = model.csv_columns([name for name, _, _ in model.FIELDS])
+        data = model.from_frame(load_csv(path, columns, cache=False))
+        midnight = date_seconds(date)
+        if midnight is not None and len(data) and data.time.max() < SECONDS_PER_DAY:
+            data.time = data.time + midnight
+
+        if data.token is None:
+            groups = {NO_TOKEN: np.arange(len(data))}
+        else:
+            # Rows without a sectoken go to the NO_TOKEN partition
+            groups = token_groups(data.token, data.tokens)
+
+        source = _source_stat(path)
+        kind_dir = os.path.join(self.date_dir(date), kind)
+        os.makedirs(kind_dir, exist_ok=True)
+        tokens = {}
+        for token, rows in groups.items():
+            part = data.take(rows)
+            if kind == 'ticks' and len(part) and np.any(part.time[1:] < part.time[:-1]):
+                part = part.take(np.argsort(part.time, kind='stable'))
+            part_dir = os.path.join(kind_dir, _safe_name(token))
+            os.makedirs(part_dir, exist_ok=True)
+            fields = [name for name in part.fields() if name != 'token']
+            for name in fields:
+                fd, tmp_path = tempfile.mkstemp(dir=part_dir, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    np.save(f, np.ascontiguousarray(getattr(part, name)), allow_pickle=False)
+                os.replace(tmp_path, os.path.join(part_dir, f'{name}.npy'))
+            tokens[token] = {
+                'dir': _safe_name(token),
+                'source': source['path'],
+                'rows': len(part),
+                'start_time': int(part.time.min()) if len(part) else None,
+                'end_time': int(part.time.max()) if len(part) else None,
+                'fields': fields,
+            }
+
+        index = self.read_index(date) or {}
+        entry = index.get(kind, {})
+        sources = entry.get('sources', {})
+        sources[source['path']] = source
+        # Keep the tokens of the date's other files; partitions of an older
+        # layout (without sources) are rebuilt
+        kept = {name: part for name, part in entry.get('tokens', {}).items()
+                if name not in tokens and part.get('source') in sources and part['source'] != source['path']}
+        for name, part in entry.get('tokens', {}).items():
+            if name not in tokens and name not in kept:
+                shutil.rmtree(os.path.join(kind_dir, part['dir']), ignore_errors=True)
+        tokens.update(kept)
+        starts = [part['start_time'] for part in tokens.values() if part['rows']]
+        ends = [part['end_time'] for part in tokens.values() if part['rows']]
+        index[kind] = {
+            'sources': sources,
+            'start_time': min(starts) if starts else None,
+            'end_time': max(ends) if ends else None,
+            'tokens': dict(sorted(tokens.items())),
+        }
+        self._write_index(date, index)
+        return date
+
+    def import_pair(self, tick_path, pred_path, date=None):
+        """
+        Partition a tick/prediction pair unless the store is already up to date.
+        """
+        date = file_date(tick_path) if date is None else str(date)
+        for kind, path in (('ticks', tick_path), ('predictions', pred_path)):
+            if not self.is_current(date, kind, path):
+                self.add_file(path, kind, date)
+        return date
+
+    def load(self, date, kind, token, fields=None):
+        """
+        One partition as a TickData/PredictionData of memory-mapped columns.
+        """
+        entry = self.partition(date, kind, token)
+        if entry is None:
+            raise KeyError(f"No {kind} partition for token {token} on {date}")
+        fields = entry['fields'] if fields is None else fields
+        part_dir = os.path.join(self.date_dir(date), kind, entry['dir'])
+        columns = {name: np.load(os.path.join(part_dir, f'{name}.npy'), mmap_mode='r') for name in fields}
+        return KINDS[kind]([token], **columns)
+
+    def select(self, kind, start_time, end_time, token=None):
+        """
+        (date, token) of the partitions with rows between start_time and end_time.
+
+        Dates outside the range are skipped by name before their index is read.
+        """
+        selected = []
+        for date in self.dates():
+            midnight = date_seconds(date)
+            if midnight is not None and (midnight > end_time or midnight + SECONDS_PER_DAY <= start_time):
+                continue
+            entry = (self.read_index(date) or {}).get(kind, {})
+            if entry.get('start_time') is None or entry['start_time'] > end_time or entry['end_time'] < start_time:
+                continue
+            for name, part in sorted(entry['tokens'].items()):
+                if token is not None and name != token:
+                    continue
+                if part['rows'] and part['start_time'] <= end_time and part['end_time'] >= start_time:
+                    selected.append((date, name))
+        return selected
+
+    def range_tokens(self, start_time, end_time):
+        """
+        Tokens with both ticks and predictions between start_time and end_time.
+        """
+        predicted = {name for _, name in self.select('predictions', start_time, end_time)}
+        return sorted({name for _, name in self.select('ticks', start_time, end_time) if name in predicted})
+
+    def load_range(self, start_time, end_time, token, tick_fields=None, prediction_fields=None):
+        """
+        Ticks and predictions of one token between start_time and end_time.
+
+        Only the partitions that overlap the range are opened. Every sequence
+        with a prediction in the range is kept whole, and the ticks cover the
+        range and those sequences. Sequence ids of a later date that repeat
+        an earlier date's ids are shifted past them, so they stay unique.
+        """
+        predictions = []
+        last_seq = NO_SEQUENCE
+        for date, _ in self.select('predictions', start_time, end_time, token):
+            part = self.load(date, 'predictions', token, prediction_fields)
+            inside = (part.time >= start_time) & (part.time <= end_time)
+            seq = np.asarray(part.seq)
+            kept = np.unique(seq[inside & (seq != NO_SEQUENCE)])
+            part = part.take(np.isin(seq, kept))
+            if len(part):
+                if part.seq.min() <= last_seq:
+                    part.seq = part.seq + (last_seq + 1 - part.seq.min())
+                last_seq = int(part.seq.max())
+                predictions.append(part)
+        predictions = PredictionData.concatenate(predictions)
+
+        if len(predictions):
+            start_time = min(start_time, int(predictions.time.min()))
+            end_time = max(end_time, int(predictions.time.max()))
+        ticks = []
+        for date, _ in self.select('ticks', start_time, end_time, token):
+            part = self.load(date, 'ticks', token, tick_fields)
+            # Tick partitions are sorted, so the range is a slice of the memory map
+            lo = np.searchsorted(part.time, start_time, side='left')
+            hi = np.searchsorted(part.time, end_time, side='right')
+            ticks.append(part.take(slice(lo, hi)))
+        ticks = TickData.concatenate(ticks)
+        if len(ticks) and np.any(ticks.time[1:] < ticks.time[:-1]):
+            ticks = ticks.take(np.argsort(ticks.time, kind='stable'))
+        return ticks, predictions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Split tick and prediction files by date and sectoken.')
+    parser.add_argument('input_folder', type=str, help='Folder with the tick CSV files')
+    parser.add_argument('output_folder', type=str, help='Folder with the prediction CSV files')
+    parser.add_argument('--store', type=str, default=DEFAULT_STORE_DIR, help='Root folder of the partition store')
+
+    args = parser.parse_args()
+    store = PartitionStore(args.store)
+    for pair in pair_files(args.input_folder, args.output_folder):
+        date = store.import_pair(pair.input_path, pair.output_path)
+        entry = store.read_index(date)['ticks']
+        span = format_seconds([entry['start_time'] or 0, entry['end_time'] or 0])
+        print(f"{date}: {len(store.tokens(date))} tokens, {span[0]} to {span[1]}")
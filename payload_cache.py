@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+
+DEFAULT_MAX_ENTRIES = 64
+
+
+class PayloadCache:
+    """
+    Bounded in-memory LRU cache of prepared per-sequence plot payloads.
+
+    Keys are (fileSeqNum, swing_value, probability), so changing a threshold
+    never shows a stale swing annotation. The cache is shared between the
+    GUI thread and the prefetch worker and guarded by a lock; payloads are
+    treated as read-only once stored.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def get(self, key):
+        """
+        The payload stored for key (marking it recently used), or None.
+        """
+        with self.lock:
+            payload = self.entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        with self.lock:
+            self.entries[key] = payload
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def prefetch_order(sequence_index, file_seq_num, direction, ahead=4, behind=1):
+    """
+    Sequence ids to warm around file_seq_num, nearest first in the direction of travel.
+    """
+    seq_ids = []
+    for offset in list(range(1, ahead + 1)) + list(range(-1, -behind - 1, -1)):
+        seq_id = sequence_index.step(file_seq_num, offset * direction)
+        if seq_id != file_seq_num and seq_id not in seq_ids:
+            seq_ids.append(seq_id)
+    return seq_ids
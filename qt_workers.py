@@ -0,0 +1,143 @@
+import traceback
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from cancel_token import CancelToken, TaskCancelled
+
+
+class TaskSignals(QObject):
+    # channel, generation, payload
+    finished = pyqtSignal(str, int, object)
+    failed = pyqtSignal(str, int, str)
+    progress = pyqtSignal(str, int, int)
+
+
+class Task(QRunnable):
+    def __init__(self, signals, channel, generation, token, function, args):
+        super().__init__()
+        self.signals = signals
+        self.channel = channel
+        self.generation = generation
+        self.token = token
+        self.function = function
+        self.args = args
+
+    def run(self):
+        try:
+            result = self.function(*self.args, token=self.token)
+        except TaskCancelled:
+            return
+        except Exception:
+            self.emit('failed', traceback.format_exc())
+            return
+        if not self.token.cancelled:
+            self.emit('finished', result)
+
+    def emit(self, name, payload):
+        try:
+            getattr(self.signals, name).emit(self.channel, self.generation, payload)
+        except RuntimeError:
+            # The runner was deleted (window closed, interpreter exiting);
+            # an exception escaping run() would abort the process
+            pass
+
+
+class TaskRunner(QObject):
+    """
+    Run functions on a QThreadPool and post their results back to the GUI thread.
+
+    Requests are grouped in named channels (e.g. 'load', 'plot', 'scan').
+    Submitting to a channel cancels the request still running there and bumps
+    the channel's generation; results and progress of older generations are
+    dropped, so only the newest request of a channel ever reaches the GUI.
+    Functions receive a CancelToken as the `token` keyword argument and
+    should call token.check() or token.progress() in long loops.
+    """
+
+    progress = pyqtSignal(str, int)
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self.signals = TaskSignals()
+        self.signals.finished.connect(self.on_finished)
+        self.signals.failed.connect(self.on_failed)
+        self.signals.progress.connect(self.on_progress)
+        self.generations = {}
+        self.tokens = {}
+        self.callbacks = {}
+
+    def submit(self, channel, function, *args, on_result=None, on_error=None):
+        """
+        Run function(*args, token=...) in the pool; returns the request's generation.
+        """
+        self.cancel(channel)
+        generation = self.generations.get(channel, 0) + 1
+        self.generations[channel] = generation
+
+        def report(percent):
+            try:
+                self.signals.progress.emit(channel, generation, percent)
+            except RuntimeError:
+                token.cancel()
+
+        token = CancelToken(report)
+        self.tokens[channel] = token
+        self.callbacks[channel] = (on_result, on_error)
+        self.busy_changed.emit(True)
+        self.pool.start(Task(self.signals, channel, generation, token, function, args))
+        return generation
+
+    def cancel(self, channel):
+        """
+        Cancel the request running in `channel`, if any.
+        """
+        token = self.tokens.pop(channel, None)
+        if token is not None:
+            token.cancel()
+            self.callbacks.pop(channel, None)
+            self.busy_changed.emit(self.busy())
+
+    def cancel_all(self):
+        for channel in list(self.tokens):
+            self.cancel(channel)
+
+    def busy(self, channel=None):
+        if channel is None:
+            return bool(self.tokens)
+        return channel in self.tokens
+
+    def wait(self, msecs=-1):
+        """
+        Block until the pool is idle; pending results are delivered on the next
+        pass of the event loop (call QApplication.processEvents()).
+        """
+        return self.pool.waitForDone(msecs)
+
+    def is_current(self, channel, generation):
+        return self.generations.get(channel) == generation and channel in self.tokens
+
+    def on_finished(self, channel, generation, result):
+        if not self.is_current(channel, generation):
+            return
+        on_result, on_error = self.callbacks.pop(channel)
+        del self.tokens[channel]
+        self.busy_changed.emit(self.busy())
+        if on_result is not None:
+            on_result(result)
+
+    def on_failed(self, channel, generation, message):
+        if not self.is_current(channel, generation):
+            return
+        on_result, on_error = self.callbacks.pop(channel)
+        del self.tokens[channel]
+        self.busy_changed.emit(self.busy())
+        if on_error is not None:
+            on_error(message)
+        else:
+            print(f"Background task '{channel}' failed:\n{message}")
+
+    def on_progress(self, channel, generation, percent):
+        if self.is_current(channel, generation):
+            self.progress.emit(channel, percent)
@@ -0,0 +1,188 @@
+import os
+import sys
+import html
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from cancel_token import CancelToken
+from partition_store import DEFAULT_STORE_DIR, PartitionStore
+from sequence_plot import SequencePlot
+from tick_loader import format_seconds, parse_timestamp
+from viewer_data import load_viewer_data, scan_opportunities, sequence_payload
+
+# Defaults of the viewer's swing and probability boxes
+DEFAULT_SWING = 100
+DEFAULT_PROBABILITY = 0.7
+
+# Sequences handed to a worker at a time; small enough to balance the pool
+CHUNK_SIZE = 16
+
+# zlib level of the PNGs: level 1 cuts the encoding time by about 40% against
+# the default 6 for plots like these, with files of about the same size
+PNG_COMPRESS_LEVEL = 1
+
+
+class HeadlessCanvas(FigureCanvasAgg):
+    # Every frame is drawn exactly once, by savefig(); SequencePlot's
+    # repaint requests would otherwise draw it a second time
+    def draw_idle(self, *args, **kwargs):
+        pass
+
+
+# Per-process state set up by init_worker(): the loaded sequences and one figure
+_worker = {}
+
+
+def init_worker(store_root, csv_file1, csv_file2, sectoken, time_range, size, dpi):
+    """
+    Load the data (from the partition store for a time range) and create the figure reused for every frame.
+    """
+    data = load_viewer_data(PartitionStore(store_root), csv_file1, csv_file2, sectoken, time_range,
+                            token=CancelToken())
+    figure = Figure(figsize=size, dpi=dpi)
+    HeadlessCanvas(figure)
+    _worker['data'] = data
+    _worker['plot'] = SequencePlot(figure, animated=False)
+
+
+def render_chunk(seq_ids, output_dir, image_format, swing_value, probability):
+    """
+    Render sequences to output_dir, as plot_graph() shows them; returns one entry per image.
+    """
+    data = _worker['data']
+    plot = _worker['plot']
+    token = CancelToken()
+    rendered = []
+    for file_seq_num in seq_ids:
+        payload = sequence_payload(data['df1'], data['df2'], data['sequence_index'], file_seq_num,
+                                   swing_value, probability, token)
+        if payload is None:
+            continue
+        plot.update(payload['tick_time'], payload['tick_price'],
+                    payload['pred_time'], payload['pred_price'], payload['pred_sd'])
+        annotation = payload['annotation']
+        if annotation is not None:
+            plot.annotate(*annotation)
+        plot.ax.set_title(f"Arrivaltime vs. Last Trade Price (sequence {file_seq_num})")
+
+        file_name = f"seq_{file_seq_num}.{image_format}"
+        options = {'pil_kwargs': {'compress_level': PNG_COMPRESS_LEVEL}} if image_format == 'png' else {}
+        plot.figure.savefig(os.path.join(output_dir, file_name), format=image_format, **options)
+        rendered.append({
+            'file_seq_num': file_seq_num,
+            'file': file_name,
+            'start_time': payload['start_time'],
+            'end_time': payload['end_time'],
+            'swing': None if annotation is None else annotation[2],
+        })
+    return rendered
+
+
+def write_index(path, title, rendered):
+    """
+    Gallery page linking every rendered image, in sequence order.
+    """
+    items = []
+    for entry in rendered:
+        start, end = format_seconds([entry['start_time'], entry['end_time']])
+        caption = f"Sequence {entry['file_seq_num']}: {start} to {end}"
+        if entry['swing']:
+            caption += " | " + entry['swing'].replace('\n', ', ')
+        items.append(
+            f'<figure><a href="{html.escape(entry["file"])}"><img src="{html.escape(entry["file"])}" '
+            f'loading="lazy" alt="{html.escape(caption)}"></a>'
+            f'<figcaption>{html.escape(caption)}</figcaption></figure>')
+    with open(path, 'w') as f:
+        f.write(
+            "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+            f"<title>{html.escape(title)}</title>"
+            "<style>body{font-family:sans-serif}main{display:flex;flex-wrap:wrap;gap:12px}"
+            "figure{margin:0;width:480px}img{width:100%}figcaption{font-size:13px}</style>"
+            f"</head><body><h1>{html.escape(title)}</h1><p>{len(rendered)} sequences</p><main>\n"
+            + "\n".join(items) + "\n</main></body></html>\n")
+
+
+def render_sequences(output_dir, csv_file1=None, csv_file2=None, time_range=None, sectoken=None,
+                     only_swings=False, swing_value=DEFAULT_SWING, probability=DEFAULT_PROBABILITY,
+                     image_format='png', workers=1, size=(12, 6), dpi=100, store_root=DEFAULT_STORE_DIR):
+    """
+    Render every sequence of a file pair (or of a time range of the store) and write index.html.
+
+    The data is loaded once here, filling the column cache (or, for a time
+    range, read from the store); every worker then memory-maps it and
+    renders its share of the sequences into one figure.
+    Returns the index entries of the rendered images.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    data = load_viewer_data(PartitionStore(store_root), csv_file1, csv_file2, sectoken, time_range,
+                            token=CancelToken())
+    sectoken = data['sectoken']
+    sequence_index = data['sequence_index']
+    if only_swings:
+        opportunities = scan_opportunities(data['df2'], sequence_index, swing_value, probability, CancelToken())
+        seq_ids = sorted(int(seq_id) for seq_id in opportunities['fileSeqNum'])
+    else:
+        seq_ids = [int(seq_id) for seq_id in sequence_index.seq_ids]
+
+    chunks = [seq_ids[i:i + CHUNK_SIZE] for i in range(0, len(seq_ids), CHUNK_SIZE)]
+    init_args = (store_root, csv_file1, csv_file2, sectoken, time_range, size, dpi)
+    render_args = (output_dir, image_format, swing_value, probability)
+    rendered = []
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=init_worker,
+                                 initargs=init_args) as executor:
+            for part in executor.map(render_chunk, chunks, *[[arg] * len(chunks) for arg in render_args]):
+                rendered.extend(part)
+    else:
+        init_worker(*init_args)
+        for chunk in chunks:
+            rendered.extend(render_chunk(chunk, *render_args))
+
+    if time_range is None:
+        title = f"{os.path.basename(csv_file2)} - sectoken {sectoken}"
+    else:
+        title = f"{' to '.join(format_seconds(time_range))} - sectoken {sectoken}"
+    if only_swings:
+        title += f" - swings of {swing_value} with probability > {probability}"
+    write_index(os.path.join(output_dir, 'index.html'), title, rendered)
+    return rendered
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render every prediction sequence to an image gallery.')
+    parser.add_argument('output_folder', type=str, help='Folder receiving the images and index.html')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--files', nargs=2, metavar=('TICKS', 'PREDICTIONS'),
+                        help='Tick and prediction CSV files to render')
+    source.add_argument('--range', nargs=2, metavar=('START', 'END'),
+                        help="Render the stored sequences between two timestamps (e.g. '2024-04-30 10:00')")
+    parser.add_argument('--token', type=str, help='Sectoken to render (default: the first one)')
+    parser.add_argument('--only-swings', action='store_true',
+                        help='Only render sequences with a detected swing')
+    parser.add_argument('--swing', type=int, default=DEFAULT_SWING, help='Swing (in price points) to annotate')
+    parser.add_argument('--probability', type=float, default=DEFAULT_PROBABILITY,
+                        help='High_Prob/Low_Prob a swing needs to be annotated')
+    parser.add_argument('--format', type=str, default='png', choices=['png', 'svg'], help='Image format')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes (default: one per CPU)')
+    parser.add_argument('--size', type=float, nargs=2, default=(12, 6), metavar=('WIDTH', 'HEIGHT'),
+                        help='Image size in inches')
+    parser.add_argument('--dpi', type=int, default=100, help='Image resolution')
+    parser.add_argument('--store', type=str, default=DEFAULT_STORE_DIR, help='Root folder of the partition store')
+
+    args = parser.parse_args()
+    csv_file1, csv_file2 = args.files if args.files else (None, None)
+    time_range = tuple(parse_timestamp(text) for text in args.range) if args.range else None
+
+    started = time.perf_counter()
+    rendered = render_sequences(args.output_folder, csv_file1, csv_file2, time_range, args.token,
+                                args.only_swings, args.swing, args.probability, args.format, args.workers,
+                                tuple(args.size), args.dpi, args.store)
+    print(f"Rendered {len(rendered)} sequences to {args.output_folder} in {time.perf_counter() - started:.1f}s")
+    sys.exit(0)
@@ -0,0 +1,83 @@
+import os
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+class SequenceResultWriter:
+    """
+    Buffered, streaming writer for per-sequence result rows.
+
+    Frames passed to write() are collected in memory and flushed to disk in
+    blocks of at least `buffer_rows` rows, so large runs neither keep every
+    row in memory nor issue one write per file. The format follows the file
+    extension: '.csv' or '.parquet' (the latter needs pyarrow).
+    """
+
+    def __init__(self, path, buffer_rows=100000):
+        self.path = path
+        self.buffer_rows = buffer_rows
+        self.format = os.path.splitext(path)[1].lower().lstrip('.')
+        if self.format not in ('csv', 'parquet'):
+            raise ValueError(f"Unsupported results format '{self.format}', use .csv or .parquet")
+        if self.format == 'parquet' and pq is None:
+            raise ImportError("Writing Parquet results requires pyarrow")
+
+        self.pending = []
+        self.pending_rows = 0
+        self.rows_written = 0
+        self.file = None
+        self.parquet_writer = None
+
+    def write(self, frame):
+        """
+        Queue the rows of `frame`, flushing once the buffer is full.
+        """
+        if frame is None or frame.empty:
+            return
+        self.pending.append(frame)
+        self.pending_rows += len(frame)
+        if self.pending_rows >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        block = pd.concat(self.pending, ignore_index=True)
+        self.pending = []
+        self.pending_rows = 0
+
+        if self.format == 'csv':
+            if self.file is None:
+                self.file = open(self.path, 'w', newline='', buffering=1 << 20)
+                block.to_csv(self.file, index=False)
+            else:
+                block.to_csv(self.file, index=False, header=False)
+        else:
+            table = pa.Table.from_pandas(block, preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = table.cast(self.parquet_writer.schema)
+            self.parquet_writer.write_table(table)
+        self.rows_written += len(block)
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,493 @@
+import numpy as np
+import pandas as pd
+
+
+def sequence_bounds(seq_nums):
+    """
+    Group prediction rows by their fileSeqNum.
+
+    Returns (order, seq_ids, starts, ends). `order` is a stable permutation of
+    the row positions that makes every sequence contiguous, so the rows of
+    seq_ids[i] are order[starts[i]:ends[i]]. Sequences are sorted by id and
+    rows with a NaN sequence number are dropped.
+    """
+    seq_nums = np.asarray(seq_nums, dtype=float)
+    valid = np.flatnonzero(~np.isnan(seq_nums))
+    local_order = np.argsort(seq_nums[valid], kind='stable')
+    order = valid[local_order]
+    sorted_seq = seq_nums[order]
+
+    # A new sequence starts wherever the sorted id changes
+    boundaries = np.flatnonzero(np.diff(sorted_seq)) + 1
+    starts = np.concatenate(([0], boundaries)) if len(order) else np.empty(0, dtype=np.intp)
+    ends = np.concatenate((boundaries, [len(order)])) if len(order) else np.empty(0, dtype=np.intp)
+    return order, sorted_seq[starts], starts.astype(np.intp), ends.astype(np.intp)
+
+
+def segment_reduce(ufunc, values, starts, ends, empty):
+    """
+    Apply `ufunc.reduce` to every slice values[starts[i]:ends[i]].
+
+    Slices may overlap and may be empty; empty slices get the `empty` value.
+    """
+    values = np.asarray(values)
+    starts = np.asarray(starts, dtype=np.intp)
+    ends = np.asarray(ends, dtype=np.intp)
+    out = np.full(len(starts), empty, dtype=np.result_type(values.dtype, np.min_scalar_type(empty)))
+
+    nonempty = ends > starts
+    if nonempty.any():
+        # reduceat over interleaved (start, end) pairs reduces each [start, end)
+        # slice at the even positions; the padding element keeps end == len valid
+        idx = np.empty(2 * nonempty.sum(), dtype=np.intp)
+        idx[0::2] = starts[nonempty]
+        idx[1::2] = ends[nonempty]
+        padded = np.concatenate((values, values[:1]))
+        out[nonempty] = ufunc.reduceat(padded, idx)[0::2]
+    return out
+
+
+def _time_values(times):
+    # Datetimes are compared as int64 nanoseconds, everything else as-is
+    times = np.asarray(times)
+    if np.issubdtype(times.dtype, np.datetime64):
+        return times.astype('datetime64[ns]').view(np.int64)
+    return times
+
+
+def sort_ticks(tick_time, tick_price):
+    """
+    Return the tick arrays sorted by time (stable), copying only when needed.
+    """
+    tick_time = _time_values(tick_time)
+    tick_price = np.asarray(tick_price, dtype=float)
+    if len(tick_time) and np.any(tick_time[1:] < tick_time[:-1]):
+        order = np.argsort(tick_time, kind='stable')
+        tick_time = tick_time[order]
+        tick_price = tick_price[order]
+    return tick_time, tick_price
+
+
+class SequenceIndex:
+    """
+    Row ranges of every prediction sequence and of its tick window.
+
+    Built once per file pair so that looking up a fileSeqNum is a dict hit
+    followed by two slices instead of masking both frames. `tick_time` must
+    be sorted; the tick window of a sequence runs from its first to its last
+    prediction time, inclusive.
+    """
+
+    def __init__(self, pred_seq, pred_time, tick_time):
+        order, self.seq_ids, starts, ends = sequence_bounds(pred_seq)
+        # Grouping of the prediction rows, for scans over every sequence at once
+        self.order, self.starts, self.ends = order, starts, ends
+        pred_time = _time_values(pred_time)
+        tick_time = _time_values(tick_time)
+
+        self.start_time = segment_reduce(np.minimum, pred_time[order], starts, ends, 0)
+        self.end_time = segment_reduce(np.maximum, pred_time[order], starts, ends, 0)
+        self.tick_start = np.searchsorted(tick_time, self.start_time, side='left')
+        self.tick_stop = np.searchsorted(tick_time, self.end_time, side='right')
+
+        # Sequences are normally written as one block of rows; keep the row
+        # positions only for those that are not
+        self.row_start = order[starts]
+        self.row_stop = order[ends - 1] + 1
+        contiguous = self.row_stop - self.row_start == ends - starts
+        self.scattered = {i: order[starts[i]:ends[i]] for i in np.flatnonzero(~contiguous)}
+
+        self.positions = {seq_id: i for i, seq_id in enumerate(self.seq_ids.tolist())}
+
+    def __len__(self):
+        return len(self.seq_ids)
+
+    def position(self, seq_id):
+        """
+        Position of seq_id among the sorted sequence ids, or None.
+        """
+        return self.positions.get(float(seq_id))
+
+    def rows(self, i):
+        """
+        Prediction rows of the i-th sequence, as a slice when contiguous.
+        """
+        if i in self.scattered:
+            return self.scattered[i]
+        return slice(int(self.row_start[i]), int(self.row_stop[i]))
+
+    def tick_rows(self, i):
+        """
+        Slice of the ticks between the first and last prediction of the i-th sequence.
+        """
+        return slice(int(self.tick_start[i]), int(self.tick_stop[i]))
+
+    def step(self, seq_id, offset):
+        """
+        Id of the sequence `offset` positions away from seq_id, clamped to the ends.
+
+        Ids missing from the file step to their nearest neighbour.
+        """
+        if not len(self.seq_ids):
+            return None
+        i = self.position(seq_id)
+        if i is None:
+            i = np.searchsorted(self.seq_ids, seq_id)
+            # seq_id falls between i - 1 and i
+            if offset > 0:
+                offset -= 1
+        i = min(max(int(i) + offset, 0), len(self.seq_ids) - 1)
+        return self.seq_ids[i]
+
+
+class FirstPassage:
+    """
+    First position at which each slice of a series reaches a threshold.
+
+    The slices values[starts[i]:ends[i]], each multiplied by signs[i], are
+    gathered end to end and slice i is shifted up by i * span, where span is
+    wider than the range of the data. A single running maximum over the whole
+    array then restarts at every slice and stays sorted, so the first
+    position where slice i reaches a threshold is one searchsorted call,
+    for all slices and for any number of threshold sets.
+    """
+
+    def __init__(self, values, starts, ends, signs=1):
+        values = np.asarray(values, dtype=float)
+        self.starts = np.asarray(starts, dtype=np.intp)
+        self.ends = np.asarray(ends, dtype=np.intp)
+        self.signs = np.broadcast_to(np.asarray(signs, dtype=float), self.starts.shape)
+
+        lengths = np.maximum(self.ends - self.starts, 0)
+        self.offsets = np.concatenate(([0], np.cumsum(lengths)))
+        slice_of_row = np.repeat(np.arange(len(lengths)), lengths)
+        rows = np.arange(self.offsets[-1]) - self.offsets[:-1][slice_of_row] + self.starts[slice_of_row]
+        gathered = values[rows] * self.signs[slice_of_row]
+
+        finite = gathered[np.isfinite(gathered)]
+        self.low = finite.min() if len(finite) else 0.0
+        self.high = finite.max() if len(finite) else 0.0
+        # Missing values sit below every reachable threshold
+        gathered = np.where(np.isfinite(gathered), gathered, self.low - 1)
+        self.span = self.high - self.low + 2
+        self.shift = np.arange(len(lengths)) * self.span
+        self.running_max = np.maximum.accumulate(gathered + self.shift[slice_of_row])
+
+    def first_index(self, thresholds):
+        """
+        Offset from the slice start of the first value >= threshold (after
+        applying the slice sign), or -1 where the slice never gets there.
+        """
+        thresholds = np.broadcast_to(np.asarray(thresholds, dtype=float), self.starts.shape)
+        thresholds = thresholds * self.signs
+        # Thresholds above every value land past the slice, below every value at its start
+        clamped = np.clip(thresholds, self.low, self.high + 0.5)
+        pos = np.searchsorted(self.running_max, clamped + self.shift, side='left')
+        found = (pos < self.offsets[1:]) & ~np.isnan(thresholds)
+        return np.where(found, pos - self.offsets[:-1], -1)
+
+
+class SequenceStats:
+    """
+    Per-sequence statistics shared by the single-run and sweep evaluations.
+
+    Building this sorts the ticks and the prediction rows once and derives,
+    for every fileSeqNum, its tick window, first/last/extreme predictions,
+    extreme actual prices and the largest swing of the prediction. Any
+    expected swing, SD band or probability threshold can then be scored
+    against these arrays without touching the rows again. Tick times are
+    assumed unique, as produced by convert_csv.
+    """
+
+    def __init__(self, tick_time, tick_price, pred_time, pred_seq, pred_price, pred_sd,
+                 high_prob=None, low_prob=None):
+        self.tick_time, self.tick_price = sort_ticks(tick_time, tick_price)
+        self.time_dtype = np.asarray(pred_time).dtype
+
+        order, self.seq_ids, starts, ends = sequence_bounds(pred_seq)
+        self.starts, self.ends = starts, ends
+        self.p_time = _time_values(pred_time)[order]
+        self.p_price = np.asarray(pred_price, dtype=float)[order]
+        self.p_sd = np.asarray(pred_sd, dtype=float)[order]
+        self.high_prob = None if high_prob is None else np.asarray(high_prob, dtype=float)[order]
+        self.low_prob = None if low_prob is None else np.asarray(low_prob, dtype=float)[order]
+        self.lengths = ends - starts
+        # Position of every ordered row's sequence in seq_ids
+        self.row_seq = np.repeat(np.arange(len(starts)), self.lengths)
+
+        self.start_time = segment_reduce(np.minimum, self.p_time, starts, ends, 0)
+        self.end_time = segment_reduce(np.maximum, self.p_time, starts, ends, 0)
+        self.first_pred = self.p_price[starts]
+        self.last_pred = self.p_price[ends - 1]
+        self.max_pred = segment_reduce(np.fmax, self.p_price, starts, ends, -np.inf)
+        self.min_pred = segment_reduce(np.fmin, self.p_price, starts, ends, np.inf)
+        self.upward = self.last_pred > self.first_pred
+
+        # Tick window [start_time, end_time] of every sequence
+        self.lo = np.searchsorted(self.tick_time, self.start_time, side='left')
+        self.hi = np.searchsorted(self.tick_time, self.end_time, side='right')
+        self.max_actual = segment_reduce(np.fmax, self.tick_price, self.lo, self.hi, -np.inf)
+        self.min_actual = segment_reduce(np.fmin, self.tick_price, self.lo, self.hi, np.inf)
+        self.target_met = np.where(self.upward,
+                                   self.max_actual >= self.max_pred,
+                                   self.min_actual <= self.min_pred)
+
+        # Signed move of the prediction away from its first value
+        self.swing = self.p_price - self.first_pred[self.row_seq]
+        self.max_swing = segment_reduce(np.fmax, np.abs(self.swing), starts, ends, -np.inf)
+
+        # Tick at the same arrival time as each prediction row
+        n_ticks = len(self.tick_time)
+        pos = np.minimum(np.searchsorted(self.tick_time, self.p_time, side='left'), max(n_ticks - 1, 0))
+        if n_ticks:
+            self.matched = self.tick_time[pos] == self.p_time
+            self.actual = self.tick_price[pos]
+        else:
+            self.matched = np.zeros(len(self.p_time), dtype=bool)
+            self.actual = np.full(len(self.p_time), np.nan)
+        self.matched_count = segment_reduce(np.add, self.matched.astype(np.int64), starts, ends, 0)
+
+        # First-passage searches are built on first use
+        self._favourable = None
+        self._adverse = None
+        self._target_index = None
+
+    def times(self, values):
+        """
+        Convert start/end time values back to the dtype of the input times.
+        """
+        if np.issubdtype(self.time_dtype, np.datetime64):
+            return values.view('datetime64[ns]')
+        return values
+
+    def within_sd_pct(self, band):
+        """
+        Percentage of matched ticks within `band` SDs of the prediction.
+        """
+        within = self.matched & (self.actual >= self.p_price - band * self.p_sd) & \
+            (self.actual <= self.p_price + band * self.p_sd)
+        within_count = segment_reduce(np.add, within.astype(np.int64), self.starts, self.ends, 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.matched_count > 0, within_count / self.matched_count * 100, np.nan)
+
+    def within_sd_pct_grid(self, bands):
+        """
+        within_sd_pct() for several bands at once, as a (sequences, bands) array.
+
+        Every row is ranked once against the sorted bands, so the cost does
+        not grow with the number of bands beyond a cumulative sum.
+        """
+        bands = np.asarray(bands, dtype=float)
+        band_order = np.argsort(bands)
+        sorted_bands = bands[band_order]
+
+        # Distance to the prediction in units of SD; unmatched rows never count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            deviation = np.abs(self.actual - self.p_price)
+            ratio = np.where(self.p_sd == 0, np.where(deviation == 0, 0.0, np.inf),
+                             deviation / self.p_sd)
+        ratio = np.where(self.matched, ratio, np.nan)
+
+        # First band wide enough for each row; NaN ranks past the last band
+        rank = np.searchsorted(sorted_bands, ratio, side='left')
+        n_seq, n_bands = len(self.starts), len(bands)
+        counts = np.bincount(self.row_seq * (n_bands + 1) + rank,
+                             minlength=n_seq * (n_bands + 1)).reshape(n_seq, n_bands + 1)
+        within_count = np.cumsum(counts, axis=1)[:, :n_bands]
+
+        pct = np.empty((n_seq, n_bands))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pct[:, band_order] = np.where(self.matched_count[:, None] > 0,
+                                          within_count / self.matched_count[:, None] * 100, np.nan)
+        return pct
+
+    def opportunity_swing(self, probability=None):
+        """
+        Largest swing of each sequence that counts towards an opportunity.
+
+        Without a probability threshold this is the plain maximum swing.
+        Otherwise only rows whose High_Prob (upward swing) or Low_Prob
+        (downward swing) exceeds `probability` are considered, as in the
+        viewer's opportunity scan.
+        """
+        if probability is None:
+            return self.max_swing
+        prob = np.where(self.swing >= 0, self.high_prob, self.low_prob)
+        gated = np.where(prob > probability, np.abs(self.swing), -np.inf)
+        return segment_reduce(np.fmax, gated, self.starts, self.ends, -np.inf)
+
+    def first_passage(self, expected_swing):
+        """
+        Order-aware outcome of the swing trade for every sequence.
+
+        Returns (target_index, stop_index, won): the tick offsets, from the
+        start of each sequence window, at which the actual price first
+        reached the predicted high/low and first moved `expected_swing`
+        against the trade (-1 if never), and whether the target came first.
+        """
+        if self._favourable is None:
+            signs = np.where(self.upward, 1.0, -1.0)
+            self._favourable = FirstPassage(self.tick_price, self.lo, self.hi, signs)
+            self._adverse = FirstPassage(self.tick_price, self.lo, self.hi, -signs)
+            self._target_index = self._favourable.first_index(
+                np.where(self.upward, self.max_pred, self.min_pred))
+
+        stop_price = np.where(self.upward, self.first_pred - expected_swing,
+                              self.first_pred + expected_swing)
+        stop_index = self._adverse.first_index(stop_price)
+        target_index = self._target_index
+        won = (target_index >= 0) & ((stop_index < 0) | (target_index < stop_index))
+        return target_index, stop_index, won
+
+    def time_to(self, index):
+        """
+        Seconds from the start of each sequence to the tick at `index`
+        (relative to the window start), NaN where index is -1.
+        """
+        ticks = np.minimum(self.lo + np.maximum(index, 0), max(len(self.tick_time) - 1, 0))
+        if not len(self.tick_time):
+            return np.full(len(index), np.nan)
+        elapsed = (self.tick_time[ticks] - self.start_time).astype(float)
+        if np.issubdtype(self.time_dtype, np.datetime64):
+            elapsed /= 1e9
+        return np.where(index >= 0, elapsed, np.nan)
+
+
+def evaluate_sequences(tick_time, tick_price, pred_time, pred_seq, pred_price, pred_sd,
+                       expected_swing, band=1.5):
+    """
+    Evaluate every prediction sequence against the tick data in one pass.
+
+    For each fileSeqNum this computes the same quantities as the per-sequence
+    loop in StockAnalyzer: the tick window between the first and last
+    prediction, the maximum swing of the prediction from its first value, the
+    percentage of ticks within `band` standard deviations of the prediction,
+    whether the predicted high/low was reached and whether the swing trade
+    reached that target before its stop loss, with the time to each.
+
+    Returns a DataFrame with one row per sequence, ordered by fileSeqNum.
+    """
+    stats = SequenceStats(tick_time, tick_price, pred_time, pred_seq, pred_price, pred_sd)
+    swing_detected = stats.max_swing >= expected_swing
+    target_index, stop_index, won = stats.first_passage(expected_swing)
+
+    return pd.DataFrame({
+        'fileSeqNum': stats.seq_ids,
+        'start_time': stats.times(stats.start_time),
+        'end_time': stats.times(stats.end_time),
+        'upward': stats.upward,
+        'first_pred': stats.first_pred,
+        'max_swing': stats.max_swing,
+        'within_sd_pct': stats.within_sd_pct(band),
+        'target_met': stats.target_met,
+        'swing_detected': swing_detected,
+        'stop_loss_hit': swing_detected & ~won & (stop_index >= 0),
+        'swing_success': swing_detected & won,
+        'time_to_target': stats.time_to(target_index),
+        'time_to_stop': stats.time_to(stop_index),
+    })
+
+
+def evaluate_grid(stats, swings, bands, probabilities):
+    """
+    Score a SequenceStats for every (expected swing, band, probability) point.
+
+    Returns a tidy DataFrame with one row per grid point holding the sequence
+    count, opportunities, swing successes, predicted target hits and the sum
+    of the per-sequence within-SD percentages.
+    """
+    swings = np.asarray(swings, dtype=float)
+    within_sum = stats.within_sd_pct_grid(bands).sum(axis=0)
+
+    # (sequences, swings) table of trades that reached the target before the stop
+    won = np.column_stack([stats.first_passage(expected_swing)[2] for expected_swing in swings]) \
+        if len(swings) else np.zeros((len(stats.starts), 0), dtype=bool)
+
+    rows = []
+    for probability in probabilities:
+        detected = stats.opportunity_swing(probability)[:, None] >= swings[None, :]
+        opportunities = detected.sum(axis=0)
+        successes = (detected & won).sum(axis=0)
+        for i, expected_swing in enumerate(swings):
+            for j, band in enumerate(bands):
+                rows.append({
+                    'expected_swing': expected_swing,
+                    'band': band,
+                    'probability': probability,
+                    'sequences': len(stats.starts),
+                    'opportunities': int(opportunities[i]),
+                    'swing_successes': int(successes[i]),
+                    'target_met': int(stats.target_met.sum()),
+                    'within_sd_sum': within_sum[j],
+                })
+    return pd.DataFrame(rows)
+
+
+def evaluate_frames(df1, df2, expected_swing, band=1.5):
+    """
+    DataFrame front end for evaluate_sequences().
+
+    `df1` holds the ticks (arrivaltime, lasttrprc) and `df2` the predictions
+    (arrivaltime, lastpredtrprc, StanDev, fileSeqNum).
+    """
+    return evaluate_sequences(
+        df1['arrivaltime'].to_numpy(), df1['lasttrprc'].to_numpy(),
+        df2['arrivaltime'].to_numpy(), df2['fileSeqNum'].to_numpy(),
+        df2['lastpredtrprc'].to_numpy(), df2['StanDev'].to_numpy(),
+        expected_swing, band)
+
+
+def evaluate_data(ticks, predictions, expected_swing, band=1.5):
+    """
+    evaluate_sequences() front end for data_model.TickData and PredictionData.
+
+    The compact float32 prices are widened to float64 for the evaluation, so
+    results match evaluate_frames() up to the rounding of the stored prices.
+    """
+    return evaluate_sequences(
+        ticks.time, ticks.price, predictions.time, predictions.sequence_numbers(predictions.seq),
+        predictions.price, predictions.sd, expected_swing, band)
+
+
+def swing_opportunities(pred_time, pred_price, high_prob, low_prob, swing_value, probability,
+                        pred_seq=None, bounds=None):
+    """
+    The viewer's opportunity scan over every sequence at once.
+
+    Per sequence the swing is the prediction minus its first value. Rows
+    whose swing reaches +-swing_value are crossings. If the swing ever reaches
+    -swing_value the crossings are gated on Low_Prob ('Down'), otherwise on
+    High_Prob ('Up'), and the first crossing whose probability exceeds
+    `probability` makes the sequence an opportunity, exactly as the
+    per-sequence loop did. `bounds` is the (order, seq_ids, starts, ends)
+    grouping of sequence_bounds(), e.g. from a SequenceIndex; without it
+    the rows are grouped by pred_seq.
+
+    Returns a DataFrame with one row per opportunity, ordered by fileSeqNum:
+    fileSeqNum, direction, max_swing, probability and arrivaltime of the
+    crossing.
+    """
+    order, seq_ids, starts, ends = bounds if bounds is not None else sequence_bounds(pred_seq)
+    price = np.asarray(pred_price, dtype=float)[order]
+    segment = np.repeat(np.arange(len(starts)), ends - starts)
+
+    swing = price - price[starts][segment]
+    max_swing = segment_reduce(np.fmax, np.abs(swing), starts, ends, np.nan)
+    up = swing >= swing_value
+    down = swing <= -swing_value
+    use_low = segment_reduce(np.maximum, down.astype(np.int8), starts, ends, 0) > 0
+
+    prob = np.where(use_low[segment], np.asarray(low_prob, dtype=float)[order],
+                    np.asarray(high_prob, dtype=float)[order])
+    hits = np.flatnonzero((up | down) & (prob > probability))
+    # Rows are grouped by sequence in file order, so the first hit of each segment wins
+    first = hits[np.unique(segment[hits], return_index=True)[1]]
+    matched = segment[first]
+
+    return pd.DataFrame({
+        'fileSeqNum': seq_ids[matched],
+        'direction': np.where(use_low[matched], 'Down', 'Up'),
+        'max_swing': max_swing[matched],
+        'probability': prob[first],
+        'arrivaltime': np.asarray(pred_time)[order][first],
+    })
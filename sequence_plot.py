@@ -0,0 +1,179 @@
+import numpy as np
+import matplotlib.dates as mdates
+
+from decimate import LineDecimator
+from tick_loader import seconds_to_datetime
+
+
+def date_numbers(seconds):
+    """
+    Matplotlib date numbers for arrivaltime seconds (since 1970-01-01).
+    """
+    return mdates.date2num(seconds_to_datetime(seconds))
+
+
+def date_seconds(numbers):
+    """
+    Arrivaltime seconds for matplotlib date numbers, the inverse of date_numbers().
+    """
+    return (np.asarray(numbers, dtype=float) - date_numbers([0])[0]) * 86400.0
+
+
+class SequencePlot:
+    """
+    Persistent artists for the tick/prediction plot of one sequence.
+
+    The axes, the Line2D artists, the swing annotation and the legend are
+    created once. update() swaps the data in with set_data() and rescales
+    the axes, scheduling one repaint with draw_idle() so bursts of updates
+    (wheel zoom, key repeat) coalesce. Each line draws a min/max decimated
+    copy of its data, refreshed on zoom and resize. The lines and the annotation are
+    animated artists: toggling them restores the cached background (axes,
+    ticks, legend) and blits only those artists, without a full redraw.
+    With animated=False (batch rendering) every artist is drawn normally
+    and no background is kept.
+    """
+
+    def __init__(self, figure, animated=True):
+        self.figure = figure
+        self.canvas = figure.canvas
+        self.ax = figure.add_subplot(111)
+        self.ax.xaxis_date()
+        self.ax.set_title('Arrivaltime vs. Last Trade Price')
+        self.ax.set_xlabel('Arrivaltime')
+        self.ax.set_ylabel('Price')
+
+        self.lines = {
+            'ticks': self.ax.plot([], [], label='Last Trade Price (CSV 1)', marker='o', color='blue')[0],
+            'prediction': self.ax.plot([], [], label='Last Predicted Trade Price (CSV 2)', marker='.',
+                                       color='orange', alpha=0.4, lw=4)[0],
+            'sd_high': self.ax.plot([], [], label='M+StanDev', marker='.', color='green', alpha=0.6, lw=4)[0],
+            'sd_low': self.ax.plot([], [], label='M-StanDev', marker='.', color='red', alpha=0.6, lw=4)[0],
+        }
+        self.annotation = self.ax.text(0, 0, '', color='red', fontsize=10, ha='center', va='bottom',
+                                       visible=False)
+        # The legend is part of the background and lists every line
+        self.legend = self.ax.legend(handles=list(self.lines.values()))
+
+        self.decimator = LineDecimator(self.ax)
+        # Full series shown in part by set_prefix(), converted once
+        self.prefixes = {}
+
+        self.animated = list(self.lines.values()) + [self.annotation] if animated else []
+        for artist in self.animated:
+            artist.set_animated(True)
+        self.background = None
+        if animated:
+            self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def on_draw(self, event):
+        # A full redraw leaves out animated artists; keep it as the background
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        for artist in self.animated:
+            self.ax.draw_artist(artist)
+
+    def blit(self):
+        """
+        Repaint the animated artists over the cached background.
+        """
+        if self.background is None or not getattr(self.canvas, 'supports_blit', False):
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_animated()
+        self.canvas.blit(self.ax.bbox)
+
+    def update(self, tick_time, tick_price, pred_time, pred_price, pred_sd=None):
+        """
+        Show new tick and prediction data (arrivaltime seconds).
+        """
+        tick_x = date_numbers(tick_time)
+        pred_x = date_numbers(pred_time)
+        pred_price = np.asarray(pred_price, dtype=float)
+        self.decimator.set_data(self.lines['ticks'], tick_x, tick_price, refresh=False)
+        self.decimator.set_data(self.lines['prediction'], pred_x, pred_price, refresh=False)
+        if pred_sd is not None:
+            pred_sd = np.asarray(pred_sd, dtype=float)
+            self.decimator.set_data(self.lines['sd_high'], pred_x, pred_price + pred_sd, refresh=False)
+            self.decimator.set_data(self.lines['sd_low'], pred_x, pred_price - pred_sd, refresh=False)
+        self.annotation.set_visible(False)
+        self.prefixes.clear()
+        self.rescale()
+
+    def set_prefix(self, name, times, prices, count):
+        """
+        Show the first `count` points of a series on one line without
+        rescaling, e.g. ticks growing during replay.
+
+        The series is converted once; while `count` grows in the same view
+        only the new points are decimated and checked against the axes, so a
+        frame costs the points it adds. Repaints with a blit while the
+        points stay inside the axes, and rescales (one full redraw) once
+        they leave it.
+        """
+        source = self.prefixes.get(name)
+        if source is None or source[0] is not times:
+            source = (times, date_numbers(times), np.asarray(prices, dtype=float), 0)
+        _, x, y, shown = source
+        self.prefixes[name] = (times, x, y, count)
+        # Only points added since the last call can leave the axes
+        new = slice(shown, count) if shown < count else slice(0, count)
+        self.decimator.extend(self.lines[name], x[:count], y[:count])
+        x_min, x_max = sorted(self.ax.get_xlim())
+        y_min, y_max = sorted(self.ax.get_ylim())
+        new_x, new_y = x[new], y[new]
+        if len(new_x) and (new_x[0] < x_min or new_x[-1] > x_max
+                           or np.nanmin(new_y) < y_min or np.nanmax(new_y) > y_max):
+            self.rescale()
+        else:
+            self.blit()
+
+    def annotate(self, seconds, price, text):
+        """
+        Place the swing annotation, or hide it when text is None.
+        """
+        if text is None:
+            self.annotation.set_visible(False)
+        else:
+            self.annotation.set_position((date_numbers([seconds])[0], price))
+            self.annotation.set_text(text)
+            self.annotation.set_visible(True)
+        self.blit()
+
+    def set_visible(self, visible, *names):
+        """
+        Show or hide lines by name ('ticks', 'prediction', 'sd_high', 'sd_low').
+
+        The axes limits are kept, so a toggle never loses the current zoom.
+        """
+        for name in names:
+            self.lines[name].set_visible(visible)
+        self.blit()
+
+    def set_legend_visible(self, visible):
+        self.legend.set_visible(visible)
+        self.canvas.draw_idle()
+
+    def rescale(self):
+        """
+        Fit the axes to the visible lines and schedule a repaint.
+        """
+        # Autoscale on the full data, then decimate for the new view
+        self.decimator.restore()
+        self.ax.relim(visible_only=True)
+        self.ax.autoscale_view()
+        self.decimator.refresh()
+        self.canvas.draw_idle()
+
+    def zoom(self, x, y, factor):
+        """
+        Zoom both axes around (x, y) by factor (> 1 zooms out).
+        """
+        x0, x1 = self.ax.get_xlim()
+        y0, y1 = self.ax.get_ylim()
+        self.ax.set_xlim(x - (x - x0) * factor, x + (x1 - x) * factor)
+        self.ax.set_ylim(y - (y - y0) * factor, y + (y1 - y) * factor)
+        self.canvas.draw_idle()
@@ -0,0 +1,205 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+
+# Trading session of the generated ticks, in seconds since midnight
+SESSION_START = 9 * 3600 + 15 * 60
+SESSION_END = 15 * 3600 + 30 * 60
+
+PREDICTION_HEADER = ['arrivaltime', 'sectoken', 'lastpredtrprc', 'StanDev', 'low_prc', 'high_prc',
+                     'ClusterCentroidHigh', 'High_Prob', 'ClusterCentroidLow', 'Low_Prob',
+                     'Max_Centroid', 'Min_Centroid', 'clusterIdx', 'clusterProb', 'fileSeqNum']
+
+
+def time_strings(seconds):
+    """
+    'HH:MM:SS' strings for seconds since midnight.
+    """
+    seconds = np.asarray(seconds)
+    return np.char.add(np.char.add(np.char.add(np.char.zfill((seconds // 3600).astype(str), 2), ':'),
+                                   np.char.add(np.char.zfill((seconds // 60 % 60).astype(str), 2), ':')),
+                       np.char.zfill((seconds % 60).astype(str), 2))
+
+
+def write_frame(frame, path):
+    """
+    Write a frame as CSV, with pyarrow's much faster writer when installed.
+    """
+    if pa is None:
+        frame.to_csv(path, index=False)
+        return
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    with open(path, 'wb') as f:
+        f.write((','.join(frame.columns) + '\n').encode())
+        pa_csv.write_csv(table, f, pa_csv.WriteOptions(include_header=False, quoting_style='none'))
+
+
+def trading_days(start_date, days):
+    """
+    The first `days` weekdays on or after start_date.
+    """
+    return pd.bdate_range(start=start_date, periods=days)
+
+
+def generate_ticks(rng, start_price=48000.0, volatility=3.0):
+    """
+    One session of one-second ticks as a random walk.
+
+    Returns the seconds since midnight and the prices.
+    """
+    seconds = np.arange(SESSION_START, SESSION_END, dtype=np.int64)
+    prices = start_price + np.cumsum(rng.normal(0, volatility, len(seconds)))
+    return seconds, prices.round(2)
+
+
+def raw_tick_frame(rng, date, token, seconds, prices, drop_rate=0.02, duplicate_rate=0.01):
+    """
+    Ticks as delivered by the feed (Date, Time, Ticker, LTP).
+
+    Some seconds are missing and some repeated, as in the real files, so
+    that convert_csv has to de-duplicate and impute them.
+    """
+    keep = rng.random(len(seconds)) >= drop_rate
+    repeat = np.where(rng.random(len(seconds)) < duplicate_rate, 2, 1)
+    index = np.repeat(np.flatnonzero(keep), repeat[keep])
+    # Feed data also covers a few minutes outside the session
+    before = np.arange(SESSION_START - 300, SESSION_START)
+    return pd.DataFrame({
+        'Date': date.strftime('%d/%m/%Y'),
+        'Time': np.concatenate([time_strings(before), time_strings(seconds[index])]),
+        'Ticker': token,
+        'LTP': np.concatenate([np.full(len(before), prices[0]), prices[index]]),
+    })
+
+
+def tick_frame(token, seconds, prices):
+    """
+    Converted ticks (arrivaltime, sectoken, lasttrprc).
+    """
+    return pd.DataFrame({'arrivaltime': time_strings(seconds), 'sectoken': token, 'lasttrprc': prices})
+
+
+def prediction_frame(rng, token, seconds, prices, seq_len=900, seq_step=180):
+    """
+    Prediction sequences over the ticks.
+
+    A new sequence of `seq_len` one-second predictions starts every
+    `seq_step` seconds; each drifts away from the price it started at by a
+    random trend, so some sequences contain swings and some do not. Moves
+    scale with the price level, so swing thresholds around 100 points suit
+    instruments trading near 48000.
+    """
+    scale = prices.mean() / 48000
+    starts = np.arange(0, max(len(seconds) - seq_len, 0), seq_step)
+    rows = (starts[:, None] + np.arange(seq_len)).ravel()
+    count = len(rows)
+    shape = (len(starts), seq_len)
+
+    base = prices[starts] + rng.normal(0, 5 * scale, len(starts))
+    trend = rng.normal(0, 120 * scale, len(starts))[:, None] * np.linspace(0, 1, seq_len)
+    pred = (base[:, None] + np.cumsum(rng.normal(0, 2 * scale, shape), axis=1) + trend).ravel()
+    sd = np.abs(rng.normal(15 * scale, 4 * scale, count))
+
+    return pd.DataFrame({
+        'arrivaltime': time_strings(seconds[rows]),
+        'sectoken': token,
+        'lastpredtrprc': pred.round(2),
+        'StanDev': sd.round(3),
+        'low_prc': (pred - 2 * sd).round(2),
+        'high_prc': (pred + 2 * sd).round(2),
+        'ClusterCentroidHigh': (pred + sd).round(2),
+        'High_Prob': rng.random(count).round(3),
+        'ClusterCentroidLow': (pred - sd).round(2),
+        'Low_Prob': rng.random(count).round(3),
+        'Max_Centroid': (pred + 3 * sd).round(2),
+        'Min_Centroid': (pred - 3 * sd).round(2),
+        'clusterIdx': rng.integers(0, 5, count).astype(float),
+        'clusterProb': rng.random(count).round(3),
+        'fileSeqNum': np.repeat(np.arange(1, len(starts) + 1, dtype=float), seq_len),
+    }, columns=PREDICTION_HEADER)
+
+
+def generate_dataset(output_folder, days=1, tokens=1, seed=0, start_date='2024-01-01',
+                     seq_len=900, seq_step=180, raw=True, mixed=False):
+    """
+    Write a synthetic data set under output_folder.
+
+    Creates raw/ (feed ticks for convert_csv), ticks/ (converted ticks) and
+    predictions/ with one '<YYYYMMDD>_<token>.csv' file per trading day and
+    token. With mixed=True every day is a single '<YYYYMMDD>.csv' holding
+    all tokens, ticks and predictions interleaved in time order. Returns a
+    dict with the three folders and the number of rows and bytes written.
+    """
+    folders = {name: os.path.join(output_folder, name) for name in ('raw', 'ticks', 'predictions')}
+    for name, folder in folders.items():
+        if name != 'raw' or raw:
+            os.makedirs(folder, exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    token_ids = 40000 + np.arange(tokens) * 7
+    start_prices = rng.uniform(1000, 50000, tokens).round(2)
+    stats = {'files': 0, 'tick_rows': 0, 'prediction_rows': 0, 'bytes': 0}
+
+    for date in trading_days(start_date, days):
+        day_frames = {}
+        for token, start_price in zip(token_ids, start_prices):
+            file_name = f"{date.strftime('%Y%m%d')}_{token}.csv"
+            seconds, prices = generate_ticks(rng, start_price, volatility=start_price * 6e-5)
+            # Carry the closing price over to the next day
+            start_prices[token_ids == token] = prices[-1]
+
+            frames = [('ticks', tick_frame(token, seconds, prices)),
+                      ('predictions', prediction_frame(rng, token, seconds, prices, seq_len, seq_step))]
+            if raw:
+                frames.append(('raw', raw_tick_frame(rng, date, token, seconds, prices)))
+            stats['tick_rows'] += len(frames[0][1])
+            stats['prediction_rows'] += len(frames[1][1])
+            if mixed:
+                for name, frame in frames:
+                    day_frames.setdefault(name, []).append(frame)
+                continue
+            for name, frame in frames:
+                path = os.path.join(folders[name], file_name)
+                write_frame(frame, path)
+                stats['bytes'] += os.path.getsize(path)
+            stats['files'] += 1
+
+        if mixed:
+            for name, parts in day_frames.items():
+                frame = pd.concat(parts, ignore_index=True)
+                if 'arrivaltime' in frame.columns:
+                    frame = frame.sort_values('arrivaltime', kind='stable', ignore_index=True)
+                path = os.path.join(folders[name], f"{date.strftime('%Y%m%d')}.csv")
+                write_frame(frame, path)
+                stats['bytes'] += os.path.getsize(path)
+            stats['files'] += 1
+
+    stats.update(folders)
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic tick and prediction files.')
+    parser.add_argument('output_folder', type=str, help='Folder receiving raw/, ticks/ and predictions/')
+    parser.add_argument('--days', type=int, default=1, help='Number of trading days (about 250 per year)')
+    parser.add_argument('--tokens', type=int, default=1, help='Number of instruments per day')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--start-date', type=str, default='2024-01-01', help='First trading day')
+    parser.add_argument('--seq-len', type=int, default=900, help='Predictions per sequence')
+    parser.add_argument('--seq-step', type=int, default=180, help='Seconds between sequence starts')
+    parser.add_argument('--no-raw', action='store_true', help='Do not write the raw feed files')
+    parser.add_argument('--mixed', action='store_true', help='Write one file per day holding every token')
+
+    args = parser.parse_args()
+    stats = generate_dataset(args.output_folder, args.days, args.tokens, args.seed, args.start_date,
+                             args.seq_len, args.seq_step, raw=not args.no_raw, mixed=args.mixed)
+    print(f"Wrote {stats['files']} tick/prediction pairs ({stats['tick_rows']} ticks, "
+          f"{stats['prediction_rows']} predictions, {stats['bytes'] / 1e6:.1f} MB) to {args.output_folder}")
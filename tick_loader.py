@@ -0,0 +1,271 @@
+import os
+import numpy as np
+import pandas as pd
+
+from column_cache import default_cache
+
+try:
+    import pyarrow  # noqa: F401  (only needed for the multithreaded CSV engine)
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+
+# Columns each consumer actually reads
+TICK_COLUMNS = ['arrivaltime', 'lasttrprc']
+PREDICTION_COLUMNS = ['arrivaltime', 'lastpredtrprc', 'StanDev', 'fileSeqNum']
+
+# Compact dtypes for the columns that do not need float64; prices and
+# StanDev stay float64 so that band and target comparisons are unchanged
+COMPACT_DTYPES = {
+    'sectoken': 'category',
+    'High_Prob': np.float32,
+    'Low_Prob': np.float32,
+    'clusterProb': np.float32,
+    'clusterIdx': np.float32,
+    'fileSeqNum': np.float32,
+}
+
+# Files above this size are parsed with the multithreaded pyarrow engine
+PYARROW_MIN_BYTES = 32 * 1024 * 1024
+
+SECONDS_PER_DAY = 24 * 3600
+
+# Layouts tried, in order, for arrivaltimes off the fixed-width fast path:
+# ISO dates, the raw feed's day-first dates, then times of day. The short
+# ISO forms are for command line ranges such as '2024-04-30 10:00'.
+TIMESTAMP_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+    '%d/%m/%Y %H:%M:%S',
+    '%H:%M:%S',
+    '%H:%M:%S.%f',
+    '%H:%M',
+]
+_EPOCH = np.datetime64('1970-01-01', 's')
+
+
+def parse_timestamps(values):
+    """
+    Parse arrivaltime strings into int64 seconds since 1970-01-01.
+
+    'YYYY-MM-DD HH:MM:SS' keeps its date; time-only 'HH:MM:SS' values have no
+    date and land on 1970-01-01, i.e. they are seconds since midnight.
+    Fixed-width strings are decoded straight from their bytes; anything else
+    is parsed with the explicit TIMESTAMP_FORMATS, never by guessing, and a
+    value matching none of them raises ValueError.
+    """
+    values = np.asarray(values)
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    try:
+        raw = values.astype('S')
+    except (UnicodeEncodeError, ValueError):
+        raw = None
+
+    if raw is not None and raw.dtype.itemsize >= 8:
+        width = raw.dtype.itemsize
+        chars = np.frombuffer(raw.tobytes(), dtype=np.uint8).reshape(len(raw), width)
+        # Every string must fill the full width, so the time sits at the end
+        if (chars[:, -1] != 0).all():
+            tail = chars[:, width - 8:].astype(np.int32) - ord('0')
+            digits = tail[:, [0, 1, 3, 4, 6, 7]]
+            colons = (chars[:, width - 6] == ord(':')) & (chars[:, width - 3] == ord(':'))
+            if colons.all() and ((digits >= 0) & (digits <= 9)).all():
+                hours = digits[:, 0] * 10 + digits[:, 1]
+                minutes = digits[:, 2] * 10 + digits[:, 3]
+                seconds = digits[:, 4] * 10 + digits[:, 5]
+                if (hours < 24).all() and (minutes < 60).all() and (seconds < 60).all():
+                    day_seconds = (hours * 3600 + minutes * 60 + seconds).astype(np.int64)
+                    if width == 8:
+                        return day_seconds
+                    # 'YYYY-MM-DD HH:MM:SS': the date is the first ten characters
+                    if width == 19:
+                        try:
+                            days = raw.astype('S10').astype('datetime64[D]').astype(np.int64)
+                        except ValueError:
+                            days = None
+                        if days is not None:
+                            return days * SECONDS_PER_DAY + day_seconds
+
+    pending = pd.Series(values).astype(str).str.strip()
+    seconds = np.zeros(len(pending), dtype=np.int64)
+    for layout in TIMESTAMP_FORMATS:
+        parsed = pd.to_datetime(pending, format=layout, errors='coerce').dropna()
+        if '%d' in layout:
+            matched = (parsed - _EPOCH) // pd.Timedelta(seconds=1)
+        else:
+            # pandas puts time-only values on 1900-01-01
+            matched = (parsed - parsed.dt.normalize()) // pd.Timedelta(seconds=1)
+        seconds[parsed.index] = matched.to_numpy()
+        pending = pending.drop(parsed.index)
+        if pending.empty:
+            return seconds
+    raise ValueError(f"Unrecognized arrivaltime values, e.g. {pending.iloc[:3].tolist()}")
+
+
+def parse_timestamp(text):
+    """
+    Seconds since 1970-01-01 of one timestamp such as '2024-04-30 10:00'.
+    """
+    return int(parse_timestamps([text])[0])
+
+
+def time_of_day(seconds):
+    """
+    Seconds since midnight of timestamps in seconds since 1970-01-01.
+    """
+    return np.asarray(seconds, dtype=np.int64) % SECONDS_PER_DAY
+
+
+def seconds_to_datetime(seconds):
+    """
+    datetime64 values for plotting; time-only data falls on 1970-01-01.
+    """
+    return _EPOCH + np.asarray(seconds).astype('timedelta64[s]')
+
+
+def format_seconds(seconds):
+    """
+    'HH:MM:SS' strings for times of day, 'YYYY-MM-DD HH:MM:SS' for dated timestamps.
+    """
+    seconds = np.asarray(seconds, dtype=np.int64)
+    text = [f"{s // 3600 % 24:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in seconds.tolist()]
+    dated = seconds >= SECONDS_PER_DAY
+    if dated.any():
+        days = (seconds // SECONDS_PER_DAY).astype('datetime64[D]').astype(str)
+        text = [f"{day} {hms}" if has_date else hms for day, hms, has_date in zip(days, text, dated)]
+    return pd.Series(text)
+
+
+def read_csv(path, columns=None, engine=None):
+    """
+    Parse a tick or prediction CSV, bypassing the column cache.
+
+    Only `columns` are parsed (all of them when None), compact dtypes are
+    applied and arrivaltime becomes int64 seconds since 1970-01-01 (see
+    parse_timestamps()). The engine
+    defaults to pyarrow for large files when it is installed.
+    """
+    if engine is None:
+        engine = 'pyarrow' if HAVE_PYARROW and os.path.getsize(path) >= PYARROW_MIN_BYTES else 'c'
+
+    dtypes = {'arrivaltime': str}
+    if columns is None:
+        dtypes.update(COMPACT_DTYPES)
+    else:
+        dtypes.update({column: dtype for column, dtype in COMPACT_DTYPES.items() if column in columns})
+
+    if engine == 'pyarrow':
+        # pyarrow rejects dtypes for columns that are not in the file
+        header = pd.read_csv(path, nrows=0).columns
+        dtypes = {column: dtype for column, dtype in dtypes.items() if column in header}
+
+    df = pd.read_csv(path, usecols=columns, dtype=dtypes, engine=engine)
+    if 'arrivaltime' in df.columns:
+        df['arrivaltime'] = parse_timestamps(df['arrivaltime'].to_numpy())
+    for column in df.columns:
+        # Category labels are strings whichever engine parsed them
+        if isinstance(df[column].dtype, pd.CategoricalDtype) and df[column].cat.categories.dtype.kind != 'O':
+            df[column] = df[column].cat.rename_categories(df[column].cat.categories.astype(str))
+    return df
+
+
+def load_csv(path, columns=None, engine=None, cache=True):
+    """
+    Load a tick or prediction CSV through the on-disk column cache.
+
+    Columns already in the cache are memory-mapped; the rest are parsed with
+    read_csv() and added to the cache for the next load. Pass cache=False
+    (or set PYCODES_CACHE=0) to always parse the CSV, or a ColumnCache to
+    use a specific cache.
+    """
+    if cache is True:
+        cache = default_cache()
+    if not cache:
+        return read_csv(path, columns, engine)
+
+    header = cache.header(path)
+    wanted = list(header) if columns is None else [column for column in header if column in columns]
+    cached = cache.load(path, wanted)
+    if cached is not None:
+        return cached
+
+    missing = [column for column in wanted if column not in cache.cached_columns(path)]
+    cache.store(path, read_csv(path, missing, engine), header)
+    df = cache.load(path, wanted)
+    # Columns that cannot be memory-mapped are parsed every time
+    return df if df is not None else read_csv(path, columns, engine)
+
+
+def load_ticks(path, columns=TICK_COLUMNS, engine=None):
+    """
+    Load a converted tick file (arrivaltime, sectoken, lasttrprc).
+    """
+    return load_csv(path, columns, engine)
+
+
+def load_predictions(path, columns=PREDICTION_COLUMNS, engine=None):
+    """
+    Load a prediction file (arrivaltime, lastpredtrprc, StanDev, ..., fileSeqNum).
+    """
+    return load_csv(path, columns, engine)
+
+
+class TimeIndex:
+    """
+    Time-window queries on the arrivaltime column of a loaded frame.
+
+    Sortedness is checked once here; a window is then two binary searches.
+    For time-sorted frames (tick files) the result is a zero-copy slice of
+    the frame, otherwise (prediction files, whose sequences overlap in
+    time) the matching rows are taken in file order, as a mask would.
+    """
+
+    def __init__(self, df, column='arrivaltime'):
+        self.df = df
+        times = df[column].to_numpy()
+        self.is_sorted = bool(len(times) < 2 or (times[1:] >= times[:-1]).all())
+        if self.is_sorted:
+            self.order = None
+            self.times = times
+        else:
+            self.order = np.argsort(times, kind='stable')
+            self.times = times[self.order]
+        # Midnight of the first date (0 for time-only files), for time-of-day windows
+        self.day_start = int(self.times[0]) // SECONDS_PER_DAY * SECONDS_PER_DAY if len(self.times) else 0
+
+    def __len__(self):
+        return len(self.times)
+
+    def bounds(self, start_time, end_time):
+        """
+        (lo, hi) positions in the sorted times of the window [start_time, end_time].
+        """
+        lo = np.searchsorted(self.times, start_time, side='left')
+        hi = np.searchsorted(self.times, end_time, side='right')
+        return int(lo), int(max(hi, lo))
+
+    def rows(self, start_time, end_time):
+        """
+        Row positions of the window, as a slice when the frame is sorted.
+        """
+        lo, hi = self.bounds(start_time, end_time)
+        if self.order is None:
+            return slice(lo, hi)
+        return np.sort(self.order[lo:hi])
+
+    def window(self, start_time, end_time):
+        """
+        Rows with start_time <= arrivaltime <= end_time (seconds, as loaded).
+        """
+        return self.df.iloc[self.rows(start_time, end_time)]
+
+    def day_window(self, start_of_day, end_of_day):
+        """
+        Rows between two times of day (seconds since midnight) on the frame's first date.
+        """
+        return self.window(self.day_start + start_of_day, self.day_start + end_of_day)
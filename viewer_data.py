@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+
+from tick_loader import SECONDS_PER_DAY, TimeIndex, format_seconds, load_csv
+from sequence_engine import SequenceIndex, swing_opportunities
+from data_model import PREDICTION_FIELDS, TICK_FIELDS, PredictionData, TickData, frame_token_groups
+from partition_store import date_seconds, file_date
+
+# Prediction fields the viewer plots or checks for swings
+VIEWER_FIELDS = PREDICTION_FIELDS + ['cluster_high', 'cluster_low', 'high_prob', 'low_prob', 'cluster_prob']
+
+
+def dated_frame(df, midnight):
+    """
+    The frame with time-only arrivaltimes put on `midnight`, as the store does.
+    """
+    if midnight is not None and len(df) and df['arrivaltime'].max() < SECONDS_PER_DAY:
+        df = df.assign(arrivaltime=df['arrivaltime'] + midnight)
+    return df
+
+
+def load_file_pair(csv_file1, csv_file2, token):
+    """
+    Load a tick/prediction pair and index its rows by sectoken; runs on a worker thread.
+
+    The files are read through the column cache, with float64 prices as
+    analyze_pred_csv reads them, and are never written to the store. Tokens
+    are listed when they have ticks and at least one prediction sequence.
+    """
+    midnight = date_seconds(file_date(csv_file1))
+    df1 = dated_frame(load_csv(csv_file1, TickData.csv_columns(TICK_FIELDS) + ['sectoken']), midnight)
+    token.progress(30)
+    df2 = dated_frame(load_csv(csv_file2, PredictionData.csv_columns(VIEWER_FIELDS) + ['sectoken']), midnight)
+    token.progress(60)
+    rows1 = frame_token_groups(df1)
+    rows2 = frame_token_groups(df2)
+    sequenced = np.isfinite(df2['fileSeqNum'].to_numpy())
+    tokens = sorted(name for name, rows in rows2.items() if name in rows1 and sequenced[rows].any())
+    if not tokens:
+        raise ValueError(f"No sectoken has both ticks and prediction sequences in {csv_file1} and {csv_file2}")
+    return {'df1': df1, 'df2': df2, 'rows1': rows1, 'rows2': rows2, 'tokens': tokens}
+
+
+def token_frame(df, rows):
+    # One token's rows, without the sectoken column
+    df = df.iloc[rows]
+    if 'sectoken' in df.columns:
+        df = df.drop(columns='sectoken')
+    return df.reset_index(drop=True)
+
+
+def index_frames(df1, df2, tokens, sectoken):
+    """
+    Index one instrument's ticks and predictions for navigation.
+    """
+    # Tick windows are looked up by binary search, so keep the ticks in time order
+    df1_times = TimeIndex(df1)
+    if not df1_times.is_sorted:
+        df1 = df1.sort_values('arrivaltime', kind='stable', ignore_index=True)
+        df1_times = TimeIndex(df1)
+
+    # Row ranges of every sequence in df2 and df1, so navigation is a slice lookup
+    sequence_index = SequenceIndex(df2['fileSeqNum'], df2['arrivaltime'], df1_times.times)
+    return {'df1': df1, 'df2': df2, 'df1_times': df1_times, 'sequence_index': sequence_index,
+            'tokens': tokens, 'sectoken': sectoken}
+
+
+def select_token(pair, sectoken):
+    """
+    The frames and indexes of one sectoken of a load_file_pair() result.
+
+    Only that token's rows are copied and indexed, so switching instruments
+    of a 500-token file costs about as much as opening a single-token one.
+    `sectoken` falls back to the first token when it is None or not present.
+    """
+    if sectoken not in pair['tokens']:
+        sectoken = pair['tokens'][0]
+    return index_frames(token_frame(pair['df1'], pair['rows1'][sectoken]),
+                        token_frame(pair['df2'], pair['rows2'][sectoken]), pair['tokens'], sectoken)
+
+
+def load_viewer_data(store, csv_file1, csv_file2, sectoken, time_range, token):
+    """
+    Load one instrument of the tick and prediction files and index it; runs on a worker thread.
+
+    A file pair is loaded with load_file_pair() and returned under 'pair'
+    too, so other tokens can be picked with select_token() without loading
+    again. With a time_range (start, end) the files are ignored and the
+    store's partitions in that range are loaded instead. Returns the frames
+    and indexes of `sectoken` (the first token when it is None or not
+    present) together with the tokens found.
+    """
+    if time_range is None:
+        pair = load_file_pair(csv_file1, csv_file2, token)
+        data = select_token(pair, sectoken)
+        data['pair'] = pair
+        token.progress(100)
+        return data
+
+    tokens = store.range_tokens(*time_range)
+    token.progress(50)
+    if not tokens:
+        raise ValueError(f"No sectoken has both ticks and predictions in {' to '.join(format_seconds(time_range))}")
+    if sectoken not in tokens:
+        sectoken = tokens[0]
+    # Compact model columns (int64 seconds, float32 prices) viewed as DataFrames
+    ticks, predictions = store.load_range(*time_range, sectoken, TICK_FIELDS, VIEWER_FIELDS)
+    token.progress(80)
+    data = index_frames(ticks.to_frame(), predictions.to_frame(), tokens, sectoken)
+    token.progress(100)
+    return data
+
+
+def sequence_payload(df1, df2, sequence_index, file_seq_num, swing_value, probability, token):
+    """
+    Arrays, swing annotation and console lines for one sequence; runs on a worker thread.
+
+    Returns None when the file has no predictions for file_seq_num.
+    """
+    position = sequence_index.position(file_seq_num)
+    if position is None:
+        return None
+    filtered_df2 = df2.iloc[sequence_index.rows(position)].copy()
+    filtered_df1 = df1.iloc[sequence_index.tick_rows(position)]
+    token.check()
+
+    # Get the start value of 'lastpredtrprc'
+    start_value = filtered_df2['lastpredtrprc'].iloc[0]
+    lines = [f"Start value of lastpredtrprc: {start_value}"]
+
+    # Calculate the swing from the start value
+    filtered_df2['swing'] = filtered_df2['lastpredtrprc'] - start_value
+    lines.append("\nSwing values:")
+    lines.append(str(filtered_df2[['arrivaltime', 'lastpredtrprc', 'swing']]))
+
+    # Find all swing points with ±swing_value points
+    swing_points = filtered_df2[
+        (filtered_df2['swing'] >= swing_value) | (filtered_df2['swing'] <= -swing_value)
+    ]
+
+    swing_with_high_prob = pd.DataFrame()
+    prob_type = 'High_Prob'
+    if (filtered_df2['swing'] >= swing_value).any():
+        swing_with_high_prob = swing_points[swing_points['High_Prob'] > probability].head(1)
+        prob_type = 'High_Prob'
+    if (filtered_df2['swing'] <= -swing_value).any():
+        swing_with_high_prob = swing_points[swing_points['Low_Prob'] > probability].head(1)
+        prob_type = 'Low_Prob'
+
+    annotation = None
+    if not swing_with_high_prob.empty:
+        row = swing_with_high_prob.iloc[0]  # Extract the first row as a Series
+        lines.append(
+            f"Swing detected at {format_seconds([row['arrivaltime']])[0]} with "
+            f"clusterProb {row['clusterProb']:.2f}."
+        )
+        annotation = (row['arrivaltime'], row['lastpredtrprc'],
+                      f"Swing: {row['lastpredtrprc']:.2f}\nProb: {row[prob_type]:.2f}")
+    else:
+        # Print a message if no swing point with high probability is found
+        lines.append("No swing point with ±100 points and clusterProb > 0.7 detected.")
+
+    return {
+        'file_seq_num': file_seq_num,
+        'start_time': int(sequence_index.start_time[position]),
+        'end_time': int(sequence_index.end_time[position]),
+        'tick_time': filtered_df1['arrivaltime'].to_numpy(),
+        'tick_price': filtered_df1['lasttrprc'].to_numpy(),
+        'pred_time': filtered_df2['arrivaltime'].to_numpy(),
+        'pred_price': filtered_df2['lastpredtrprc'].to_numpy(),
+        'pred_sd': filtered_df2['StanDev'].to_numpy(),
+        'annotation': annotation,
+        'lines': lines,
+    }
+
+
+def prefetch_payloads(df1, df2, sequence_index, seq_ids, swing_value, probability, cache, token):
+    """
+    Prepare the payloads of seq_ids that are not cached yet; runs on a worker thread.
+    """
+    for file_seq_num in seq_ids:
+        token.check()
+        key = (file_seq_num, swing_value, probability)
+        if key in cache:
+            continue
+        payload = sequence_payload(df1, df2, sequence_index, file_seq_num, swing_value, probability, token)
+        if payload is not None:
+            cache.put(key, payload)
+
+
+def scan_opportunities(df2, sequence_index, swing_value, probability, token):
+    """
+    Opportunities of every sequence in one vectorized pass; runs on a worker thread.
+    """
+    return swing_opportunities(
+        df2['arrivaltime'].to_numpy(), df2['lastpredtrprc'].to_numpy(),
+        df2['High_Prob'].to_numpy(), df2['Low_Prob'].to_numpy(), swing_value, probability,
+        bounds=(sequence_index.order, sequence_index.seq_ids, sequence_index.starts, sequence_index.ends))
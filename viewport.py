@@ -0,0 +1,88 @@
+from PyQt6.QtCore import QTimer
+
+from sequence_plot import date_numbers, date_seconds
+
+
+class ViewportFetcher:
+    """
+    Refill lines from their frames whenever the visible time range changes.
+
+    Each registered line is backed by a TimeIndex and a value column. After
+    a zoom or pan settles (debounced by `delay_ms`, so a drag or a burst of
+    wheel ticks costs one query), the visible range plus `margin` view
+    widths on each side is looked up by binary search and handed to the
+    LineDecimator, which draws about two points per pixel column. Zooming
+    out past the loaded rows fetches more of the file; zooming in shows
+    every tick once the view is narrow enough, without ever putting the
+    whole file into an artist. Lines holding far more than the view
+    (`max_ratio` times its padded width) are trimmed on the next fetch, so
+    re-decimating after a deep zoom stays cheap.
+    """
+
+    def __init__(self, ax, decimator, delay_ms=150, margin=1.0, max_ratio=8.0):
+        self.ax = ax
+        self.decimator = decimator
+        self.margin = margin
+        self.max_ratio = max_ratio
+        # Switched off while something else owns the lines (e.g. replay)
+        self.enabled = True
+        self.sources = {}
+        # Time range (arrivaltime seconds) currently set on each line
+        self.loaded = {}
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.fetch)
+        ax.callbacks.connect('xlim_changed', self.on_limits_changed)
+
+    def add(self, line, time_index, column, loaded=None):
+        """
+        Back `line` with time_index.df[column]; `loaded` is the range it already shows.
+        """
+        self.sources[line] = (time_index, time_index.df[column].to_numpy(dtype=float))
+        if loaded is None:
+            self.loaded.pop(line, None)
+        else:
+            self.loaded[line] = loaded
+
+    def invalidate(self, *lines):
+        """
+        Forget what `lines` (all by default) show, e.g. after their data was replaced.
+        """
+        for line in lines or list(self.loaded):
+            self.loaded.pop(line, None)
+
+    def stop(self):
+        self.timer.stop()
+
+    def on_limits_changed(self, ax):
+        if self.enabled:
+            self.timer.start()
+
+    def visible_range(self):
+        x_min, x_max = sorted(self.ax.get_xlim())
+        return tuple(date_seconds([x_min, x_max]))
+
+    def fetch(self):
+        """
+        Load the rows around the visible range into every line that does not cover it yet.
+        """
+        if not self.enabled:
+            return
+        start, end = self.visible_range()
+        pad = (end - start) * self.margin
+        changed = False
+        for line, (time_index, values) in self.sources.items():
+            loaded = self.loaded.get(line)
+            if (loaded is not None and loaded[0] <= start and end <= loaded[1]
+                    and loaded[1] - loaded[0] <= self.max_ratio * (end - start + 2 * pad)):
+                continue
+            lo, hi = time_index.bounds(start - pad, end + pad)
+            # One neighbour on each side keeps the line running through the edges
+            lo, hi = max(lo - 1, 0), min(hi + 1, len(time_index))
+            rows = slice(lo, hi) if time_index.order is None else time_index.order[lo:hi]
+            self.decimator.set_data(line, date_numbers(time_index.times[lo:hi]), values[rows])
+            self.loaded[line] = (start - pad, end + pad)
+            changed = True
+        if changed:
+            self.ax.figure.canvas.draw_idle()